@@ -5,6 +5,8 @@ Módulo para cálculos de operaciones ganadoras y perdedoras en trading.
 import pandas as pd
 import streamlit as st
 
+from estadisticas_operaciones import EstadisticasOperaciones, calcular_estadisticas
+
 
 def calcular_operaciones_ganadoras_perdedoras(df: pd.DataFrame) -> pd.DataFrame:
     """
@@ -14,38 +16,27 @@ def calcular_operaciones_ganadoras_perdedoras(df: pd.DataFrame) -> pd.DataFrame:
     Retorna un DataFrame de una sola fila con columnas:
       'Op. Ganadoras' y 'Op. Perdedoras'.
     """
-    # Validar existencia de Profit
-    if 'Profit' not in df.columns:
-        return pd.DataFrame({'Op. Ganadoras': [0], 'Op. Perdedoras': [0]})
-
-    # Convertir Profit a numérico
-    profits = pd.to_numeric(df['Profit'], errors='coerce')
-
-    # Excluir depósitos y retiros
-    if 'Deposito' in df.columns and 'Retiro' in df.columns:
-        mask_dr = df['Deposito'].notna() | df['Retiro'].notna()
-        profits = profits[~mask_dr]
-
-    # Filtrar operaciones válidas (profit distinto de cero)
-    valid = profits[profits != 0].dropna()
+    return _tabla_ganadoras_perdedoras(calcular_estadisticas(df))
 
-    # Contar ganadoras y perdedoras
-    ganadoras = (valid > 0).sum()
-    perdedoras = (valid < 0).sum()
 
-    return pd.DataFrame({'Op. Ganadoras': [int(ganadoras)], 'Op. Perdedoras': [int(perdedoras)]})
+def _tabla_ganadoras_perdedoras(estadisticas: EstadisticasOperaciones) -> pd.DataFrame:
+    return pd.DataFrame({'Op. Ganadoras': [estadisticas.ganadoras], 'Op. Perdedoras': [estadisticas.perdedoras]})
 
 
-def render_operaciones_ganadoras_perdedoras(df: pd.DataFrame) -> None:
+def render_operaciones_ganadoras_perdedoras(df: pd.DataFrame,
+                                            estadisticas: EstadisticasOperaciones | None = None) -> None:
     """
     Renderiza en la sidebar la tabla "Op. Ganadoras / Perdedoras" con color:
       - Verde para ganadoras
       - Rojo para perdedoras
+    `estadisticas` son las de df ya calculadas (si no, se calculan).
     """
     st.sidebar.markdown("### Op. Ganadoras / Perdedoras")
     tabla = pd.DataFrame({'Op. Ganadoras': [0], 'Op. Perdedoras': [0]})
     if not df.empty:
-        tabla = calcular_operaciones_ganadoras_perdedoras(df)
+        if estadisticas is None:
+            estadisticas = calcular_estadisticas(df)
+        tabla = _tabla_ganadoras_perdedoras(estadisticas)
 
     # Función para aplicar color
     def color_ganadoras_perdedoras(val, col_name):
@@ -2,32 +2,15 @@ import pandas as pd
 import streamlit as st
 from typing import Tuple
 
-# Reusar función de riesgo/beneficio para medias
-from riesgo_beneficio import calcular_medias_operaciones
+from estadisticas_operaciones import EstadisticasOperaciones, calcular_estadisticas
 
 
 def calcular_porcentajes_acierto_error(df: pd.DataFrame) -> Tuple[float, float]:
-    if 'Profit' not in df.columns:
-        return 0.0, 0.0
+    estadisticas = calcular_estadisticas(df)
+    return estadisticas.pct_acierto, estadisticas.pct_error
 
-    profit = pd.to_numeric(df['Profit'], errors='coerce')
-    mask = profit.notna() & (profit != 0)
-    if 'Deposito' in df.columns and 'Retiro' in df.columns:
-        mask &= df['Deposito'].isna() & df['Retiro'].isna()
 
-    total = mask.sum()
-    if total == 0:
-        return 0.0, 0.0
-
-    aciertos = (profit[mask] > 0).sum()
-    errores = (profit[mask] < 0).sum()
-
-    pct_acierto = round(aciertos / total * 100, 2)
-    pct_error = round(errores / total * 100, 2)
-    return pct_acierto, pct_error
-
-
-def render_aciertos_beneficios(df: pd.DataFrame) -> None:
+def render_aciertos_beneficios(df: pd.DataFrame, estadisticas: EstadisticasOperaciones | None = None) -> None:
     st.sidebar.markdown("### % de Aciertos / Beneficios M.")
     tabla = pd.DataFrame({
         '% Acierto':    ['0.00%'],
@@ -37,13 +20,13 @@ def render_aciertos_beneficios(df: pd.DataFrame) -> None:
     })
 
     if not df.empty and 'Profit' in df.columns:
-        pct_acierto, pct_error = calcular_porcentajes_acierto_error(df)
-        media_pos, media_neg = calcular_medias_operaciones(df)
+        if estadisticas is None:
+            estadisticas = calcular_estadisticas(df)
 
-        tabla.loc[0, '% Acierto']    = f"{pct_acierto:.2f}%"
-        tabla.loc[0, '% Error']      = f"{pct_error:.2f}%"
-        tabla.loc[0, 'Beneficio M.'] = f"{media_pos:.2f}"
-        tabla.loc[0, 'Riesgo M.']    = f"{media_neg:.2f}"
+        tabla.loc[0, '% Acierto']    = f"{estadisticas.pct_acierto:.2f}%"
+        tabla.loc[0, '% Error']      = f"{estadisticas.pct_error:.2f}%"
+        tabla.loc[0, 'Beneficio M.'] = f"{estadisticas.media_ganancias:.2f}"
+        tabla.loc[0, 'Riesgo M.']    = f"{estadisticas.media_perdidas:.2f}"
 
     # Función para aplicar colores
     def estilo_columna(val, col):
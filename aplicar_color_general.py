@@ -1,7 +1,49 @@
+import numpy as np
 import pandas as pd
 import streamlit as st
 from typing import Optional
 
+# Formato de presentación de las columnas derivadas. En la tabla son float
+# (NaN = vacío); el texto con '%' solo existe al mostrarlas.
+def formato_pct(x):
+    texto = f"{x:.2f}%"
+    return '0.00%' if texto == '-0.00%' else texto
+
+def formato_profit_t(x):
+    texto = f"{x:.2f}%"
+    return '0%' if texto == '0.00%' else texto
+
+def formato_profit_tot(x):
+    return f"{x:.0f}" if x == int(x) else f"{x:.2f}"
+
+FORMATOS_DERIVADAS = {
+    '% Profit. Op':     formato_pct,
+    'Profit Tot.':      formato_profit_tot,
+    'Profit T.':        formato_profit_t,
+    'DD/Max':           formato_pct,
+    'Profit Alcanzado': '{:.2f}'.format,
+    'Profit Media':     '{:.2f}'.format,
+}
+
+def formatear_derivada(col: str, serie: pd.Series) -> pd.Series:
+    """Serie de texto con el formato de presentación de `col` ('' en los NaN)."""
+    numeros = pd.to_numeric(serie, errors='coerce')
+    return numeros.map(lambda x: '' if pd.isna(x) else FORMATOS_DERIVADAS[col](x))
+
+def column_config_derivadas(columnas, solo_lectura=()) -> dict:
+    """
+    column_config de st.dataframe / st.data_editor para las columnas
+    derivadas; las de `solo_lectura` no se pueden editar.
+    """
+    formatos = {
+        '% Profit. Op': '%.2f%%', 'Profit T.': '%.2f%%', 'DD/Max': '%.2f%%',
+        'Profit Alcanzado': '%.2f', 'Profit Media': '%.2f',
+    }
+    return {
+        col: st.column_config.NumberColumn(col, format=fmt, disabled=col in solo_lectura)
+        for col, fmt in formatos.items() if col in columnas
+    }
+
 # Funciones de pintado…
 def pintar_profit_t(val):
     try:
@@ -9,6 +51,7 @@ def pintar_profit_t(val):
             num = float(val.strip('%'))
         else:
             num = float(val)
+        if pd.isna(num): return ''
         if num > 0:      return 'color: green'
         elif num < 0:    return 'color: red'
         else:            return 'color: goldenrod'
@@ -21,6 +64,7 @@ def pintar_dd_max(val):
             num = float(val.strip('%'))
         else:
             num = float(val)
+        if pd.isna(num): return ''
         if num > 0:      return 'color: green'
         elif num < 0:    return 'color: red'
         else:            return 'color: goldenrod'
@@ -46,6 +90,97 @@ def pintar_violeta(val):
 def pintar_azul(val):
     return 'color: blue'
 
+# Estilos de toda la tabla de una vez, por columnas…
+VERDE, ROJO, DORADO = 'color: green', 'color: red', 'color: goldenrod'
+
+def _numeros(serie: pd.Series) -> np.ndarray:
+    return pd.to_numeric(serie, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+
+def _color_signo(valores: np.ndarray) -> np.ndarray:
+    """Verde, rojo o dorado según el signo; '' si es NaN (como pintar_profit_t)."""
+    return np.select([valores > 0, valores < 0, valores == 0], [VERDE, ROJO, DORADO], default='').astype(object)
+
+def _color_iv_rank(valores: np.ndarray) -> np.ndarray:
+    return np.select([valores == 0, valores == 50, valores == 100], [VERDE, DORADO, ROJO], default='').astype(object)
+
+def _colores_columna(serie: pd.Series, pintar, vectorizada) -> np.ndarray:
+    """`vectorizada` si la columna es numérica; si no (textos con '%'…), `pintar` valor a valor."""
+    if pd.api.types.is_numeric_dtype(serie):
+        return vectorizada(serie.to_numpy(dtype=float, na_value=np.nan))
+    return serie.map(pintar).to_numpy(dtype=object)
+
+def _hay_movimiento(serie: pd.Series) -> np.ndarray:
+    """Filas con Retiro/Deposito distinto de 0."""
+    if pd.api.types.is_numeric_dtype(serie):
+        valores = serie.to_numpy(dtype=float, na_value=np.nan)
+        return ~np.isnan(valores) & (valores != 0)
+    return np.fromiter((bool(pd.notna(v) and v != 0) for v in serie), dtype=bool, count=len(serie))
+
+def _unir(previo: np.ndarray, nuevo) -> np.ndarray:
+    """Encadena dos estilos como lo hacen dos .apply seguidos de un Styler."""
+    nuevo = np.broadcast_to(np.asarray(nuevo, dtype=object), previo.shape)
+    return np.where(previo == '', nuevo, np.where(nuevo == '', previo, previo + '; ' + nuevo))
+
+def _tramo(columnas: list, desde: str, hasta: str) -> np.ndarray:
+    """Columnas de `desde` a `hasta` (ambas incluidas) en el orden de la tabla."""
+    dentro, mascara = False, np.zeros(len(columnas), dtype=bool)
+    for j, col in enumerate(columnas):
+        if col == desde: dentro = True
+        mascara[j] = dentro
+        if col == hasta: dentro = False
+    return mascara
+
+def matriz_estilos(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    CSS de cada celda de la tabla principal (para Styler.apply con
+    axis=None). Se calcula por columnas con máscaras de numpy:
+      - filas de Retiro/Deposito: de 'Activo' a 'Profit Tot.' en rosa/azul,
+      - el resto: de 'Activo' a '% Profit. Op' (menos C&P) según el signo
+        de Profit, y Profit Tot. según su signo,
+      - C&P: verde si es CALL, rojo si es otro texto,
+      - y encima Profit T., DD/Max, IV Rank y las columnas de metas.
+    """
+    columnas = list(df.columns)
+    n = len(df)
+    estilos = [np.full(n, '', dtype=object) for _ in columnas]
+    pos = {col: j for j, col in enumerate(columnas)}
+
+    hay_retiro = _hay_movimiento(df['Retiro'])
+    movimiento = hay_retiro | _hay_movimiento(df['Deposito'])
+    color_movimiento = np.where(hay_retiro, 'color: hotpink', 'color: deepskyblue').astype(object)
+    color_profit = _color_signo(_numeros(df['Profit']))
+
+    en_movimiento = _tramo(columnas, 'Activo', 'Profit Tot.')
+    en_profit = _tramo(columnas, 'Activo', '% Profit. Op')
+    for j, col in enumerate(columnas):
+        if en_movimiento[j]:
+            estilos[j] = np.where(movimiento, color_movimiento, estilos[j])
+        if en_profit[j] and col != 'C&P':
+            estilos[j] = np.where(movimiento, estilos[j], color_profit)
+
+    c_p = df['C&P']
+    es_texto = np.fromiter((isinstance(v, str) for v in c_p), dtype=bool, count=n)
+    es_call = c_p.where(es_texto, '').astype(str).str.upper().eq('CALL').to_numpy()
+    j = pos['C&P']
+    estilos[j] = np.where(es_texto, np.where(es_call, VERDE, ROJO), estilos[j])
+
+    tot = _numeros(df['Profit Tot.'])
+    j = pos['Profit Tot.']
+    estilos[j] = np.where(~movimiento & ~np.isnan(tot), _color_signo(tot), estilos[j])
+
+    capas = [
+        (['Profit T.'], lambda s: _colores_columna(s, pintar_profit_t, _color_signo)),
+        (['DD/Max'], lambda s: _colores_columna(s, pintar_dd_max, _color_signo)),
+        (['IV Rank'], lambda s: _colores_columna(s, pintar_iv_rank, _color_iv_rank)),
+        (['% Alcanzado', 'Profit Alcanzado'], lambda s: 'color: violet'),
+        (['% Media', 'Profit Media'], lambda s: 'color: blue'),
+    ]
+    for cols, colores in capas:
+        for col in cols:
+            estilos[pos[col]] = _unir(estilos[pos[col]], colores(df[col]))
+
+    return pd.DataFrame(np.column_stack(estilos), index=df.index, columns=df.columns)
+
 def aplicar_color_general(df: pd.DataFrame):
     if not st.session_state.get('pintar_colores', True):
         return None
@@ -61,65 +196,10 @@ def aplicar_color_general(df: pd.DataFrame):
         st.warning(f"Faltan columnas necesarias: {', '.join(columnas_requeridas)}.")
         return None
 
-    def style_row(row):
-        styles = [''] * len(row)
-        profit = pd.to_numeric(row['Profit'], errors='coerce')
-        c_p = row['C&P']
-        retiro = row['Retiro']
-        deposito = row['Deposito']
-
-        hay_retiro   = pd.notna(retiro)   and retiro   != 0
-        hay_deposito = pd.notna(deposito) and deposito != 0
-
-        # Colorear fila si hay Retiro o Deposito
-        if hay_retiro or hay_deposito:
-            color_texto = 'color: hotpink'   if hay_retiro   else 'color: deepskyblue'
-            pintar = False
-            for idx, col in enumerate(row.index):
-                if col == 'Activo': pintar = True
-                if pintar:           styles[idx] = color_texto
-                if col == 'Profit Tot.': pintar = False
-
-        # Colorear por valor de Profit
-        if not (hay_retiro or hay_deposito):
-            color_profit = ''
-            if pd.notna(profit):
-                if profit > 0:   color_profit = 'color: green'
-                elif profit < 0: color_profit = 'color: red'
-                else:            color_profit = 'color: goldenrod'
-
-            aplicar = False
-            for idx, col in enumerate(row.index):
-                if col == 'Activo': aplicar = True
-                if aplicar and col != 'C&P':
-                    styles[idx] = color_profit
-                if col == '% Profit. Op':
-                    aplicar = False
-
-        # Colorear C&P
-        if isinstance(c_p, str):
-            idx_c_p = row.index.get_loc('C&P')
-            styles[idx_c_p] = 'color: green' if c_p.upper()=='CALL' else 'color: red'
-
-        # Colorear Profit Tot.
-        if not hay_retiro and not hay_deposito:
-            idx_tot = row.index.get_loc('Profit Tot.')
-            val_tot = pd.to_numeric(row['Profit Tot.'], errors='coerce')
-            if pd.notna(val_tot):
-                if val_tot > 0:   styles[idx_tot] = 'color: green'
-                elif val_tot < 0: styles[idx_tot] = 'color: red'
-                else:             styles[idx_tot] = 'color: goldenrod'
-
-        return styles
-
+    formatos = {col: f for col, f in FORMATOS_DERIVADAS.items() if col in df.columns}
     styled_df = (
         df.style
-          .apply(style_row, axis=1)
-          .applymap(pintar_profit_t, subset=['Profit T.'])
-          .applymap(pintar_dd_max,   subset=['DD/Max'])
-          .applymap(pintar_iv_rank,  subset=['IV Rank'])
-          .applymap(pintar_violeta,  subset=['% Alcanzado','Profit Alcanzado'])
-          .applymap(pintar_azul,     subset=['% Media','Profit Media'])
+          .apply(matriz_estilos, axis=None)
           # ➡️ Aquí quitamos los decimales de las columnas numéricas:
           .format({
               '#Cont':     '{:.0f}',
@@ -129,6 +209,8 @@ def aplicar_color_general(df: pd.DataFrame):
               'Deposito':  '{:.0f}',
               'Retiro':    '{:.0f}'
          })
+          # Columnas derivadas: '%' y decimales solo al mostrar
+          .format(formatos, subset=list(formatos), na_rep='')
 
     )
     return styled_df
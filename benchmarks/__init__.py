@@ -0,0 +1 @@
+"""Benchmarks de la app (se ejecutan con python -m benchmarks.<nombre>)."""
@@ -0,0 +1,118 @@
+"""
+Tiempo de arranque en frío de ui.py: importa en un intérprete nuevo los
+módulos que ui.py importa al arrancar (los `from X import ...` de primer
+nivel del script, en su orden) y mide cuánto tarda, repitiéndolo varias
+veces. Informa también de qué módulos pesados quedaron cargados y, con
+--detalle, de los imports más lentos según `python -X importtime`.
+
+    python -m benchmarks.arranque [--repeticiones 5] [--detalle] [--salida arranque.json]
+
+No toca S3: se usan credenciales ficticias y el cliente de S3 no se crea
+hasta la primera llamada.
+"""
+
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Módulos cuyo coste interesa vigilar
+PESADOS = ['streamlit', 'pandas', 'plotly.graph_objects', 'plotly.express', 'boto3', 'botocore', 'pyarrow']
+
+_PROGRAMA = """
+import json, os, sys, time, warnings
+warnings.filterwarnings('ignore')
+sys.path.insert(0, {raiz!r})
+inicio = time.perf_counter()
+for modulo in {modulos!r}:
+    __import__(modulo)
+total = time.perf_counter() - inicio
+print(json.dumps({{'segundos': total, 'cargados': [m for m in {pesados!r} if m in sys.modules]}}))
+"""
+
+
+def modulos_de_ui(ruta: str = os.path.join(RAIZ, 'ui.py')) -> list:
+    """Módulos importados en el primer nivel de ui.py, en orden y sin repetir."""
+    arbol = ast.parse(open(ruta, encoding='utf-8').read())
+    modulos = []
+    for nodo in arbol.body:
+        if isinstance(nodo, ast.Import):
+            nombres = [a.name for a in nodo.names]
+        elif isinstance(nodo, ast.ImportFrom) and nodo.module and not nodo.level:
+            nombres = [nodo.module]
+        else:
+            continue
+        modulos += [n for n in nombres if n not in modulos]
+    return modulos
+
+
+def _entorno() -> dict:
+    entorno = dict(os.environ)
+    for clave in ('AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY', 'AWS_REGION', 'AWS_BUCKET_NAME'):
+        entorno.setdefault(clave, 'benchmark')
+    return entorno
+
+
+def medir(modulos: list, repeticiones: int) -> dict:
+    """Mide `repeticiones` arranques en frío, cada uno en un intérprete nuevo."""
+    programa = _PROGRAMA.format(raiz=RAIZ, modulos=modulos, pesados=PESADOS)
+    tiempos, cargados = [], []
+    for _ in range(repeticiones):
+        salida = subprocess.run(
+            [sys.executable, '-c', programa], cwd=RAIZ, env=_entorno(),
+            capture_output=True, text=True, check=True
+        )
+        resultado = json.loads(salida.stdout.strip().splitlines()[-1])
+        tiempos.append(resultado['segundos'])
+        cargados = resultado['cargados']
+    return {
+        'modulos': len(modulos),
+        'repeticiones': repeticiones,
+        'mediana_s': statistics.median(tiempos),
+        'min_s': min(tiempos),
+        'max_s': max(tiempos),
+        'cargados': cargados,
+    }
+
+
+def imports_lentos(modulos: list, n: int = 15) -> list:
+    """Los `n` imports con más tiempo acumulado según `python -X importtime`."""
+    programa = _PROGRAMA.format(raiz=RAIZ, modulos=modulos, pesados=PESADOS)
+    salida = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', programa], cwd=RAIZ, env=_entorno(),
+        capture_output=True, text=True, check=True
+    )
+    filas = []
+    for linea in salida.stderr.splitlines():
+        if not linea.startswith('import time:') or 'cumulative' in linea:
+            continue
+        propio, acumulado, nombre = [c.strip() for c in linea.split(':', 1)[1].split('|')]
+        filas.append({'modulo': nombre, 'acumulado_ms': int(acumulado) / 1000, 'propio_ms': int(propio) / 1000})
+    return sorted(filas, key=lambda f: f['acumulado_ms'], reverse=True)[:n]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--detalle', action='store_true', help='añade los imports más lentos')
+    parser.add_argument('--salida', help='archivo JSON donde guardar el resultado')
+    args = parser.parse_args(argv)
+
+    modulos = modulos_de_ui()
+    resultado = medir(modulos, args.repeticiones)
+    if args.detalle:
+        resultado['imports_lentos'] = imports_lentos(modulos)
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(texto)
+    print(texto)
+
+
+if __name__ == '__main__':
+    main()
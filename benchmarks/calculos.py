@@ -0,0 +1,254 @@
+"""
+Benchmark de los cálculos de la app sobre journals sintéticos
+(benchmarks.generador) de varios tamaños.
+
+Mide, para cada tamaño:
+  - el pipeline completo y la conversión de fechas (convertir_fechas),
+  - cada función de time_utils y de calculos_tabla_principal,
+  - los cálculos de las estadísticas de la barra lateral y sus render_*,
+  - cada gráfico del registro de gráficos (preparación de datos y figura).
+
+Los render_* y los gráficos se ejecutan con Streamlit en modo "bare" (sin
+`streamlit run`): los widgets devuelven su valor por defecto y no se pinta
+nada, pero todo el cálculo se hace (mostrar_sidebar_inversion no se
+mide entero porque depende de st.session_state, que en modo bare no
+guarda nada; se mide su cálculo). Se ejecutan en un directorio temporal
+porque algunos gráficos guardan su configuración en el directorio actual.
+
+    python -m benchmarks.calculos --filas 1000 100000 1000000 --salida resultados.json
+    python -m benchmarks.comparar antes.json despues.json
+
+Cada caso se mide en un proceso hijo (fork) con un tiempo máximo
+(--limite-s): un gráfico cuadrático con un millón de filas queda como
+'tiempo agotado' en lugar de bloquear el benchmark, y no se prueba con
+los tamaños siguientes.
+
+El resultado es un JSON con la versión (commit, librerías) y, por caso y
+tamaño, la mediana y el mínimo de varias repeticiones, para compararlo
+entre versiones con benchmarks.comparar.
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TAMANOS = [1_000, 100_000, 1_000_000]
+
+# Repeticiones de cada caso: hasta MAX_REPETICIONES o hasta sumar TIEMPO_OBJETIVO_S
+MAX_REPETICIONES = 5
+TIEMPO_OBJETIVO_S = 1.0
+
+# Tiempo máximo de cada caso y tamaño (todas sus repeticiones)
+LIMITE_S = 120.0
+
+
+def _preparar_entorno() -> None:
+    """Streamlit en modo bare sin avisos y credenciales ficticias (no se usa S3)."""
+    warnings.filterwarnings('ignore')
+    for clave in ('AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY', 'AWS_REGION', 'AWS_BUCKET_NAME'):
+        os.environ.setdefault(clave, 'benchmark')
+    if RAIZ not in sys.path:
+        sys.path.insert(0, RAIZ)
+    from streamlit import config as config_streamlit, logger
+    config_streamlit.set_option('global.showWarningOnDirectExecution', False)
+    logger.set_log_level(logging.ERROR)
+
+
+def casos() -> list:
+    """
+    (grupo, nombre, entrada, función) de cada caso. `entrada` es el
+    DataFrame que recibe: 'crudo' (el journal generado), 'fechas' (con las
+    fechas ya convertidas) o 'procesado' (salida del pipeline).
+    """
+    import calculos_tabla_principal as ctp
+    import time_utils
+    import riesgo_beneficio, aciertos_beneficios, capital, Op_ganadoras_perdedoras, esperanza_matematica
+    import inversion
+    import estadisticas_operaciones
+    from pipeline_incremental import crear_pipeline_principal, convertir_fechas_tabla
+    from registro_graficos import GRAFICOS, obtener_grafico
+
+    lista = [
+        ('pipeline', 'completo', 'crudo', lambda df: crear_pipeline_principal().ejecutar(df)),
+        ('convertir_fechas', 'convertir_fechas', 'crudo', convertir_fechas_tabla),
+    ]
+    for nombre in ('calcular_tiempo_operacion_vectorizado', 'calcular_dia_live', 'calcular_tiempo_dr'):
+        lista.append(('time_utils', nombre, 'fechas', getattr(time_utils, nombre)))
+    for nombre in ('calcular_profit_operacion', 'calcular_porcentaje_profit_op', 'calcular_profit_total',
+                   'calcular_dd_max', 'calcular_dd_up', 'calcular_profit_t',
+                   'calcular_profit_alcanzado_vectorizado', 'calcular_profit_media_vectorizado',
+                   'calcular_estado_acumulado'):
+        lista.append(('calculos_tabla_principal', nombre, 'procesado', getattr(ctp, nombre)))
+
+    rb = riesgo_beneficio
+    lista += [
+        ('estadisticas', 'calcular_estadisticas', 'procesado', estadisticas_operaciones.calcular_estadisticas),
+        ('estadisticas', 'calcular_medias_operaciones', 'procesado', rb.calcular_medias_operaciones),
+        ('estadisticas', 'calcular_profit_final', 'procesado', rb.calcular_profit_final),
+        ('estadisticas', 'calcular_porcentajes_acierto_error', 'procesado',
+         aciertos_beneficios.calcular_porcentajes_acierto_error),
+        ('estadisticas', 'calcular_total_depositos', 'procesado', capital.calcular_total_depositos),
+        ('estadisticas', 'calcular_total_retiros', 'procesado', capital.calcular_total_retiros),
+        ('estadisticas', 'calcular_ganancias_totales', 'procesado', capital.calcular_ganancias_totales),
+        ('estadisticas', 'calcular_operaciones_ganadoras_perdedoras', 'procesado',
+         Op_ganadoras_perdedoras.calcular_operaciones_ganadoras_perdedoras),
+        ('estadisticas', 'calcular_esperanza_matematica', 'procesado',
+         esperanza_matematica.calcular_esperanza_matematica),
+        ('estadisticas', 'calcular_ganancia_esperada', 'procesado', esperanza_matematica.calcular_ganancia_esperada),
+        ('estadisticas', 'calcular_porcentaje_inversion', 'procesado',
+         lambda df: inversion.calcular_porcentaje_inversion(1000.0, df)),
+        ('barra_lateral', 'render_riesgo_beneficio', 'procesado', rb.render_riesgo_beneficio),
+        ('barra_lateral', 'render_aciertos_beneficios', 'procesado', aciertos_beneficios.render_aciertos_beneficios),
+        ('barra_lateral', 'render_operaciones_ganadoras_perdedoras', 'procesado',
+         Op_ganadoras_perdedoras.render_operaciones_ganadoras_perdedoras),
+        ('barra_lateral', 'render_tabla_capital', 'procesado', capital.render_tabla_capital),
+        ('barra_lateral', 'render_esperanza_matematica', 'procesado', esperanza_matematica.render_esperanza_matematica),
+    ]
+
+    def grafico(nombre):
+        funcion = obtener_grafico(nombre)
+        return lambda df: funcion(df, chart_key=f"benchmark_{nombre}")
+
+    for nombre in GRAFICOS:
+        lista.append(('graficos', nombre, 'procesado', grafico(nombre)))
+    return lista
+
+
+def medir(funcion, df) -> dict:
+    """Repite `funcion(df)` y devuelve mediana y mínimo (o el error si falla)."""
+    tiempos = []
+    try:
+        while len(tiempos) < MAX_REPETICIONES and sum(tiempos) < TIEMPO_OBJETIVO_S:
+            inicio = time.perf_counter()
+            funcion(df)
+            tiempos.append(time.perf_counter() - inicio)
+    except Exception as e:
+        return {'error': f"{type(e).__name__}: {e}"}
+    return {
+        'mediana_s': statistics.median(tiempos),
+        'min_s': min(tiempos),
+        'repeticiones': len(tiempos),
+    }
+
+
+def _hijo(funcion, df, conexion) -> None:
+    conexion.send(medir(funcion, df))
+    conexion.close()
+
+
+def medir_con_limite(funcion, df, limite: float | None) -> dict:
+    """medir() en un proceso hijo que se mata si tarda más de `limite` segundos."""
+    if not limite or 'fork' not in multiprocessing.get_all_start_methods():
+        return medir(funcion, df)
+    contexto = multiprocessing.get_context('fork')
+    lector, escritor = contexto.Pipe(duplex=False)
+    proceso = contexto.Process(target=_hijo, args=(funcion, df, escritor), daemon=True)
+    proceso.start()
+    escritor.close()
+    try:
+        if lector.poll(limite):
+            return lector.recv()
+        return {'error': f"tiempo agotado (> {limite:g} s)", 'agotado': True}
+    except EOFError:
+        return {'error': f"el proceso terminó con código {proceso.exitcode}"}
+    finally:
+        if proceso.is_alive():
+            proceso.kill()
+        proceso.join()
+        lector.close()
+
+
+def _version() -> dict:
+    import numpy as np
+    import pandas as pd
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ, capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'commit': commit,
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'plataforma': platform.platform(),
+    }
+
+
+def ejecutar(tamanos: list, patron: str | None = None, semilla: int = 0,
+             limite: float | None = LIMITE_S, progreso=print) -> dict:
+    """
+    Ejecuta los casos (los que casan con la expresión `patron`) para cada
+    tamaño, de menor a mayor. Un caso que agota el `limite` con un tamaño
+    queda 'omitido' en los siguientes.
+    """
+    _preparar_entorno()
+    from benchmarks.generador import generar_journal
+    from pipeline_incremental import crear_pipeline_principal, convertir_fechas_tabla
+
+    seleccion = [c for c in casos() if not patron or re.search(patron, f"{c[0]}.{c[1]}")]
+    resultados, agotados = [], set()
+    directorio = os.getcwd()
+    with tempfile.TemporaryDirectory() as temporal:
+        os.chdir(temporal)
+        try:
+            for filas in sorted(tamanos):
+                entradas = {'crudo': generar_journal(filas, semilla)}
+                entradas['fechas'] = convertir_fechas_tabla(entradas['crudo'])
+                entradas['procesado'] = crear_pipeline_principal().ejecutar(entradas['crudo'])
+                for grupo, nombre, entrada, funcion in seleccion:
+                    if (grupo, nombre) in agotados:
+                        medida = {'omitido': 'agotó el tiempo con menos filas'}
+                    else:
+                        medida = medir_con_limite(funcion, entradas[entrada], limite)
+                        if medida.pop('agotado', False):
+                            agotados.add((grupo, nombre))
+                    resultado = {'grupo': grupo, 'caso': nombre, 'filas': filas, **medida}
+                    resultados.append(resultado)
+                    if progreso:
+                        tiempo = resultado.get('mediana_s')
+                        progreso(f"{filas:>9} {grupo}.{nombre}: "
+                                 + (f"{tiempo * 1000:.1f} ms" if tiempo is not None
+                                    else resultado.get('error') or resultado['omitido']))
+        finally:
+            os.chdir(directorio)
+    return {'version': _version(), 'semilla': semilla, 'limite_s': limite, 'resultados': resultados}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filas', type=int, nargs='+', default=TAMANOS)
+    parser.add_argument('--casos', help='expresión regular sobre "grupo.caso" (p. ej. "time_utils|graficos")')
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--limite-s', type=float, default=LIMITE_S,
+                        help='tiempo máximo por caso y tamaño (0: sin límite, sin proceso hijo)')
+    parser.add_argument('--salida', help='archivo JSON donde guardar los resultados')
+    args = parser.parse_args(argv)
+
+    resultado = ejecutar(args.filas, args.casos, args.semilla, args.limite_s,
+                         progreso=lambda t: print(t, file=sys.stderr))
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(texto)
+    else:
+        print(texto)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Compara dos resultados de benchmarks.calculos (p. ej. antes y después de
+un cambio): por caso y tamaño, la mediana de cada uno y el cociente
+después/antes. Marca como regresión lo que sea más lento que `--umbral`
+(por defecto 1.2, un 20 %) y termina con código 1 si hay alguna.
+
+    python -m benchmarks.comparar antes.json despues.json [--umbral 1.2]
+"""
+
+import argparse
+import json
+import sys
+
+UMBRAL = 1.2
+
+
+def _por_caso(resultado: dict) -> dict:
+    return {
+        (r['grupo'], r['caso'], r['filas']): r
+        for r in resultado['resultados']
+    }
+
+
+def comparar(antes: dict, despues: dict, umbral: float = UMBRAL) -> list:
+    """Filas de la comparación: caso, filas, medianas, cociente y si es regresión."""
+    previos, nuevos = _por_caso(antes), _por_caso(despues)
+    filas = []
+    for clave in sorted(previos.keys() & nuevos.keys(), key=lambda c: (c[2], c[0], c[1])):
+        a, d = previos[clave].get('mediana_s'), nuevos[clave].get('mediana_s')
+        cociente = d / a if a and d is not None else None
+        filas.append({
+            'caso': f"{clave[0]}.{clave[1]}",
+            'filas': clave[2],
+            'antes_s': a,
+            'despues_s': d,
+            'cociente': cociente,
+            'regresion': (cociente is not None and cociente > umbral) or (a is not None and d is None),
+        })
+    return filas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('antes')
+    parser.add_argument('despues')
+    parser.add_argument('--umbral', type=float, default=UMBRAL)
+    args = parser.parse_args(argv)
+    with open(args.antes, encoding='utf-8') as f:
+        antes = json.load(f)
+    with open(args.despues, encoding='utf-8') as f:
+        despues = json.load(f)
+
+    print(f"antes:   {antes['version'].get('commit')}  después: {despues['version'].get('commit')}")
+    filas = comparar(antes, despues, args.umbral)
+
+    def ms(segundos):
+        return f"{segundos * 1000:10.1f}" if segundos is not None else f"{'error':>10}"
+
+    for fila in filas:
+        cociente = f"{fila['cociente']:6.2f}x" if fila['cociente'] is not None else f"{'-':>7}"
+        marca = '  << regresión' if fila['regresion'] else ''
+        print(f"{fila['filas']:>9} {fila['caso']:<60} {ms(fila['antes_s'])} {ms(fila['despues_s'])} ms {cociente}{marca}")
+    if any(f['regresion'] for f in filas):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
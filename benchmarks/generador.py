@@ -0,0 +1,135 @@
+"""
+Generador de journals sintéticos con el esquema de config.FIXED_COLS.
+
+Imita un journal real (como 03..csv): un depósito inicial, depósitos y
+retiros esporádicos, operaciones CALL/PUT (más CALL que PUT) sobre varios
+activos en horario de mercado, la mayoría intradía y algunas de varios
+días, y operaciones abiertas (sin cierre ni 'STRK Sell') sueltas y al
+final. Las fechas van como texto, igual que en los CSV subidos, para que
+la conversión de fechas también se mida. Además de config.FIXED_COLS
+lleva las metas '% Alcanzado' y '% Media' que el pipeline necesita (como
+los journals reales). Es determinista por `semilla`.
+
+    python -m benchmarks.generador --filas 100000 --salida journal_100k.csv
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import config
+
+# Proporción de cada tipo de fila
+PROP_DEPOSITOS = 0.01
+PROP_RETIROS = 0.005
+PROP_CALL = 0.65            # entre las operaciones
+PROP_ABIERTAS = 0.002       # operaciones abiertas sueltas
+ABIERTAS_FINAL = 3          # y las últimas operaciones del journal
+PROP_VARIOS_DIAS = 0.15     # operaciones que se cierran otro día
+PROP_GANADORAS = 0.55
+
+OPERACIONES_POR_DIA = 6
+MAX_DIAS = 2520             # unos 10 años: más filas, más operaciones por día
+INICIO = '2020-01-02'
+FORMATO_FECHA = '%Y-%m-%dT%H:%M:%S.000'
+
+# Metas por operación, con los valores del journal de ejemplo
+METAS_ALCANZADO = ['300%', '500%', '100%', '80%']
+META_MEDIA = '200%'
+
+ACTIVOS = [a for a in config.ASSETS if a not in ('DEP', 'RET')]
+# SPY domina, como en el journal de ejemplo
+PESOS_ACTIVOS = np.array([10.0 if a == 'SPY' else 1.0 for a in ACTIVOS])
+PESOS_ACTIVOS /= PESOS_ACTIVOS.sum()
+
+
+def generar_journal(filas: int, semilla: int = 0) -> pd.DataFrame:
+    """DataFrame de `filas` filas con las columnas de config.FIXED_COLS y las metas."""
+    rng = np.random.default_rng(semilla)
+    n = int(filas)
+
+    # Tipo de fila: 0 operación, 1 depósito, 2 retiro (la primera, depósito)
+    tipo = rng.choice(3, size=n, p=[1 - PROP_DEPOSITOS - PROP_RETIROS, PROP_DEPOSITOS, PROP_RETIROS])
+    if n:
+        tipo[0] = 1
+    op, dep, ret = tipo == 0, tipo == 1, tipo == 2
+
+    # Entradas: días hábiles consecutivos, varias por día, en sesión (9:30-16:00)
+    dias = pd.bdate_range(INICIO, periods=min(MAX_DIAS, max(1, -(-n // OPERACIONES_POR_DIA))))
+    dia = rng.integers(0, len(dias), size=n)
+    minuto_entrada = rng.integers(0, 360, size=n)
+    orden = np.lexsort((minuto_entrada, dia))
+    entrada = (
+        dias.values[dia[orden]]
+        + np.timedelta64(9 * 60 + 30, 'm')
+        + minuto_entrada[orden].astype('timedelta64[m]')
+    )
+
+    # Cierre: intradía hasta el final de la sesión o 1-10 días hábiles después
+    restantes = 390 - minuto_entrada[orden]
+    duracion_min = (rng.random(n) * restantes).astype(np.int64) + 1
+    varios = rng.random(n) < PROP_VARIOS_DIAS
+    dias_extra = rng.integers(1, 11, size=n)
+    cierre = entrada + duracion_min.astype('timedelta64[m]')
+    cierre_varios = np.busday_offset(
+        entrada.astype('datetime64[D]'), dias_extra, roll='forward'
+    ) + (rng.integers(9 * 60 + 30, 16 * 60, size=n)).astype('timedelta64[m]')
+    cierre = np.where(varios & op, cierre_varios, cierre)
+
+    # Operaciones
+    cp = np.where(rng.random(n) < PROP_CALL, 'CALL', 'PUT')
+    activo = rng.choice(ACTIVOS, size=n, p=PESOS_ACTIVOS)
+    contratos = rng.integers(1, 6, size=n).astype(float)
+    strk_buy = np.round(rng.lognormal(np.log(30), 0.5, size=n), 2)
+    gana = rng.random(n) < PROP_GANADORAS
+    rendimiento = np.where(gana, rng.uniform(0.05, 1.5, size=n), -rng.uniform(0.1, 1.0, size=n))
+    strk_sell = np.round(strk_buy * (1 + rendimiento), 2)
+    profit = np.round((strk_sell - strk_buy) * contratos, 2)
+
+    abiertas = op & (rng.random(n) < PROP_ABIERTAS)
+    abiertas[np.flatnonzero(op)[-ABIERTAS_FINAL:]] = True
+
+    deposito = np.where(dep, np.round(rng.uniform(100, 2000, size=n)), np.nan)
+    if n:
+        deposito[0] = 1000.0
+    retiro = np.where(ret, -np.round(rng.uniform(100, 1000, size=n)), np.nan)
+
+    fecha = pd.Series(entrada).dt.strftime(FORMATO_FECHA)
+    fecha_cierre = pd.Series(cierre).dt.strftime(FORMATO_FECHA).where(~abiertas, None)
+
+    df = pd.DataFrame({
+        'Activo': np.where(dep, 'DEP', np.where(ret, 'RET', activo)),
+        'C&P': np.where(op, cp, None),
+        'D': None,
+        'Día': None,
+        'Fecha / Hora': fecha,
+        'Fecha / Hora de Cierre': fecha_cierre,
+        '#Cont': np.where(op, contratos, np.nan),
+        'STRK Buy': np.where(op, strk_buy, np.nan),
+        'STRK Sell': np.where(op & ~abiertas, strk_sell, np.nan),
+        'Deposito': deposito,
+        'Retiro': retiro,
+        'Profit': np.where(op, np.where(abiertas, np.nan, profit), np.where(dep, deposito, retiro)),
+        '% Alcanzado': np.where(op, rng.choice(METAS_ALCANZADO, size=n), None),
+        '% Media': np.where(op, META_MEDIA, None),
+    })
+    return df[config.FIXED_COLS + ['% Alcanzado', '% Media']]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filas', type=int, default=1000)
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--salida', required=True, help='archivo .csv o .parquet')
+    args = parser.parse_args(argv)
+    df = generar_journal(args.filas, args.semilla)
+    if args.salida.endswith('.parquet'):
+        df.to_parquet(args.salida, index=False)
+    else:
+        df.to_csv(args.salida, index=False)
+    print(f"{len(df)} filas → {args.salida}")
+
+
+if __name__ == '__main__':
+    main()
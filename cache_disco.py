@@ -0,0 +1,117 @@
+"""
+Caché en disco de journals ya decodificados, por clave de objeto y ETag.
+
+Cada entrada es el DataFrame en Parquet (formato_journal.df_a_parquet:
+se lee ya tipado, sin volver a parsear el CSV/XLSX) en un archivo
+{sha1(clave)}-{etag}.parquet. Nunca se usa pickle: leer un pickle ejecuta
+código, y una entrada plantada en el directorio lo ejecutaría en la app.
+Con el ETag guardado la lectura en S3 pasa a ser un GET condicional
+(If-None-Match): si el objeto no cambió S3 responde 304 sin cuerpo y se
+usa la copia local. Cuando el total supera `max_bytes` se borran las
+entradas usadas hace más tiempo (LRU por fecha de modificación, que se
+actualiza en cada acierto).
+
+El directorio tiene que ser privado: se crea con permisos 0o700 y, si ya
+existe, se rechaza (PermissionError) si no es un directorio, es un enlace
+simbólico, es de otro usuario o tiene permisos para el grupo u otros.
+"""
+
+import hashlib
+import os
+import threading
+import uuid
+
+import stat
+
+import pandas as pd
+
+from formato_journal import df_a_parquet, leer_journal
+
+EXTENSION = ".parquet"
+
+
+class CacheDisco:
+    def __init__(self, directorio: str, max_bytes: int):
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directorio, mode=0o700, exist_ok=True)
+        self._comprobar_privado()
+
+    def _comprobar_privado(self) -> None:
+        info = os.lstat(self.directorio)
+        if stat.S_ISLNK(info.st_mode) or not stat.S_ISDIR(info.st_mode):
+            raise PermissionError(f"La caché {self.directorio} no es un directorio")
+        if hasattr(os, "getuid") and info.st_uid != os.getuid():
+            raise PermissionError(f"La caché {self.directorio} es de otro usuario")
+        if info.st_mode & 0o077:
+            raise PermissionError(
+                f"La caché {self.directorio} tiene permisos {stat.S_IMODE(info.st_mode):o}; deben ser 700"
+            )
+
+    @staticmethod
+    def _prefijo(key: str) -> str:
+        return hashlib.sha1(key.encode("utf-8")).hexdigest() + "-"
+
+    @staticmethod
+    def _limpiar_etag(etag: str) -> str:
+        return "".join(c for c in etag if c.isalnum() or c in "-_")
+
+    def _ruta(self, key: str, etag: str) -> str:
+        return os.path.join(self.directorio, f"{self._prefijo(key)}{self._limpiar_etag(etag)}{EXTENSION}")
+
+    def _entradas(self, key: str) -> list:
+        prefijo = self._prefijo(key)
+        return [e for e in os.scandir(self.directorio)
+                if e.name.startswith(prefijo) and e.name.endswith(EXTENSION)]
+
+    def etag(self, key: str) -> str | None:
+        """ETag de la copia guardada de `key` (entre comillas, como lo da S3), o None."""
+        entradas = self._entradas(key)
+        if not entradas:
+            return None
+        return '"' + entradas[0].name[len(self._prefijo(key)):-len(EXTENSION)] + '"'
+
+    def obtener(self, key: str, etag: str) -> pd.DataFrame | None:
+        ruta = self._ruta(key, etag)
+        try:
+            with open(ruta, "rb") as f:
+                df = leer_journal(f.read(), ruta)
+            os.utime(ruta)
+        except (OSError, ValueError):
+            return None
+        return df
+
+    def guardar(self, key: str, etag: str, df: pd.DataFrame) -> None:
+        """Guarda `df` como la versión `etag` de `key` (sustituye a las anteriores)."""
+        ruta = self._ruta(key, etag)
+        temporal = f"{ruta}.{uuid.uuid4().hex}.tmp"
+        with open(temporal, "wb") as f:
+            f.write(df_a_parquet(df))
+        with self._lock:
+            self._borrar_entradas(key)
+            os.replace(temporal, ruta)
+            self._recortar()
+
+    def _recortar(self) -> None:
+        entradas = [e for e in os.scandir(self.directorio) if e.name.endswith(EXTENSION)]
+        total = sum(e.stat().st_size for e in entradas)
+        for entrada in sorted(entradas, key=lambda e: e.stat().st_mtime):
+            if total <= self.max_bytes:
+                break
+            total -= entrada.stat().st_size
+            try:
+                os.remove(entrada.path)
+            except OSError:
+                pass
+
+    def _borrar_entradas(self, key: str) -> None:
+        for entrada in self._entradas(key):
+            try:
+                os.remove(entrada.path)
+            except OSError:
+                pass
+
+    def borrar(self, key: str) -> None:
+        with self._lock:
+            self._borrar_entradas(key)
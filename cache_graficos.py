@@ -0,0 +1,103 @@
+"""
+Caché de los datos preparados y las figuras de los gráficos comparativos.
+
+Los gráficos se dibujan en cada rerun aunque solo haya cambiado un widget
+de la barra lateral. Aquí se guarda lo que cada gráfico prepara (series
+filtradas, agregados, la figura de plotly) con la clave
+(versión del journal, rango de filas, gráfico, ajustes):
+  - la versión la fija ui.py con `version_graficos` alrededor de los
+    gráficos (PipelineIncremental.version(): cambia en cuanto cambia una
+    fila de las columnas que calcula o lee el pipeline, que son las que
+    usan los gráficos);
+  - el rango son la primera y la última fila del DataFrame que recibe el
+    gráfico (el slider rango_colN);
+  - los ajustes son los widgets del gráfico (exclusiones, series…).
+La caché es del proceso (dos sesiones con el mismo journal comparten las
+figuras) y descarta las entradas usadas hace más tiempo cuando pasa de
+config.CACHE_GRAFICOS_MAX. Una sesión que cambia sus datos no quita las
+de la versión anterior, porque otra sesión puede seguir mostrándola: las
+que nadie usa ya salen por el LRU. `invalidar` vacía la caché (o una
+versión) a mano. Sin versión (fuera de ui.py, p. ej. en los benchmarks)
+no se cachea nada.
+
+Lo que se guarda se comparte: quien lo reciba no debe modificarlo.
+"""
+
+import json
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import pandas as pd
+
+import config
+
+_version = ContextVar('version_graficos', default=None)
+
+
+class CacheGraficos:
+    def __init__(self, max_entradas: int):
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave: tuple, construir):
+        """Valor de `clave`, o el resultado de `construir()` (que se guarda)."""
+        with self._lock:
+            if clave in self._entradas:
+                self._entradas.move_to_end(clave)
+                return self._entradas[clave]
+        valor = construir()
+        with self._lock:
+            self._entradas[clave] = valor
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+        return valor
+
+    def invalidar(self, version: str | None = None) -> None:
+        """Quita las entradas de `version` (todas si es None)."""
+        with self._lock:
+            if version is None:
+                self._entradas.clear()
+            else:
+                for clave in [c for c in self._entradas if c[0] == version]:
+                    del self._entradas[clave]
+
+
+# Caché del proceso
+cache = CacheGraficos(config.CACHE_GRAFICOS_MAX)
+
+
+@contextmanager
+def version_graficos(version: str | None):
+    """Los gráficos que se dibujen dentro cachean con esta versión del journal."""
+    token = _version.set(version)
+    try:
+        yield
+    finally:
+        _version.reset(token)
+
+
+def _rango(df: pd.DataFrame) -> tuple:
+    if df.empty:
+        return (None, None, 0)
+    return (df.index[0], df.index[-1], len(df))
+
+
+def memo_grafico(nombre: str, df: pd.DataFrame, ajustes, construir):
+    """
+    Resultado de `construir()` para el gráfico `nombre` sobre `df` con
+    `ajustes` (cualquier valor serializable a JSON), reutilizado mientras
+    no cambien la versión del journal, el rango de df ni los ajustes.
+    """
+    version = _version.get()
+    if version is None or config.CACHE_GRAFICOS_MAX <= 0:
+        return construir()
+    clave = (version, _rango(df), nombre, json.dumps(ajustes, sort_keys=True, default=str))
+    return cache.obtener(clave, construir)
+
+
+def invalidar(version: str | None = None) -> None:
+    """Quita de la caché las entradas de `version` (todas si es None)."""
+    cache.invalidar(version)
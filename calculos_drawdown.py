@@ -0,0 +1,177 @@
+"""
+Motor vectorizado de drawdown sobre el balance acumulado ('Profit Tot.').
+
+Una sola pasada con máximos acumulados (np.maximum.accumulate) y
+acumulados que se reinician por tramo (_acumular_por_tramos) en lugar de
+recorrer el balance fila a fila. calcular_dd_max, calcular_dd_up y
+calcular_estado_acumulado de calculos_tabla_principal son envoltorios finos
+sobre calcular_drawdown.
+
+Sobre la serie DD/Max ya calculada, rachas_signo, episodios_drawdown y
+top_k dan las rachas y los episodios de caída/subida (inicio, fin,
+extremo, duración, operaciones) sin bucles por fila; los usan los
+gráficos DD/Max y Racha Operaciones DD/Max.
+"""
+
+import numpy as np
+
+
+def _acumular_por_tramos(ufunc, valores: np.ndarray, reinicio: np.ndarray) -> np.ndarray:
+    """
+    ufunc.accumulate de `valores` que vuelve a empezar en cada True de
+    `reinicio`. Los tramos del mismo largo se apilan en una matriz y se
+    acumulan por filas, así el orden de las operaciones es el de un bucle
+    (mismo resultado en coma flotante) y solo se itera por largo distinto.
+    """
+    n = len(valores)
+    res = np.empty(n)
+    if n == 0:
+        return res
+    inicios = np.flatnonzero(reinicio)
+    if not len(inicios) or inicios[0] != 0:
+        inicios = np.concatenate([[0], inicios])
+    largos = np.diff(np.append(inicios, n))
+    orden = np.argsort(largos, kind='stable')
+    largos, inicios = largos[orden], inicios[orden]
+    cortes = np.flatnonzero(np.diff(largos)) + 1
+    for desde, hasta in zip(np.concatenate([[0], cortes]), np.append(cortes, len(largos))):
+        filas = inicios[desde:hasta, None] + np.arange(largos[desde])
+        res[filas] = ufunc.accumulate(valores[filas], axis=1)
+    return res
+
+
+def calcular_drawdown(balances, pico_inicial: float = 0.0, acumulado_inicial: float = 0.0) -> dict:
+    """
+    Calcula, para cada fila del balance, los arrays:
+      - 'drawdown':  caída % desde el máximo histórico (negativa), con la
+                     semántica de calcular_dd_max: NaN en filas sin valor,
+                     en nuevos máximos, con caída 0 o si el máximo es <= 0.
+      - 'drawup':    acumulado de racha de calcular_dd_up: variación % contra
+                     el máximo previo; los positivos se suman y cada valor
+                     <= 0 reinicia el acumulado. NaN mientras no hay máximo
+                     previo positivo. Las filas sin valor cuentan como 0.
+      - 'pico':      máximo histórico tras la fila (mínimo `pico_inicial`).
+      - 'idx_pico':  posición de la fila que marcó el máximo vigente
+                     (-1 si viene de `pico_inicial`).
+      - 'idx_valle': posición del balance mínimo desde ese máximo.
+      - 'bajo_agua': filas transcurridas desde el máximo vigente (0 en él).
+    `pico_inicial` y `acumulado_inicial` permiten continuar desde el estado
+    de la fila anterior (ver calcular_estado_acumulado).
+    """
+    bal = np.asarray(balances, dtype=float)
+    n = len(bal)
+    posiciones = np.arange(n)
+    validos = ~np.isnan(bal)
+    bal0 = np.where(validos, bal, 0.0)
+
+    # Máximo histórico antes y después de cada fila (las filas sin valor no
+    # lo mueven: el pico inicial ya es >= 0)
+    pico = np.maximum.accumulate(np.concatenate([[pico_inicial], bal0]))
+    pico_prev, pico = pico[:-1], pico[1:]
+
+    # Drawdown (calcular_dd_max): en un nuevo máximo la caída es 0 -> NaN
+    drawdown = np.full(n, np.nan)
+    con_caida = validos & (pico > 0)
+    drawdown[con_caida] = -((pico[con_caida] - bal[con_caida]) / pico[con_caida] * 100)
+    drawdown[drawdown == 0] = np.nan
+
+    # Drawup (calcular_dd_up): variación contra el máximo previo y suma por
+    # tramos; cada dd <= 0 abre un tramo nuevo que empieza en ese valor
+    con_max = pico_prev > 0
+    raw_dd = np.zeros(n)
+    raw_dd[con_max] = (bal0[con_max] - pico_prev[con_max]) / pico_prev[con_max] * 100
+    reinicio = con_max & (raw_dd <= 0)
+    if n and not reinicio[0]:
+        raw_dd[0] = acumulado_inicial + raw_dd[0]
+    drawup = _acumular_por_tramos(np.add, raw_dd, reinicio)
+    drawup[~con_max] = np.nan
+
+    # Máximo vigente, valle desde ese máximo y tiempo bajo el agua
+    es_pico = validos & (bal > pico_prev)
+    idx_pico = np.maximum.accumulate(np.where(es_pico, posiciones, -1)) if n else posiciones
+    bal_min = np.where(validos, bal, np.inf)
+    minimo = _acumular_por_tramos(np.minimum, bal_min, es_pico)
+    minimo_prev = np.concatenate([[np.inf], minimo[:-1]]) if n else minimo
+    nuevo_valle = es_pico | (bal_min < minimo_prev)
+    if n:
+        nuevo_valle[0] = True
+    idx_valle = np.maximum.accumulate(np.where(nuevo_valle, posiciones, -1)) if n else posiciones
+
+    return {
+        'drawdown': drawdown,
+        'drawup': drawup,
+        'pico': pico,
+        'idx_pico': idx_pico,
+        'idx_valle': idx_valle,
+        'bajo_agua': posiciones - idx_pico,
+    }
+
+
+def rachas_signo(valores) -> tuple:
+    """
+    Codificación por rachas del signo de `valores` (1, -1 o 0; NaN cuenta
+    como 0): arrays (inicio, fin inclusive, signo) de cada racha.
+    """
+    v = np.asarray(valores, dtype=float)
+    signo = np.where(v > 0, 1, np.where(v < 0, -1, 0))
+    if not len(signo):
+        vacio = np.empty(0, dtype=np.int64)
+        return vacio, vacio, vacio
+    inicios = np.flatnonzero(np.r_[True, signo[1:] != signo[:-1]])
+    fines = np.r_[inicios[1:], len(signo)] - 1
+    return inicios, fines, signo[inicios]
+
+
+def top_k(valores, k: int = 5) -> np.ndarray:
+    """
+    Posiciones de los k mayores `valores`, de mayor a menor; a igualdad,
+    primero la posición más baja (como nlargest o un sorted estable).
+    Selecciona con argpartition: el orden solo se calcula para los k.
+    """
+    v = np.asarray(valores)
+    if len(v) > k > 0:
+        corte = v[np.argpartition(-v, k - 1)[:k]].min()
+        candidatas = np.flatnonzero(v >= corte)
+    else:
+        candidatas = np.arange(len(v) if k > 0 else 0)
+    orden = np.lexsort((candidatas, -v[candidatas]))
+    return candidatas[orden[:k]]
+
+
+def episodios_drawdown(dd, modo: str, fechas=None, es_operacion=None) -> dict:
+    """
+    Episodios de la serie DD/Max en una pasada: con modo 'ddw' las caídas
+    (racha de valores < 0), con 'dup' las subidas (> 0). Las filas sin
+    valor cuentan como 0. Cada episodio termina en la fila que lo cierra
+    (la primera fuera de la racha) o en la última si sigue abierto.
+    Devuelve arrays por episodio:
+      - 'inicio', 'fin': posiciones (fin incluida);
+      - 'extremo':  valor más bajo (ddw) o más alto (dup) de la racha;
+      - 'duracion': fechas[fin] - fechas[inicio] (timedelta64, NaT sin fechas);
+      - 'ops':      filas de inicio a fin con es_operacion (sumas prefijas;
+                    todas si no se pasa).
+    """
+    v = np.nan_to_num(np.asarray(dd, dtype=float), nan=0.0)
+    n = len(v)
+    inicios, fines, signos = rachas_signo(v)
+    objetivo = -1 if modo == 'ddw' else 1
+    en_modo = signos == objetivo
+    inicio, ultimo = inicios[en_modo], fines[en_modo]
+    fin = np.minimum(ultimo + 1, n - 1)
+
+    # reduceat reduce de un inicio al siguiente: las filas entre una racha
+    # y la siguiente tienen el otro signo (o 0) y no cambian el extremo
+    reducir = np.minimum if modo == 'ddw' else np.maximum
+    extremo = reducir.reduceat(v, inicio) if len(inicio) else np.empty(0)
+
+    if fechas is None:
+        duracion = np.full(len(inicio), np.timedelta64('NaT'), dtype='timedelta64[ns]')
+    else:
+        f = np.asarray(fechas, dtype='datetime64[ns]')
+        duracion = f[fin] - f[inicio]
+
+    acumuladas = np.concatenate([[0], np.cumsum(
+        np.ones(n, dtype=np.int64) if es_operacion is None else np.asarray(es_operacion, dtype=np.int64)
+    )])
+    ops = acumuladas[fin + 1] - acumuladas[inicio]
+    return {'inicio': inicio, 'fin': fin, 'extremo': extremo, 'duracion': duracion, 'ops': ops}
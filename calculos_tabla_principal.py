@@ -1,14 +1,15 @@
 import pandas as pd
 import numpy as np
 
+from calculos_drawdown import calcular_drawdown
+
 def calcular_porcentaje_profit_op(df: pd.DataFrame) -> pd.DataFrame:
     """
     Calcula la columna '% Profit. Op' como:
-      (STRK Sell - STRK Buy) / STRK Buy * 100, con 2 decimales y sufijo '%'.
-    Solo se añade para filas válidas; deja vacías las demás.
-    - El resultado exacto 0.00% se muestra como '0.00%'.
-    - '-0.00%' se normaliza a '0.00%'.
+      (STRK Sell - STRK Buy) / STRK Buy * 100, redondeado a 2 decimales.
+    Solo se añade para filas válidas; deja NaN en las demás.
     - Solo calcula cuando ambos STRK Buy y STRK Sell tienen valor y STRK Buy != 0.
+    - El formato con sufijo '%' se aplica al mostrar (aplicar_color_general).
     """
     df = df.copy()
     # Asegurarse de que existan ambas columnas
@@ -19,14 +20,10 @@ def calcular_porcentaje_profit_op(df: pd.DataFrame) -> pd.DataFrame:
             df['STRK Sell'].notna() &
             (df['STRK Buy'] != 0)
         )
-        pct = pd.Series('', index=df.index, dtype=str)
+        pct = pd.Series(np.nan, index=df.index, dtype=float)
         # Cálculo solo en filas válidas
         dif = df.loc[mask, 'STRK Sell'] - df.loc[mask, 'STRK Buy']
-        pct_vals_num = dif.div(df.loc[mask, 'STRK Buy']).mul(100)
-        pct_str = pct_vals_num.map(lambda x: f"{x:.2f}%")
-        # Normalizar '-0.00%' a '0.00%'
-        pct_str = pct_str.astype(str).str.replace(r'^-0\\.00%$', '0.00%', regex=True)
-        pct.loc[mask] = pct_str
+        pct.loc[mask] = dif.div(df.loc[mask, 'STRK Buy']).mul(100).round(2)
         df['% Profit. Op'] = pct
     return df
 
@@ -48,24 +45,19 @@ def calcular_profit_operacion(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def calcular_profit_total(df: pd.DataFrame) -> pd.DataFrame:
+def calcular_profit_total(df: pd.DataFrame, previo: dict | None = None) -> pd.DataFrame:
     """
     Añade al DataFrame una columna 'Profit Tot.' con la suma acumulativa
-    de la columna 'Profit', formateada sin ceros innecesarios.
-    Si 'Profit' es None o NaN, deja el valor correspondiente como None.
+    de la columna 'Profit' (float, redondeada a 2 decimales).
+    Si 'Profit' es None o NaN, deja el valor correspondiente como NaN.
+    Con `previo` (ver calcular_estado_acumulado) la suma continúa desde
+    previo['suma'], para recalcular solo un sufijo de la tabla.
     """
     df = df.copy()
     if 'Profit' in df.columns:
         profit = pd.to_numeric(df['Profit'], errors='coerce')
-        tot = profit.cumsum()
-        res = pd.Series([None] * len(df), index=df.index, dtype=object)
-        for idx in df.index:
-            if pd.isna(df.loc[idx, 'Profit']) or df.loc[idx, 'Profit'] is None:
-                res.loc[idx] = None
-            else:
-                val = tot.loc[idx]
-                res.loc[idx] = int(val) if val == int(val) else round(val, 2)
-        df['Profit Tot.'] = res
+        tot = _cumsum_desde(profit, previo['suma'] if previo is not None else None)
+        df['Profit Tot.'] = tot.round(2).where(profit.notna()).astype(float)
     return df
 
 
@@ -73,48 +65,23 @@ import pandas as pd
 
 import pandas as pd
 
-def calcular_dd_max(df: pd.DataFrame) -> pd.DataFrame:
+def calcular_dd_max(df: pd.DataFrame, previo: dict | None = None) -> pd.DataFrame:
     """
     Añade al DataFrame una columna 'DD/Max' que indica, para cada fila,
     la caída máxima (drawdown) desde el máximo histórico del balance
-    acumulado ('Profit Tot.'), expresada como porcentaje negativo o None
-    en fila posteriores al último dato válido en 'Profit Tot.'.
-    - Para filas intermedias sin valor deja cadena vacía.
-    - Para filas posteriores a la última con dato, asigna None.
+    acumulado ('Profit Tot.'), expresada como porcentaje negativo (float
+    redondeado a 2 decimales).
+    - Deja NaN en las filas sin caída (nuevo máximo o caída 0), en las
+      filas sin valor y en las posteriores al último dato válido.
+    - Con `previo`, el máximo histórico parte de previo['pico'].
     """
     if 'Profit Tot.' not in df.columns:
         raise KeyError("Falta la columna 'Profit Tot.'")
 
     df = df.copy()
-    orig = df['Profit Tot.']
     balances = pd.to_numeric(df['Profit Tot.'], errors='coerce')
-
-    # Índice de la última fila con valor en 'Profit Tot.'
-    valid_indices = [i for i, val in enumerate(orig)
-                     if not (pd.isna(val) or (isinstance(val, str) and val.strip() == ''))]
-    last_valid = valid_indices[-1] if valid_indices else -1
-
-    max_balance = 0.0
-    dd_list = []
-    for i, (val, bal) in enumerate(zip(orig, balances)):
-        # Filas sin dato en 'Profit Tot.'
-        if pd.isna(val) or (isinstance(val, str) and val.strip() == ''):
-            # None para filas posteriores al último dato; cadena vacía si es intermedia
-            dd_list.append(None if i > last_valid else '')
-            continue
-
-        # Cálculo de drawdown
-        if bal > max_balance:
-            max_balance = bal
-            dd_list.append('')
-        else:
-            if max_balance > 0:
-                dd = ((max_balance - bal) / max_balance) * 100
-                dd_list.append(f"-{dd:.2f}%" if dd != 0 else '')
-            else:
-                dd_list.append('')
-
-    df['DD/Max'] = dd_list
+    dd = calcular_drawdown(balances, previo['pico'] if previo is not None else 0.0)
+    df['DD/Max'] = pd.Series(np.round(dd['drawdown'], 2), index=df.index)
     return df
 
 
@@ -122,63 +89,40 @@ def calcular_dd_max(df: pd.DataFrame) -> pd.DataFrame:
 
 import pandas as pd
 
-def calcular_dd_up(df: pd.DataFrame) -> pd.DataFrame:
+def calcular_dd_up(df: pd.DataFrame, previo: dict | None = None) -> pd.DataFrame:
     """
     Igual que antes: mantiene la lógica de máximo histórico y no sobreescribe
-    valores previos de 'DD/Max'. Ahora, además, cada vez que el raw_dd sea
-    0 o negativo, reinicia el acumulado de porcentaje para mostrar los picos
-    de cada racha alcista.
+    valores previos de 'DD/Max' (solo rellena los NaN). Ahora, además, cada
+    vez que el raw_dd sea 0 o negativo, reinicia el acumulado de porcentaje
+    para mostrar los picos de cada racha alcista.
+    Las filas posteriores al último 'Profit Tot.' válido quedan en NaN.
+    Con `previo`, el máximo y el acumulado parten de previo['pico'] y
+    previo['acumulado'].
     """
     if 'Profit Tot.' not in df.columns:
         raise KeyError("Falta la columna 'Profit Tot.'")
     df = df.copy()
 
-    # 1) Convertir balances
-    balances = pd.to_numeric(df['Profit Tot.'], errors='coerce').fillna(0.0)
+    # 1-3) Variación contra el máximo histórico previo, acumulando los
+    #      positivos y reseteando cuando dd <= 0 (ver calcular_drawdown)
+    balances = pd.to_numeric(df['Profit Tot.'], errors='coerce')
+    dd = calcular_drawdown(
+        balances,
+        previo['pico'] if previo is not None else 0.0,
+        previo['acumulado'] if previo is not None else 0.0
+    )
 
-    # 2) Calcular raw_dd con respecto al máximo histórico (puede ser + o −)
-    max_balance_prev = 0.0
-    raw_dd = []
-    for bal in balances:
-        if max_balance_prev > 0:
-            dd = (bal - max_balance_prev) / max_balance_prev * 100
-            raw_dd.append(dd)
-        else:
-            raw_dd.append(None)
-        if bal > max_balance_prev:
-            max_balance_prev = bal
-
-    # 3) Acumular solo los positivos, y resetear cuando dd <= 0
-    acumulado = 0.0
-    cum_dd = []
-    for dd in raw_dd:
-        if dd is None:
-            # primera fila o balance 0
-            cum_dd.append(None)
-        elif dd > 0:
-            acumulado += dd
-            cum_dd.append(acumulado)
-        else:
-            # dd == 0 o negativo => resetea el acumulado a ese valor
-            acumulado = dd
-            cum_dd.append(acumulado)
-
-    # 4) Formatear como cadena con dos decimales y sufijo '%'
-    formatted_dd = [
-        f"{x:.2f}%" if x is not None else ''
-        for x in cum_dd
-    ]
-
-    # 5) No sobreescribir valores manuales o anteriores en 'DD/Max'
-    orig_dd = df.get('DD/Max', pd.Series('', index=df.index))
-    new_dd = []
-    for orig, nuevo in zip(orig_dd, formatted_dd):
-        if nuevo and orig in ['', '0%', '0.00%']:
-            new_dd.append(nuevo)
-        else:
-            new_dd.append(orig)
+    # 4) Redondear a dos decimales, como se muestra en la tabla
+    nuevo_dd = pd.Series(np.round(dd['drawup'], 2), index=df.index)
+
+    # 5) No sobreescribir valores manuales o anteriores en 'DD/Max', ni
+    #    rellenar las filas posteriores al último dato válido
+    orig_dd = pd.to_numeric(df.get('DD/Max', pd.Series(np.nan, index=df.index)), errors='coerce')
+    validos = np.flatnonzero(balances.notna())
+    posteriores = np.arange(len(df)) > (validos[-1] if len(validos) else -1)
+    rellenar = orig_dd.isna().to_numpy() & nuevo_dd.notna().to_numpy() & ~posteriores
 
-    df['DD/Max'] = new_dd
+    df['DD/Max'] = orig_dd.where(~rellenar, nuevo_dd).astype(float)
     return df
 
 
@@ -186,60 +130,81 @@ def calcular_dd_up(df: pd.DataFrame) -> pd.DataFrame:
 import numpy as np
 import pandas as pd
 
-def calcular_profit_t(df: pd.DataFrame) -> pd.DataFrame:
+def calcular_profit_t(df: pd.DataFrame, previo: dict | None = None) -> pd.DataFrame:
     """
     Añade o actualiza la columna 'Profit T.' con el porcentaje de variación
-    de 'Profit Tot.' respecto a la fila anterior, formateado con dos decimales
-    y sin signo '+' en los positivos.
+    de 'Profit Tot.' respecto a la fila anterior, como float redondeado a dos
+    decimales (el sufijo '%' se añade al mostrar la tabla).
 
-    - La primera fila (o si hay menos de 2 filas) se marca como '0%' si existe valor previo.
-    - Cualquier '0.00%' se normaliza a '0%'.
-    - Si 'Profit Tot.' está vacío o es NaN, se deja '' en 'Profit T.'.
+    - La primera fila (o si hay menos de 2 filas) vale 0 si existe valor previo.
+    - Si 'Profit Tot.' está vacío o es NaN, se deja NaN en 'Profit T.'.
     - Se evitan infinidad(es) convirtiéndolas en 0.
+    - Con `previo`, la primera fila se compara con previo['tot'] (el
+      'Profit Tot.' de la fila anterior al sufijo).
     """
     if 'Profit Tot.' not in df.columns:
         raise KeyError("Falta la columna 'Profit Tot.'")
     df = df.copy()
 
-    # Máscara para filas sin valor en 'Profit Tot.' (NaN o cadena vacía)
-    orig = df['Profit Tot.']
-    mask_empty = orig.isna() | orig.astype(str).str.strip().eq('')
-
-    # 1) Extraer y limpiar la serie numérica
-    tot = (
-        orig.astype(str)
-            .str.replace('[,%]', '', regex=True)
-            .pipe(pd.to_numeric, errors='coerce')
-    )
+    # 1) Serie numérica; las filas sin valor quedan en NaN
+    tot = pd.to_numeric(df['Profit Tot.'], errors='coerce')
+    mask_empty = tot.isna()
 
     # 2) Cálculo de porcentaje solo si al menos 2 valores numéricos
-    pct = tot.diff().divide(tot.shift(1))
+    anterior = tot.shift(1)
+    if previo is not None and len(anterior) > 0:
+        anterior.iloc[0] = previo['tot']
+    pct = (tot - anterior).divide(anterior)
     pct = pct.replace([np.inf, -np.inf], np.nan).fillna(0).mul(100).round(2)
 
-    # 3) Formateo: siempre con dos decimales y %, sin '+' para positivos
-    formatted = pct.map(lambda x: f"{x:.2f}%").replace({'0.00%': '0%'})
-
-    # 4) Asignar resultados: en filas vacías, dejar cadena vacía;
-    #    en la primera fila (sin anterior), si no está vacío, poner '0%'
-    resultado = formatted.copy()
+    # 3) Asignar resultados: en filas vacías, dejar NaN;
+    #    en la primera fila (sin anterior), si no está vacío, poner 0
+    resultado = pct.astype(float)
     # Primera fila
-    if len(resultado) >= 1 and not mask_empty.iloc[0]:
-        resultado.iloc[0] = '0%'
-    # Filas vacías quedan ''
-    resultado[mask_empty] = ''
+    if previo is None and len(resultado) >= 1 and not mask_empty.iloc[0]:
+        resultado.iloc[0] = 0.0
+    # Filas vacías quedan NaN
+    resultado[mask_empty] = np.nan
 
     df['Profit T.'] = resultado
     return df
 
 
 
-def calcular_profit_alcanzado_vectorizado(df: pd.DataFrame) -> pd.DataFrame:
+def _cumsum_desde(serie: pd.Series, inicial: float | None) -> pd.Series:
+    """
+    cumsum de la serie continuando desde `inicial`, sumando en el mismo orden
+    que un cumsum sobre la tabla completa (mismo resultado en coma flotante).
+    """
+    if inicial is None:
+        return serie.cumsum()
+    res = pd.concat([pd.Series([inicial]), serie], ignore_index=True).cumsum().iloc[1:]
+    res.index = serie.index
+    return res
+
+
+def _incremento_meta(df: pd.DataFrame, col_pct: str) -> pd.Series:
+    """
+    Incremento por fila de las metas: STRK Buy * (col_pct / 100) * #Cont.
+    """
+    buy = pd.to_numeric(df['STRK Buy'], errors='coerce').fillna(0.0)
+    pct = (
+        pd.to_numeric(df[col_pct].astype(str).str.rstrip('%'), errors='coerce')
+          .div(100)
+          .fillna(0.0)
+    )
+    cont = pd.to_numeric(df['#Cont'], errors='coerce').fillna(0.0)
+    return buy.mul(pct).mul(cont)
+
+
+def calcular_profit_alcanzado_vectorizado(df: pd.DataFrame, previo: dict | None = None) -> pd.DataFrame:
     """
     Calcula la columna 'Profit Alcanzado' de forma vectorizada:
       - Profit Alcanzado[0] = Profit Tot.[0]
       - Para i > 0:
           Profit Alcanzado[i] = Profit Alcanzado[i‑1]
                                + STRK Buy[i] * (% Alcanzado[i] / 100) * #Cont[i]
+    Con `previo`, la suma de incrementos continúa desde previo['inc_alcanzado'].
     """
     required = ['Profit Tot.', 'STRK Buy', '% Alcanzado', '#Cont']
     for col in required:
@@ -247,40 +212,28 @@ def calcular_profit_alcanzado_vectorizado(df: pd.DataFrame) -> pd.DataFrame:
             raise KeyError(f"Falta la columna '{col}'")
     df = df.copy()
     # Normalizar y convertir
-    tot = pd.to_numeric(
-        df['Profit Tot.'].astype(str).str.replace('[,%]', '', regex=True),
-        errors='coerce'
-    ).fillna(0.0)
-    buy = pd.to_numeric(df['STRK Buy'], errors='coerce').fillna(0.0)
-    pct_alc = (
-        df['% Alcanzado'].astype(str)
-          .str.rstrip('%')
-          .replace('', '0')
-          .astype(float)
-          .div(100)
-          .fillna(0.0)
-    )
-    cont = pd.to_numeric(df['#Cont'], errors='coerce').fillna(0.0)
+    tot = pd.to_numeric(df['Profit Tot.'], errors='coerce').fillna(0.0)
     # Incremento por fila vectorizado
-    inc = buy.mul(pct_alc).mul(cont)
-    cumsum_inc = inc.cumsum()
-    primera_meta = tot.iloc[0] if len(tot) > 0 else 0.0
-    ajuste = cumsum_inc.iloc[0] if len(cumsum_inc) > 0 else 0.0
-    df['Profit Alcanzado'] = (
-        (cumsum_inc - ajuste + primera_meta)
-        .round(2)
-        .map(lambda x: f"{x:.2f}")
-    )
+    inc = _incremento_meta(df, '% Alcanzado')
+    if previo is not None:
+        cumsum_inc = _cumsum_desde(inc, previo['inc_alcanzado'])
+        primera_meta, ajuste = previo['meta'], previo['ajuste_alcanzado']
+    else:
+        cumsum_inc = inc.cumsum()
+        primera_meta = tot.iloc[0] if len(tot) > 0 else 0.0
+        ajuste = cumsum_inc.iloc[0] if len(cumsum_inc) > 0 else 0.0
+    df['Profit Alcanzado'] = (cumsum_inc - ajuste + primera_meta).round(2).astype(float)
     return df
 
 
-def calcular_profit_media_vectorizado(df: pd.DataFrame) -> pd.DataFrame:
+def calcular_profit_media_vectorizado(df: pd.DataFrame, previo: dict | None = None) -> pd.DataFrame:
     """
     Calcula la columna 'Profit Media' de forma vectorizada:
       - Profit Media[0] = Profit Tot.[0]
       - Para i > 0:
           Profit Media[i] = Profit Media[i‑1]
                               + STRK Buy[i] * (% Media[i] / 100) * #Cont[i]
+    Con `previo`, la suma de incrementos continúa desde previo['inc_media'].
     """
     required = ['Profit Tot.', 'STRK Buy', '% Media', '#Cont']
     for col in required:
@@ -288,28 +241,64 @@ def calcular_profit_media_vectorizado(df: pd.DataFrame) -> pd.DataFrame:
             raise KeyError(f"Falta la columna '{col}'")
     df = df.copy()
     # Normalizar y convertir
-    tot = pd.to_numeric(
-        df['Profit Tot.'].astype(str).str.replace('[,%]', '', regex=True),
-        errors='coerce'
-    ).fillna(0.0)
-    buy = pd.to_numeric(df['STRK Buy'], errors='coerce').fillna(0.0)
-    pct_med = (
-        df['% Media'].astype(str)
-          .str.rstrip('%')
-          .replace('', '0')
-          .astype(float)
-          .div(100)
-          .fillna(0.0)
-    )
-    cont = pd.to_numeric(df['#Cont'], errors='coerce').fillna(0.0)
+    tot = pd.to_numeric(df['Profit Tot.'], errors='coerce').fillna(0.0)
     # Incremento por fila vectorizado
-    inc = buy.mul(pct_med).mul(cont)
-    cumsum_inc = inc.cumsum()
-    primera_meta = tot.iloc[0] if len(tot) > 0 else 0.0
-    ajuste = cumsum_inc.iloc[0] if len(cumsum_inc) > 0 else 0.0
-    df['Profit Media'] = (
-        (cumsum_inc - ajuste + primera_meta)
-        .round(2)
-        .map(lambda x: f"{x:.2f}")
-    )
+    inc = _incremento_meta(df, '% Media')
+    if previo is not None:
+        cumsum_inc = _cumsum_desde(inc, previo['inc_media'])
+        primera_meta, ajuste = previo['meta'], previo['ajuste_media']
+    else:
+        cumsum_inc = inc.cumsum()
+        primera_meta = tot.iloc[0] if len(tot) > 0 else 0.0
+        ajuste = cumsum_inc.iloc[0] if len(cumsum_inc) > 0 else 0.0
+    df['Profit Media'] = (cumsum_inc - ajuste + primera_meta).round(2).astype(float)
     return df
+
+
+def calcular_estado_acumulado(df: pd.DataFrame, previo: dict | None = None) -> pd.DataFrame:
+    """
+    Devuelve, para cada fila, el estado de los cálculos acumulativos tras
+    procesarla, con las columnas:
+      - 'suma':      suma acumulada de 'Profit' (NaN cuenta como 0).
+      - 'pico':      máximo histórico del balance 'Profit Tot.' (mínimo 0).
+      - 'acumulado': acumulado de racha de calcular_dd_up.
+      - 'inc_alcanzado' / 'inc_media': suma acumulada de incrementos de las metas.
+      - 'meta', 'ajuste_alcanzado', 'ajuste_media': constantes de la primera fila.
+    La fila i-1 es el `previo` para recalcular desde la fila i con
+    calcular_profit_total, calcular_dd_max, calcular_dd_up y las metas.
+    Con `previo`, df es un sufijo y el estado continúa desde él.
+    """
+    n = len(df)
+    estado = pd.DataFrame(index=df.index)
+    profit = pd.to_numeric(df.get('Profit', pd.Series(np.nan, index=df.index)), errors='coerce')
+    estado['suma'] = _cumsum_desde(profit.fillna(0.0), previo['suma'] if previo is not None else None)
+
+    if 'Profit Tot.' in df.columns:
+        tot = pd.to_numeric(df['Profit Tot.'], errors='coerce')
+    else:
+        tot = np.full(n, np.nan)
+    acumulado_inicial = previo['acumulado'] if previo is not None else 0.0
+    dd = calcular_drawdown(tot, previo['pico'] if previo is not None else 0.0, acumulado_inicial)
+    estado['pico'] = dd['pico']
+    # Mientras no hay máximo positivo el acumulado de racha no cambia
+    estado['acumulado'] = np.where(np.isnan(dd['drawup']), acumulado_inicial, dd['drawup'])
+
+    if previo is not None:
+        estado['meta'] = previo['meta']
+    else:
+        estado['meta'] = pd.to_numeric(
+            df['Profit Tot.'], errors='coerce'
+        ).fillna(0.0).iloc[0] if n and 'Profit Tot.' in df.columns else 0.0
+    for nombre, col_pct in (('alcanzado', '% Alcanzado'), ('media', '% Media')):
+        if n and all(c in df.columns for c in ['STRK Buy', col_pct, '#Cont']):
+            inc = _incremento_meta(df, col_pct)
+            if previo is not None:
+                estado[f'inc_{nombre}'] = _cumsum_desde(inc, previo[f'inc_{nombre}'])
+                estado[f'ajuste_{nombre}'] = previo[f'ajuste_{nombre}']
+            else:
+                estado[f'inc_{nombre}'] = inc.cumsum()
+                estado[f'ajuste_{nombre}'] = estado[f'inc_{nombre}'].iloc[0]
+        else:
+            estado[f'inc_{nombre}'] = np.nan
+            estado[f'ajuste_{nombre}'] = np.nan
+    return estado
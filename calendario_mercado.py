@@ -0,0 +1,169 @@
+"""
+Calendario de negociación para las duraciones en tiempo hábil ('T. Op',
+'Dia LIVE', 'Tiempo D/R').
+
+obtener_calendario() construye el calendario una sola vez por proceso: los
+festivos del NYSE quedan en un np.busdaycalendar, así np.busday_count y
+np.is_busday los excluyen sin bucles, y los cierres anticipados (13:00) en
+un array ordenado para el modo de solo sesión regular.
+No incluye los cierres extraordinarios (duelos nacionales, 11-S, huracanes).
+"""
+
+import datetime as dt
+from functools import lru_cache
+
+import numpy as np
+
+NS_DIA = 24 * 3600 * 10**9
+NS_HORA = 3600 * 10**9
+
+# Sesión regular del NYSE (hora de Nueva York) en ns desde medianoche
+APERTURA = 9 * NS_HORA + 30 * 60 * 10**9
+CIERRE = 16 * NS_HORA
+CIERRE_ANTICIPADO = 13 * NS_HORA
+
+# Años para los que se generan festivos
+ANIO_DESDE, ANIO_HASTA = 1990, 2060
+
+
+def _domingo_pascua(anio: int) -> dt.date:
+    """Domingo de Pascua (calendario gregoriano, algoritmo de Meeus)."""
+    a, b, c = anio % 19, anio // 100, anio % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes = (h + l - 7 * m + 114) // 31
+    dia = (h + l - 7 * m + 114) % 31 + 1
+    return dt.date(anio, mes, dia)
+
+
+def _n_esimo(anio: int, mes: int, dia_semana: int, n: int) -> dt.date:
+    """n-ésimo `dia_semana` (0 = lunes) del mes; n = -1 para el último."""
+    if n > 0:
+        primero = dt.date(anio, mes, 1)
+        return primero + dt.timedelta(days=(dia_semana - primero.weekday()) % 7 + 7 * (n - 1))
+    siguiente = dt.date(anio + mes // 12, mes % 12 + 1, 1)
+    ultimo = siguiente - dt.timedelta(days=1)
+    return ultimo - dt.timedelta(days=(ultimo.weekday() - dia_semana) % 7)
+
+
+def _observado(fecha: dt.date) -> dt.date:
+    """Festivo en sábado se observa el viernes; en domingo, el lunes."""
+    if fecha.weekday() == 5:
+        return fecha - dt.timedelta(days=1)
+    if fecha.weekday() == 6:
+        return fecha + dt.timedelta(days=1)
+    return fecha
+
+
+def festivos_nyse(anio: int) -> list:
+    """Días de mercado cerrado del NYSE en `anio` (reglas vigentes)."""
+    festivos = []
+    # Año Nuevo: si cae en sábado no se observa el viernes anterior
+    anio_nuevo = dt.date(anio, 1, 1)
+    if anio_nuevo.weekday() != 5:
+        festivos.append(_observado(anio_nuevo))
+    if anio >= 1998:
+        festivos.append(_n_esimo(anio, 1, 0, 3))              # Martin Luther King
+    festivos.append(_n_esimo(anio, 2, 0, 3))                  # Presidentes
+    festivos.append(_domingo_pascua(anio) - dt.timedelta(days=2))  # Viernes Santo
+    festivos.append(_n_esimo(anio, 5, 0, -1))                 # Memorial Day
+    if anio >= 2022:
+        festivos.append(_observado(dt.date(anio, 6, 19)))     # Juneteenth
+    festivos.append(_observado(dt.date(anio, 7, 4)))          # Independencia
+    festivos.append(_n_esimo(anio, 9, 0, 1))                  # Labor Day
+    festivos.append(_n_esimo(anio, 11, 3, 4))                 # Acción de Gracias
+    festivos.append(_observado(dt.date(anio, 12, 25)))        # Navidad
+    return festivos
+
+
+def cierres_anticipados_nyse(anio: int) -> list:
+    """Días con cierre a las 13:00: 3 de julio, viernes tras Acción de Gracias y 24 de diciembre."""
+    cierres = [_n_esimo(anio, 11, 3, 4) + dt.timedelta(days=1)]
+    # 3 de julio y 24 de diciembre solo de lunes a jueves: en viernes son festivo observado
+    for fecha in (dt.date(anio, 7, 3), dt.date(anio, 12, 24)):
+        if fecha.weekday() <= 3:
+            cierres.append(fecha)
+    return cierres
+
+
+class CalendarioMercado:
+    """
+    Días hábiles (lunes a viernes menos festivos) y horario de sesión.
+    tiempo_habil_ns trabaja sobre columnas completas con np.busday_count.
+    """
+
+    def __init__(self, festivos=(), cierres_anticipados=(),
+                 apertura: int = APERTURA, cierre: int = CIERRE,
+                 cierre_anticipado: int = CIERRE_ANTICIPADO):
+        self.festivos = np.array(sorted(festivos), dtype='datetime64[D]')
+        self.cierres_anticipados = np.array(sorted(cierres_anticipados), dtype='datetime64[D]')
+        self.busdaycal = np.busdaycalendar(weekmask='1111100', holidays=self.festivos)
+        self.apertura = apertura
+        self.cierre = cierre
+        self.cierre_anticipado = cierre_anticipado
+
+    def es_habil(self, dias: np.ndarray) -> np.ndarray:
+        return np.is_busday(dias, busdaycal=self.busdaycal)
+
+    def _cierre_del_dia(self, dias: np.ndarray) -> np.ndarray:
+        if not len(self.cierres_anticipados):
+            return np.full(len(dias), self.cierre)
+        pos = np.searchsorted(self.cierres_anticipados, dias).clip(max=len(self.cierres_anticipados) - 1)
+        anticipado = self.cierres_anticipados[pos] == dias
+        return np.where(anticipado, self.cierre_anticipado, self.cierre)
+
+    def _cierres_anticipados_entre(self, desde: np.ndarray, hasta: np.ndarray) -> np.ndarray:
+        """Cierres anticipados en [desde, hasta) por fila."""
+        return (np.searchsorted(self.cierres_anticipados, hasta)
+                - np.searchsorted(self.cierres_anticipados, desde))
+
+    def tiempo_habil_ns(self, ini: np.ndarray, fin: np.ndarray, solo_sesion: bool = False) -> np.ndarray:
+        """
+        Nanosegundos hábiles entre `ini` y `fin` (datetime64[ns]):
+          días hábiles completos en [día de ini, día de fin) con np.busday_count,
+          menos lo transcurrido del día de ini antes de ini (si ese día es hábil),
+          más lo transcurrido del día de fin hasta fin (si ese día es hábil).
+        Con `solo_sesion` cada día hábil aporta solo su sesión regular
+        (apertura a cierre, o cierre anticipado). Negativo si fin < ini.
+        """
+        dia_ini = ini.astype('datetime64[D]')
+        dia_fin = fin.astype('datetime64[D]')
+        hora_ini = (ini - dia_ini).astype(np.int64)
+        hora_fin = (fin - dia_fin).astype(np.int64)
+        habil_ini = self.es_habil(dia_ini)
+        habil_fin = self.es_habil(dia_fin)
+        completos = np.busday_count(dia_ini, dia_fin, busdaycal=self.busdaycal).astype(np.int64)
+
+        if not solo_sesion:
+            antes_ini = np.where(habil_ini, hora_ini, 0)
+            hasta_fin = np.where(habil_fin, hora_fin, 0)
+            return completos * NS_DIA - antes_ini + hasta_fin
+
+        sesion = self.cierre - self.apertura
+        recorte = self.cierre - self.cierre_anticipado
+        total = completos * sesion - self._cierres_anticipados_entre(dia_ini, dia_fin) * recorte
+        antes_ini = np.clip(hora_ini, self.apertura, self._cierre_del_dia(dia_ini)) - self.apertura
+        hasta_fin = np.clip(hora_fin, self.apertura, self._cierre_del_dia(dia_fin)) - self.apertura
+        return total - np.where(habil_ini, antes_ini, 0) + np.where(habil_fin, hasta_fin, 0)
+
+
+@lru_cache(maxsize=None)
+def obtener_calendario(mercado: str | None = 'NYSE') -> CalendarioMercado:
+    """
+    Calendario del `mercado`, construido una vez por proceso.
+    Con None solo se excluyen los fines de semana.
+    """
+    if mercado is None:
+        return CalendarioMercado()
+    if mercado != 'NYSE':
+        raise ValueError(f"Calendario de mercado desconocido: {mercado}")
+    anios = range(ANIO_DESDE, ANIO_HASTA + 1)
+    return CalendarioMercado(
+        festivos=[f for anio in anios for f in festivos_nyse(anio)],
+        cierres_anticipados=[c for anio in anios for c in cierres_anticipados_nyse(anio)],
+    )
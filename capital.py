@@ -1,31 +1,26 @@
 import pandas as pd
 import streamlit as st
 
+from estadisticas_operaciones import EstadisticasOperaciones, calcular_estadisticas
+
 
 def calcular_total_depositos(df: pd.DataFrame) -> float:
-    if 'Deposito' not in df.columns:
-        return 0.0
-    return pd.to_numeric(df['Deposito'], errors='coerce').fillna(0.0).sum()
+    return calcular_estadisticas(df).total_depositos
 
 
 def calcular_total_retiros(df: pd.DataFrame) -> float:
-    if 'Retiro' not in df.columns:
-        return 0.0
-    return pd.to_numeric(df['Retiro'], errors='coerce').fillna(0.0).abs().sum()
+    return calcular_estadisticas(df).total_retiros
 
 
 def calcular_ganancias_totales(df: pd.DataFrame) -> float:
-    profits = pd.to_numeric(df.get('Profit', pd.Series(dtype=float)), errors='coerce').fillna(0.0).sum()
-    deps = calcular_total_depositos(df)
-    rets = calcular_total_retiros(df)
-    return profits - deps + rets
+    return calcular_estadisticas(df).ganancias_totales
 
 
 def calcular_porcentaje_ganancia(tot_dep: float, tot_gan: float) -> float:
     return (tot_gan / tot_dep * 100) if tot_dep != 0 else float('inf')
 
 
-def render_tabla_capital(df: pd.DataFrame) -> None:
+def render_tabla_capital(df: pd.DataFrame, estadisticas: EstadisticasOperaciones | None = None) -> None:
     st.sidebar.markdown("### Capital")
     tabla = pd.DataFrame({
         'I. T. Capital':  ['$0.00'],
@@ -35,15 +30,13 @@ def render_tabla_capital(df: pd.DataFrame) -> None:
     })
 
     if not df.empty:
-        tot_dep = calcular_total_depositos(df)
-        tot_ret = calcular_total_retiros(df)
-        tot_gan = calcular_ganancias_totales(df)
-        pct_gan = calcular_porcentaje_ganancia(tot_dep, tot_gan)
+        if estadisticas is None:
+            estadisticas = calcular_estadisticas(df)
         tabla.loc[0] = [
-            f"${tot_dep:.2f}",
-            f"${tot_ret:.2f}",
-            f"${tot_gan:.2f}",
-            f"{pct_gan:.2f}%"
+            f"${estadisticas.total_depositos:.2f}",
+            f"${estadisticas.total_retiros:.2f}",
+            f"${estadisticas.ganancias_totales:.2f}",
+            f"{estadisticas.pct_ganancia:.2f}%"
         ]
 
     # Funciones de color por columna
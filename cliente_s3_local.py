@@ -0,0 +1,90 @@
+"""
+Cliente con la misma interfaz que el de boto3 (la parte que usa la app)
+sobre una carpeta local: cada bucket es un subdirectorio y cada clave un
+archivo. Respeta las escrituras condicionales de S3 (IfMatch, IfNoneMatch='*'
+en put_object). Sirve para desarrollar y probar el almacenamiento de journals sin
+AWS, p. ej. JournalParticionado(ClienteS3Local('/tmp/s3'), 'bucket', ...).
+"""
+
+import hashlib
+import os
+import threading
+import uuid
+from io import BytesIO
+
+from botocore.exceptions import ClientError
+
+
+def _no_existe(operacion: str, key: str) -> ClientError:
+    return ClientError(
+        {"Error": {"Code": "NoSuchKey", "Message": f"No existe {key}"}}, operacion
+    )
+
+
+def _precondicion(key: str) -> ClientError:
+    return ClientError(
+        {"Error": {"Code": "PreconditionFailed", "Message": f"{key} cambió"},
+         "ResponseMetadata": {"HTTPStatusCode": 412}}, "PutObject"
+    )
+
+
+def _etag(data: bytes) -> str:
+    return f'"{hashlib.md5(data).hexdigest()}"'
+
+
+class ClienteS3Local:
+    def __init__(self, raiz: str):
+        self.raiz = raiz
+        self._lock = threading.Lock()
+
+    def _ruta(self, bucket: str, key: str) -> str:
+        return os.path.join(self.raiz, bucket, *key.split("/"))
+
+    def put_object(self, Bucket: str, Key: str, Body, **kwargs) -> dict:
+        data = Body.read() if hasattr(Body, "read") else bytes(Body)
+        ruta = self._ruta(Bucket, Key)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        temporal = f"{ruta}.{uuid.uuid4().hex}.tmp"
+        with open(temporal, "wb") as f:
+            f.write(data)
+        with self._lock:
+            if "IfMatch" in kwargs or "IfNoneMatch" in kwargs:
+                actual = None
+                if os.path.isfile(ruta):
+                    with open(ruta, "rb") as f:
+                        actual = _etag(f.read())
+                if ("IfMatch" in kwargs and kwargs["IfMatch"] != actual) or (
+                        kwargs.get("IfNoneMatch") == "*" and actual is not None):
+                    os.remove(temporal)
+                    raise _precondicion(Key)
+            os.replace(temporal, ruta)
+        return {"ETag": _etag(data)}
+
+    def get_object(self, Bucket: str, Key: str, **kwargs) -> dict:
+        ruta = self._ruta(Bucket, Key)
+        if not os.path.isfile(ruta):
+            raise _no_existe("GetObject", Key)
+        with open(ruta, "rb") as f:
+            data = f.read()
+        etag = _etag(data)
+        if kwargs.get("IfNoneMatch") == etag:
+            # Lo mismo que boto3 ante un 304 Not Modified
+            raise ClientError({"Error": {"Code": "304", "Message": "Not Modified"}}, "GetObject")
+        return {"Body": BytesIO(data), "ContentLength": len(data), "ETag": etag}
+
+    def delete_object(self, Bucket: str, Key: str, **kwargs) -> dict:
+        ruta = self._ruta(Bucket, Key)
+        if os.path.isfile(ruta):
+            os.remove(ruta)
+        return {}
+
+    def list_objects_v2(self, Bucket: str, Prefix: str = "", **kwargs) -> dict:
+        base = os.path.join(self.raiz, Bucket)
+        contenido = []
+        for carpeta, _, archivos in os.walk(base):
+            for archivo in archivos:
+                key = os.path.relpath(os.path.join(carpeta, archivo), base).replace(os.sep, "/")
+                if key.startswith(Prefix) and not key.endswith(".tmp"):
+                    contenido.append({"Key": key, "Size": os.path.getsize(os.path.join(carpeta, archivo))})
+        contenido.sort(key=lambda obj: obj["Key"])
+        return {"Contents": contenido, "KeyCount": len(contenido)}
@@ -0,0 +1,281 @@
+"""
+Cola de guardado en segundo plano (write-behind), una por proceso.
+
+Los guardados se encargan con encolar_guardado(name, df, sesion=...) y los
+sube un único hilo de trabajo, así los botones no esperan a S3:
+  - varios encargos del mismo archivo y la misma sesión antes de que se
+    suba se agrupan en uno con la última copia del DataFrame (una ráfaga
+    de operaciones es un solo PUT); el primero fija cuándo se sube, los
+    siguientes no lo retrasan. Sesiones distintas nunca se agrupan.
+  - cada sesión guarda contra la versión del objeto que cargó (su base,
+    ver fijar_base_guardado): tras cada subida la base pasa a ser la nueva
+    versión, y si otro escritor cambió el objeto entretanto guardar_df
+    combina los cambios o falla con ConflictoGuardado. Tras combinar la
+    base no avanza hasta que la sesión adopta el DataFrame combinado (y
+    fija su base): mientras siga con sus datos anteriores, su siguiente
+    guardado vuelve a chocar y a combinar en lugar de pisar las filas
+    ajenas.
+  - si la subida falla se reintenta con espera exponencial (los conflictos
+    no se reintentan).
+  - el resultado queda en un mapa de estados protegido por un lock que la
+    sesión consulta con estado_guardado(name, sesion) en cada rerun. El
+    hilo nunca toca st.session_state.
+  - los estados y las bases no crecen con las sesiones: la sesión suelta
+    su estado con descartar_estado_guardado al leer el resultado, y los
+    que nadie lee (sesiones cerradas) caducan a las ESTADO_TTL_S; la base
+    de una sesión se sustituye al cargar otro archivo y caduca si no se
+    usa en BASE_TTL_S.
+"""
+
+import threading
+import time
+from datetime import datetime
+
+from concurrencia_journal import ConflictoGuardado
+
+# Segundos que espera un encargo antes de subirse (para agrupar ráfagas)
+RETARDO_S = 2.0
+
+# Reintentos tras un fallo y espera entre ellos: 1 s, 2 s, 4 s... hasta el máximo
+MAX_REINTENTOS = 5
+ESPERA_BASE_S = 1.0
+ESPERA_MAX_S = 60.0
+
+# Segundos que se guarda un estado terminado que nadie lee, y una base sin usar
+ESTADO_TTL_S = 3600.0
+BASE_TTL_S = 24 * 3600.0
+
+TERMINALES = ("guardado", "conflicto", "error")
+
+
+class ColaGuardado:
+    """
+    Cola de guardados pendientes por (nombre de archivo, sesión).
+    `guardar(name, df, base)` es la función que sube (por defecto
+    gestor_archivos_s3.guardar_df) y devuelve un dict con la nueva 'base'
+    y, si tuvo que combinar con cambios ajenos, el DataFrame 'combinado'.
+    Cada encargo recibe una versión creciente; el estado de cada
+    (archivo, sesión) es un dict con:
+      - 'estado':     'pendiente', 'guardando', 'reintentando', 'guardado',
+                      'conflicto' o 'error'.
+      - 'version':    última versión encargada.
+      - 'guardada':   última versión subida (0 si ninguna).
+      - 'ultimo_guardado': fecha y hora de la última subida correcta.
+      - 'combinado':  DataFrame combinado de la última subida, o None.
+      - 'base_combinada': base de lo escrito al combinar (la que fija la
+                      sesión si adopta 'combinado'), o None.
+      - 'error', 'intentos': último error y fallos seguidos.
+      - 'actualizado': time.monotonic() del último cambio.
+    """
+
+    def __init__(self, guardar, retardo: float = RETARDO_S, max_reintentos: int = MAX_REINTENTOS,
+                 espera_base: float = ESPERA_BASE_S, espera_max: float = ESPERA_MAX_S):
+        self._guardar = guardar
+        self.retardo = retardo
+        self.max_reintentos = max_reintentos
+        self.espera_base = espera_base
+        self.espera_max = espera_max
+        self._cond = threading.Condition()
+        self._pendientes = {}
+        self._estados = {}
+        self._bases = {}  # (archivo, sesión) -> (base, último uso)
+        self._en_curso = None
+        self._version = 0
+        self._hilo = None
+
+    def fijar_base(self, name: str, sesion, base) -> None:
+        """Versión del objeto contra la que guarda la sesión (al cargar el archivo)."""
+        with self._cond:
+            # La sesión deja el archivo anterior: su base ya no sirve
+            for clave in [c for c in self._bases if c[1] == sesion and c[0] != name]:
+                if not self._ocupada(clave):
+                    del self._bases[clave]
+            self._bases[(name, sesion)] = (base, time.monotonic())
+            self._podar()
+
+    def encolar(self, name: str, df, retardo: float | None = None, sesion=None) -> int:
+        """Encarga guardar `df` como `name` y devuelve la versión del encargo."""
+        retardo = self.retardo if retardo is None else retardo
+        clave = (name, sesion)
+        with self._cond:
+            self._version += 1
+            listo_en = time.monotonic() + retardo
+            previo = self._pendientes.get(clave)
+            if previo is not None:
+                listo_en = min(listo_en, previo["listo_en"])
+            self._pendientes[clave] = {
+                "df": df, "version": self._version, "listo_en": listo_en, "intentos": 0
+            }
+            estado = self._estados.setdefault(clave, {
+                "guardada": 0, "ultimo_guardado": None, "combinado": None, "base_combinada": None,
+                "error": None, "intentos": 0,
+            })
+            estado.update(estado="pendiente", version=self._version, actualizado=time.monotonic())
+            self._podar()
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._trabajar, name="cola-guardado", daemon=True)
+                self._hilo.start()
+            self._cond.notify_all()
+            return self._version
+
+    def estado(self, name: str, sesion=None) -> dict | None:
+        """Copia del estado de (`name`, `sesion`), o None si nunca se encargó."""
+        with self._cond:
+            estado = self._estados.get((name, sesion))
+            return dict(estado) if estado is not None else None
+
+    def descartar(self, name: str, sesion=None) -> None:
+        """
+        La sesión ya usó el resultado de (`name`, `sesion`): suelta el
+        DataFrame combinado y, si no queda nada por subir, borra el estado.
+        """
+        clave = (name, sesion)
+        with self._cond:
+            estado = self._estados.get(clave)
+            if estado is None:
+                return
+            estado.update(combinado=None, base_combinada=None)
+            if estado["estado"] in TERMINALES and not self._ocupada(clave):
+                del self._estados[clave]
+
+    def _ocupada(self, clave: tuple) -> bool:
+        return clave in self._pendientes or self._en_curso == clave
+
+    def _podar(self) -> None:
+        """Borra los estados terminados y las bases que caducaron (con el lock tomado)."""
+        ahora = time.monotonic()
+        for clave in [c for c, e in self._estados.items()
+                      if e["estado"] in TERMINALES and ahora - e["actualizado"] > ESTADO_TTL_S
+                      and not self._ocupada(c)]:
+            del self._estados[clave]
+        for clave in [c for c, (_, uso) in self._bases.items()
+                      if ahora - uso > BASE_TTL_S and not self._ocupada(c)]:
+            del self._bases[clave]
+
+    def esperar(self, name: str, version: int, timeout: float | None = None, sesion=None) -> dict | None:
+        """
+        Bloquea hasta que la `version` de `name` (o una posterior) esté
+        subida, o hasta que falle sin más reintentos. Devuelve el estado.
+        """
+        clave = (name, sesion)
+        limite = None if timeout is None else time.monotonic() + timeout
+
+        def terminado():
+            estado = self._estados.get(clave)
+            return estado is not None and (
+                estado["guardada"] >= version
+                or (estado["estado"] in ("error", "conflicto")
+                    and clave not in self._pendientes and self._en_curso != clave)
+            )
+
+        with self._cond:
+            while not terminado():
+                restante = None if limite is None else limite - time.monotonic()
+                if restante is not None and restante <= 0:
+                    break
+                self._cond.wait(restante)
+            return self.estado(name, sesion)
+
+    def _siguiente(self):
+        """Saca el encargo que toca subir, esperando a que esté listo."""
+        with self._cond:
+            while True:
+                if not self._pendientes:
+                    self._cond.wait()
+                    continue
+                clave, encargo = min(self._pendientes.items(), key=lambda kv: kv[1]["listo_en"])
+                espera = encargo["listo_en"] - time.monotonic()
+                if espera <= 0:
+                    break
+                self._cond.wait(espera)
+            del self._pendientes[clave]
+            self._en_curso = clave
+            self._estados[clave]["estado"] = "guardando"
+            if clave not in self._bases:
+                return clave, encargo, None
+            base = self._bases[clave][0]
+            self._bases[clave] = (base, time.monotonic())
+            return clave, encargo, base
+
+    def _trabajar(self):
+        while True:
+            clave, encargo, base = self._siguiente()
+            try:
+                resultado = self._guardar(clave[0], encargo["df"], base=base) or {}
+                error = None
+            except Exception as e:
+                resultado, error = {}, e
+            with self._cond:
+                self._en_curso = None
+                # Tras combinar, la base avanza solo si la sesión adopta el combinado
+                if resultado.get("base") is not None and resultado.get("combinado") is None:
+                    self._bases[clave] = (resultado["base"], time.monotonic())
+                self._registrar(clave, encargo, resultado, error)
+                self._cond.notify_all()
+
+    def _registrar(self, clave: tuple, encargo: dict, resultado: dict, error):
+        estado = self._estados[clave]
+        estado["actualizado"] = time.monotonic()
+        hay_otro = clave in self._pendientes
+        if error is None:
+            estado.update(
+                guardada=max(estado["guardada"], encargo["version"]),
+                ultimo_guardado=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                combinado=resultado.get("combinado"), error=None, intentos=0,
+                base_combinada=resultado.get("base") if resultado.get("combinado") is not None else None,
+            )
+            if not hay_otro:
+                estado["estado"] = "guardado"
+            return
+
+        intentos = encargo["intentos"] + 1
+        estado.update(error=str(error), intentos=intentos)
+        if isinstance(error, ConflictoGuardado):
+            # Reintentar no lo arregla: la sesión tiene que recargar
+            self._pendientes.pop(clave, None)
+            estado["estado"] = "conflicto"
+            return
+        if hay_otro:
+            # Ya hay una copia más reciente encargada: ella sustituye a esta
+            return
+        if intentos <= self.max_reintentos:
+            espera = min(self.espera_max, self.espera_base * 2 ** (intentos - 1))
+            encargo.update(intentos=intentos, listo_en=time.monotonic() + espera)
+            self._pendientes[clave] = encargo
+            estado["estado"] = "reintentando"
+        else:
+            estado["estado"] = "error"
+
+
+_cola = None
+_cola_lock = threading.Lock()
+
+
+def obtener_cola() -> ColaGuardado:
+    """Cola del proceso, creada en el primer uso (sube con gestor_archivos_s3.guardar_df)."""
+    global _cola
+    with _cola_lock:
+        if _cola is None:
+            from gestor_archivos_s3 import guardar_df
+            _cola = ColaGuardado(guardar_df)
+        return _cola
+
+
+def fijar_base_guardado(name: str, sesion, base) -> None:
+    obtener_cola().fijar_base(name, sesion, base)
+
+
+def encolar_guardado(name: str, df, retardo: float | None = None, sesion=None) -> int:
+    return obtener_cola().encolar(name, df, retardo, sesion)
+
+
+def estado_guardado(name: str, sesion=None) -> dict | None:
+    return obtener_cola().estado(name, sesion)
+
+
+def descartar_estado_guardado(name: str, sesion=None) -> None:
+    obtener_cola().descartar(name, sesion)
+
+
+def esperar_guardado(name: str, version: int, timeout: float | None = None, sesion=None) -> dict | None:
+    return obtener_cola().esperar(name, version, timeout, sesion)
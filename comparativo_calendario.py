@@ -7,6 +7,9 @@ import pandas as pd
 import streamlit as st
 import plotly.graph_objects as go
 
+from cache_graficos import memo_grafico
+from cubo_tiempo import agregado
+
 # Mapas de nombres para meses y días
 month_names = {
     1: "Enero", 2: "Febrero", 3: "Marzo", 4: "Abril",
@@ -15,25 +18,39 @@ month_names = {
 }
 weekday_names = ["Dom", "Lun", "Mar", "Mié", "Jue", "Vie", "Sáb"]
 
-@st.cache_data
 def clean_data(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    df['Fecha / Hora'] = pd.to_datetime(df['Fecha / Hora'], errors='coerce')
-    df['Fecha'] = df['Fecha / Hora'].dt.date
-    df['year'] = df['Fecha'].apply(lambda d: d.year)
-    df['month'] = df['Fecha'].apply(lambda d: d.month)
-
-    df['Profit Tot.'] = pd.to_numeric(
-        df['Profit Tot.'].astype(str)
-          .str.replace(r'[^\d\.\-]', '', regex=True),
-        errors='coerce'
-    ).fillna(0)
-    for col in ['Profit', 'Deposito', 'Retiro']:
-        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-
-    df['C&P'] = df.get('C&P', '').fillna('').astype(str).str.upper()
-    df['Activo'] = df.get('Activo', '').fillna('').astype(str)
-    return df
+    """
+    Celdas del cubo de tiempo (día, hora, activo, tipo y movimiento) con
+    su 'year', 'month', 'Profit', 'Trades' (filas), 'Deposito' y
+    'Deposito inicial' (el de la primera fila con depósito). 'Op' marca
+    las celdas sin depósito: las operaciones (y los retiros).
+    """
+    celdas = agregado(df)
+    fechas = celdas['Fecha']
+    year, month = fechas.dt.year, fechas.dt.month
+    if not fechas.isna().any():
+        year, month = year.astype('int64'), month.astype('int64')
+    return pd.DataFrame({
+        'Fecha': fechas,
+        'year': year,
+        'month': month,
+        'Activo': celdas['Activo'].fillna('').astype(str),
+        'C&P': celdas['C&P'].fillna('').astype(str).str.upper(),
+        'Profit': celdas['suma'],
+        'Trades': celdas['n'],
+        'Deposito': celdas['deposito'],
+        'Deposito inicial': celdas['primer_deposito'],
+        'Op': celdas['Mov'] != 'DEP',
+    })
+
+
+def acumulados_mes(df: pd.DataFrame, year: int) -> dict:
+    """P&L de las operaciones más depósitos de `year` acumulados hasta cada mes (1…12)."""
+    anio = df[df['year'] == year]
+    meses = range(1, 13)
+    profit = anio[anio['Op']].groupby('month')['Profit'].sum().reindex(meses, fill_value=0).cumsum()
+    deposito = anio[anio['Deposito'] > 0].groupby('month')['Deposito'].sum().reindex(meses, fill_value=0).cumsum()
+    return (profit + deposito).to_dict()
 
 
 def load_filters(chart_key: str) -> dict:
@@ -64,12 +81,12 @@ def summary_by_year(df: pd.DataFrame) -> pd.DataFrame | None:
         return None
     first_dep = df_dep.iloc[0]
     base_year = first_dep['Fecha'].year
-    base_amount = first_dep['Deposito']
+    base_amount = first_dep['Deposito inicial']
 
     df2 = df[df['Fecha'] >= first_dep['Fecha']]
-    ops = df2[df2['Deposito'] == 0]
+    ops = df2[df2['Op']]
     profit = ops.groupby('year')['Profit'].sum().rename('PnL')
-    trades = ops.groupby('year')['Profit'].count().rename('Trades')
+    trades = ops.groupby('year')['Trades'].sum().rename('Trades')
     deposits = df2.groupby('year')['Deposito'].sum().rename('Depósitos')
 
     summary = pd.concat([profit, trades, deposits], axis=1).fillna(0).sort_index()
@@ -91,12 +108,12 @@ def summary_all_years(df: pd.DataFrame) -> pd.DataFrame | None:
         st.warning("No se encontró un depósito inicial en el historial.")
         return None
     first_dep = df_dep.iloc[0]
-    base_amount = first_dep['Deposito']
+    base_amount = first_dep['Deposito inicial']
     fy, fm = first_dep['Fecha'].year, first_dep['Fecha'].month
 
     df2 = df[df['Fecha'] >= first_dep['Fecha']]
-    ops = df2[df2['Deposito'] == 0]
-    g = ops.groupby(['year','month'])['Profit'].agg(PnL='sum', Trades='count')
+    ops = df2[df2['Op']]
+    g = ops.groupby(['year','month']).agg(PnL=('Profit','sum'), Trades=('Trades','sum'))
     deps = df2.groupby(['year','month'])['Deposito'].sum().rename('Depósitos')
     summary = pd.concat([g, deps], axis=1).fillna(0).sort_index()
     summary.at[(fy,fm), 'Depósitos'] -= base_amount
@@ -121,15 +138,15 @@ def calculate_daily(df: pd.DataFrame, year:int, month:int, asset:str, tipo:str)
         return pd.DataFrame(columns=['Fecha','profit','trades','pct']), 0.0
     first_dep = df_dep.iloc[0]
     fy, fm = first_dep['Fecha'].year, first_dep['Fecha'].month
-    base_amount = first_dep['Deposito']
+    base_amount = first_dep['Deposito inicial']
 
     if year == fy and month == fm:
-        mask = df_dep['Fecha'].apply(lambda d: d.year == year and d.month == month)
+        mask = (df_dep['year'] == year) & (df_dep['month'] == month)
         # Incluir depósito inicial para cálculo correcto de % los primeros días
         cap_start = df_dep.loc[mask, 'Deposito'].sum()
     else:
-        first_of_month = date(year, month, 1)
-        prev = df[(df['Fecha'] >= first_dep['Fecha']) & (df['Fecha'] < first_of_month) & (df['Deposito'] == 0)]['Profit'].sum()
+        first_of_month = pd.Timestamp(date(year, month, 1))
+        prev = df[(df['Fecha'] >= first_dep['Fecha']) & (df['Fecha'] < first_of_month) & df['Op']]['Profit'].sum()
         cap_start = base_amount + prev
 
     m = (df['year'] == year) & (df['month'] == month)
@@ -138,13 +155,14 @@ def calculate_daily(df: pd.DataFrame, year:int, month:int, asset:str, tipo:str)
     if tipo.upper() != 'AMBAS':
         m &= df['C&P'] == tipo.upper()
 
-    monthly_ops = df[m & (df['Deposito'] == 0)]
+    monthly_ops = df[m & df['Op']]
     daily = (
-        monthly_ops.groupby('Fecha')['Profit']
-        .agg(profit='sum', trades='count')
+        monthly_ops.groupby('Fecha')
+        .agg(profit=('Profit','sum'), trades=('Trades','sum'))
         .reset_index()
         .sort_values('Fecha')
     )
+    daily['Fecha'] = daily['Fecha'].dt.date
 
     cap = cap_start
     pct_list = []
@@ -156,7 +174,7 @@ def calculate_daily(df: pd.DataFrame, year:int, month:int, asset:str, tipo:str)
     return daily, cap_start
 
 
-def render_calendar(daily: pd.DataFrame, year:int, month:int) -> None:
+def figura_calendario(daily: pd.DataFrame, year:int, month:int) -> go.Figure:
     info = daily.set_index('Fecha')[['profit','trades','pct']].to_dict('index')
     matrix = calendar.Calendar(firstweekday=6).monthdayscalendar(year, month)
     n_weeks = len(matrix)
@@ -183,18 +201,24 @@ def render_calendar(daily: pd.DataFrame, year:int, month:int) -> None:
     fig.update_yaxes(range=[n_weeks,0], showgrid=False, zeroline=False, showticklabels=False)
     fig.update_layout(height=n_weeks*100+100, margin=dict(l=20,r=20,t=20,b=20),
                       plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)')
+    return fig
+
+
+def render_calendar(daily: pd.DataFrame, year:int, month:int, fig: go.Figure | None = None) -> None:
+    if fig is None:
+        fig = figura_calendario(daily, year, month)
     st.plotly_chart(fig, use_container_width=True, config={'displayModeBar':False})
 
 
 def mostrar_calendario(df_raw: pd.DataFrame, chart_key:str = "calendario") -> None:
-    df = clean_data(df_raw)
+    df = memo_grafico('calendario.datos', df_raw, None, lambda: clean_data(df_raw))
     saved = load_filters(chart_key)
 
     df_dep = df[df['Deposito']>0].sort_values('Fecha')
     if not df_dep.empty:
         first_dep = df_dep.iloc[0]
         fy, fm = first_dep['Fecha'].year, first_dep['Fecha'].month
-        base_amount = first_dep['Deposito']
+        base_amount = first_dep['Deposito inicial']
     else:
         fy = fm = base_amount = None
 
@@ -240,13 +264,19 @@ def mostrar_calendario(df_raw: pd.DataFrame, chart_key:str = "calendario") -> No
 
     save_filters(chart_key, {'year':year,'month':month,'asset':asset,'tipo':tipo})
 
-    daily_df, cap_start = calculate_daily(df, year, month, asset, tipo)
-    render_calendar(daily_df, year, month)
+    def construir():
+        daily, cap = calculate_daily(df, year, month, asset, tipo)
+        return daily, cap, figura_calendario(daily, year, month)
+
+    daily_df, cap_start, fig = memo_grafico(
+        'calendario', df_raw, {'year': year, 'month': month, 'asset': asset, 'tipo': tipo}, construir
+    )
+    render_calendar(daily_df, year, month, fig)
 
     # ——— Datos base ———
     df_dep       = df[df['Deposito']>0].sort_values('Fecha')
     first_dep    = df_dep.iloc[0]
-    initial_dep  = first_dep['Deposito']
+    initial_dep  = first_dep['Deposito inicial']
     first_month  = first_dep['Fecha'].month
 
     # ——— P&L y trades del mes actual ———
@@ -255,16 +285,7 @@ def mostrar_calendario(df_raw: pd.DataFrame, chart_key:str = "calendario") -> No
 
     # ——— Acumulados hasta el mes actual ———
     # Incluye mes 1…mes_N
-    profit_cum  = df[
-        (df['Deposito'] == 0) &
-        (df['year']     == year) &
-        (df['month']   <= month)
-    ]['Profit'].sum()
-    deposit_cum = df[
-        (df['Deposito'] > 0) &
-        (df['year']     == year) &
-        (df['month']   <= month)
-    ]['Deposito'].sum()
+    acumulado = acumulados_mes(df, year)
 
     # ——— Elegimos denominador distinto para el primer mes ———
     if month == first_month:
@@ -272,7 +293,7 @@ def mostrar_calendario(df_raw: pd.DataFrame, chart_key:str = "calendario") -> No
         denominador = initial_dep
     else:
         # mes 2 en adelante: P&L y Depósitos de todos los meses hasta el actual
-        denominador = profit_cum + deposit_cum
+        denominador = acumulado[month]
 
     # ——— Cálculo del % Mes ———
     pct_mes = (profit_mes / denominador * 100) if denominador else 0
@@ -306,31 +327,21 @@ def mostrar_calendario(df_raw: pd.DataFrame, chart_key:str = "calendario") -> No
 
             # ——— Datos iniciales ———
             first_dep   = df[df['Deposito']>0].sort_values('Fecha').iloc[0]
-            initial_dep = first_dep['Deposito']
+            initial_dep = first_dep['Deposito inicial']
             first_mon   = first_dep['Fecha'].month
 
             # ——— Recalcular % Var mes a mes ———
+            # P&L y depósitos acumulados hasta e incluyendo cada mes
+            acumulado = acumulados_mes(df, year)
             pct_list = []
             for _, row in tm.iterrows():
                 m = row['MesNum']
-                # P&L acumulado hasta e incluyendo este mes
-                profit_cum  = df[
-                    (df['Deposito']==0) &
-                    (df['year']==year) &
-                    (df['month']<=m)
-                ]['Profit'].sum()
-                # Depósitos acumulados hasta e incluyendo este mes
-                deposit_cum = df[
-                    (df['Deposito']>0) &
-                    (df['year']==year) &
-                    (df['month']<=m)
-                ]['Deposito'].sum()
 
                 # Para el primer mes, solo el depósito inicial
                 if m == first_mon:
                     denom = initial_dep
                 else:
-                    denom = profit_cum + deposit_cum
+                    denom = acumulado[m]
 
                 pct_list.append(round((row['PnL'] / denom * 100), 2) if denom else 0)
 
@@ -5,6 +5,8 @@ import plotly.graph_objects as go
 import os
 import json
 
+from cache_graficos import memo_grafico
+
 def comparativo_call_put_linea(df: pd.DataFrame, chart_key: str = "call_put_area") -> None:
     """
     Gráfico de área acumulativa para CALL vs PUT vs TOTAL,
@@ -17,6 +19,7 @@ def comparativo_call_put_linea(df: pd.DataFrame, chart_key: str = "call_put_area
         return
 
     # Copiar DataFrame
+    df_rango = df
     df = df.copy().reset_index(drop=True)
 
     # Inyectar CSS para checkboxes
@@ -58,14 +61,34 @@ def comparativo_call_put_linea(df: pd.DataFrame, chart_key: str = "call_put_area
     with open(state_file, 'w') as f:
         json.dump(new_state, f)
 
+    grafico = memo_grafico('call_put_linea', df_rango, new_state, lambda: _grafico_call_put(df, new_state))
+    if grafico is None:
+        st.warning("No hay datos de CALL o PUT para graficar.")
+        return
+    fig, resumen = grafico
+
+    st.plotly_chart(fig, use_container_width=True, key=chart_key)
+
+    # Tablas resumen
+    if mostrar_resumen:
+        tab1, tab2 = st.tabs(["CALL/PUT", "GENERAL"])
+        with tab1:
+            st.table(resumen['call_put'])
+        with tab2:
+            st.table(resumen['general'])
+
+
+def _grafico_call_put(df: pd.DataFrame, estado: dict):
+    """(figura, tablas resumen) o None si no hay CALL ni PUT."""
+    mostrar_call, mostrar_put, mostrar_total = estado['call'], estado['put'], estado['total']
+
     # Calcular acumulados
     profits = df['Profit']
     mask_call = df['C&P'].str.upper() == 'CALL'
     mask_put = df['C&P'].str.upper() == 'PUT'
 
     if not mask_call.any() and not mask_put.any():
-        st.warning("No hay datos de CALL o PUT para graficar.")
-        return
+        return None
 
     call_cumsum = profits.where(mask_call).cumsum()
     put_cumsum = profits.where(mask_put).cumsum()
@@ -110,39 +133,30 @@ def comparativo_call_put_linea(df: pd.DataFrame, chart_key: str = "call_put_area
                       template='plotly_dark', height=400,
                       showlegend=False)
 
-    st.plotly_chart(fig, use_container_width=True, key=chart_key)
-
     # Tablas resumen
-    if mostrar_resumen:
-        total_call = call_full.iloc[-1] if not call_full.empty else 0
-        total_put = put_full.iloc[-1] if not put_full.empty else 0
-        total_all = total_cumsum.iloc[-1] if not total_cumsum.empty else 0
-        otros = df.loc[~mask_call & ~mask_put, 'Profit'].fillna(0)
-        deps = otros[otros > 0].sum()
-        rets = -otros[otros < 0].sum()
-
-        pct_call = total_call / deps * 100 if deps else np.nan
-        pct_put = total_put / deps * 100 if deps else np.nan
-        pct_all = total_all / deps * 100 if deps else np.nan
-
-        tab1, tab2 = st.tabs(["CALL/PUT", "GENERAL"])
-        with tab1:
-            df_cp = pd.DataFrame({
-                'Métrica': ['CALL', 'PUT'],
-                'Valor': [
-                    f"{total_call:.2f}",
-                    f"{total_put:.2f}"
-                ]
-            })
-            st.table(df_cp)
-        with tab2:
-            df_gen = pd.DataFrame({
-                'Métrica': ['TOTAL', 'Depósitos', 'Retiros', '% vs dep'],
-                'Valor': [
-                    f"{total_all:.2f}",
-                    f"{deps:.2f}",
-                    f"{rets:.2f}",
-                    f"{pct_all:.2f}%"
-                ]
-            })
-            st.table(df_gen)
+    total_call = call_full.iloc[-1] if not call_full.empty else 0
+    total_put = put_full.iloc[-1] if not put_full.empty else 0
+    total_all = total_cumsum.iloc[-1] if not total_cumsum.empty else 0
+    otros = df.loc[~mask_call & ~mask_put, 'Profit'].fillna(0)
+    deps = otros[otros > 0].sum()
+    rets = -otros[otros < 0].sum()
+
+    pct_all = total_all / deps * 100 if deps else np.nan
+
+    df_cp = pd.DataFrame({
+        'Métrica': ['CALL', 'PUT'],
+        'Valor': [
+            f"{total_call:.2f}",
+            f"{total_put:.2f}"
+        ]
+    })
+    df_gen = pd.DataFrame({
+        'Métrica': ['TOTAL', 'Depósitos', 'Retiros', '% vs dep'],
+        'Valor': [
+            f"{total_all:.2f}",
+            f"{deps:.2f}",
+            f"{rets:.2f}",
+            f"{pct_all:.2f}%"
+        ]
+    })
+    return fig, {'call_put': df_cp, 'general': df_gen}
@@ -4,12 +4,15 @@ import plotly.graph_objects as go
 import os
 import json
 
+from cache_graficos import memo_grafico
+
 
 def comparativo_dias_linea(df: pd.DataFrame, chart_key: str = "dias_line_chart") -> None:
     if 'C&P' not in df.columns or 'Profit' not in df.columns or 'Día' not in df.columns:
         st.warning("Faltan columnas necesarias ('C&P', 'Profit' o 'Día') en el DataFrame.")
         return
 
+    df_rango = df
     df = df.copy().reset_index(drop=True)
     df["Index"] = df.index
     df_idx = list(df.index)
@@ -58,6 +61,12 @@ def comparativo_dias_linea(df: pd.DataFrame, chart_key: str = "dias_line_chart")
     with open(json_file, "w") as f:
         json.dump(excl_data, f, indent=2)
 
+    fig = memo_grafico('dias_linea', df_rango, excl_data, lambda: _figura_dias_linea(df, excl_data))
+    st.plotly_chart(fig, use_container_width=True, key=chart_key)
+
+
+def _figura_dias_linea(df: pd.DataFrame, excl_data: dict) -> go.Figure:
+    dias_semana = ['Lu', 'Ma', 'Mi', 'Ju', 'Vi', 'Sa', 'Do']
     df = df.loc[~df.index.isin(excl_data["indices"])]
     df = df[df['C&P'].str.strip() != ""]  # Excluir vacíos en C&P
     df = df.reset_index(drop=True)
@@ -91,5 +100,4 @@ def comparativo_dias_linea(df: pd.DataFrame, chart_key: str = "dias_line_chart")
         width=900,
         showlegend=True
     )
-
-    st.plotly_chart(fig, use_container_width=True, key=chart_key) 
\ No newline at end of file
+    return fig 
\ No newline at end of file
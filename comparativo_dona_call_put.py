@@ -2,26 +2,54 @@ import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 
+from cache_graficos import memo_grafico
+
 
 def comparativo_dona_call_put(df: pd.DataFrame, chart_key: str = "dona_dual") -> None:
     if 'C&P' not in df.columns or 'Profit' not in df.columns:
         st.warning("Faltan columnas necesarias ('C&P' o 'Profit') en el DataFrame.")
         return
 
-    df = df.copy()
-    df = df[df['Profit'] != 0]
+    figuras = memo_grafico('dona_call_put', df, None, lambda: _figuras_dona(df))
 
     col1, col2, col3 = st.columns(3)
 
-    for tipo, color, col in [('CALL', 'green', col1), ('PUT', 'red', col2)]:
+    for tipo, col in [('CALL', col1), ('PUT', col2)]:
+        fig, total = figuras[tipo]
+
+        if total == 0:
+            with col:
+                st.info(f"No hay suficientes datos para {tipo}.")
+            continue
+
+        with col:
+            st.plotly_chart(fig, use_container_width=True, key=f"{chart_key}_{tipo.lower()}")
+            st.markdown(f"**Total {tipo}:** {total} operaciones")
+
+    # Gráfico adicional de distribución total de operaciones
+    fig_total, valores = figuras['total']
+    total_ops = sum(valores)
+
+    if total_ops > 0:
+        with col3:
+            st.plotly_chart(fig_total, use_container_width=True, key=f"{chart_key}_total")
+            st.markdown(f"**CALL:** {valores[0]} ({round((valores[0]/total_ops)*100, 1)}%)  |  **PUT:** {valores[1]} ({round((valores[1]/total_ops)*100, 1)}%)")
+
+
+def _figuras_dona(df: pd.DataFrame) -> dict:
+    """{'CALL'/'PUT': (figura, total), 'total': (figura, [n CALL, n PUT])}."""
+    df = df.copy()
+    df = df[df['Profit'] != 0]
+    figuras = {}
+
+    for tipo, color in [('CALL', 'green'), ('PUT', 'red')]:
         df_tipo = df[df['C&P'].str.upper() == tipo]
         ganadas = (df_tipo['Profit'] > 0).sum()
         perdidas = (df_tipo['Profit'] < 0).sum()
         total = ganadas + perdidas
 
         if total == 0:
-            with col:
-                st.info(f"No hay suficientes datos para {tipo}.")
+            figuras[tipo] = (None, 0)
             continue
 
         porcentaje = round((ganadas / total) * 100, 1)
@@ -43,38 +71,29 @@ def comparativo_dona_call_put(df: pd.DataFrame, chart_key: str = "dona_dual") ->
             height=400,
             width=300
         )
+        figuras[tipo] = (fig, total)
 
-        with col:
-            st.plotly_chart(fig, use_container_width=True, key=f"{chart_key}_{tipo.lower()}")
-            st.markdown(f"**Total {tipo}:** {total} operaciones")
-
-    # Gráfico adicional de distribución total de operaciones
     df_call = df[df['C&P'].str.upper() == 'CALL']
     df_put = df[df['C&P'].str.upper() == 'PUT']
-    total_ops = len(df_call) + len(df_put)
+    valores = [len(df_call), len(df_put)]
+    etiquetas = ['CALL', 'PUT']
+    colores = ['green', 'red']
 
-    if total_ops > 0:
-        valores = [len(df_call), len(df_put)]
-        etiquetas = ['CALL', 'PUT']
-        colores = ['green', 'red']
-
-        fig_total = go.Figure(go.Pie(
-            labels=etiquetas,
-            values=valores,
-            hole=0.5,
-            marker_colors=colores,
-            textinfo='percent',
-            hoverinfo='label+value+percent'
-        ))
-
-        fig_total.update_layout(
-            title_text="     CALL vs PUT",
-            title_font_size=14,
-            showlegend=False,
-            height=400,
-            width=300
-        )
+    fig_total = go.Figure(go.Pie(
+        labels=etiquetas,
+        values=valores,
+        hole=0.5,
+        marker_colors=colores,
+        textinfo='percent',
+        hoverinfo='label+value+percent'
+    ))
 
-        with col3:
-            st.plotly_chart(fig_total, use_container_width=True, key=f"{chart_key}_total")
-            st.markdown(f"**CALL:** {valores[0]} ({round((valores[0]/total_ops)*100, 1)}%)  |  **PUT:** {valores[1]} ({round((valores[1]/total_ops)*100, 1)}%)")
+    fig_total.update_layout(
+        title_text="     CALL vs PUT",
+        title_font_size=14,
+        showlegend=False,
+        height=400,
+        width=300
+    )
+    figuras['total'] = (fig_total, valores)
+    return figuras
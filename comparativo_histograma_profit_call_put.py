@@ -5,20 +5,14 @@ import numpy as np
 import os
 import json
 
+from cache_graficos import memo_grafico
+
 def histograma_profit_call_put(df: pd.DataFrame, chart_key: str = "histograma_call_put") -> None:
     # 1) Validar columnas
     if 'C&P' not in df.columns or 'Profit' not in df.columns:
         st.warning("Faltan columnas necesarias ('C&P' o 'Profit') en el DataFrame.")
         return
 
-    df = df.copy().reset_index(drop=True)
-
-    # 2) Filtrar depósitos/retiros si existen
-    cols_to_check = ["Deposito", "Retiro"]
-    cols_existentes = [col for col in cols_to_check if col in df.columns]
-    if cols_existentes:
-        df = df[df[cols_existentes].isnull().all(axis=1)]
-
     # 3) Cargar o inicializar configuración de exclusión
     safe_chart_key = chart_key.replace("/", "_").replace("\\", "_").replace(":", "_")
     json_file = f"{safe_chart_key}_excl.json"
@@ -77,6 +71,19 @@ def histograma_profit_call_put(df: pd.DataFrame, chart_key: str = "histograma_ca
     with open(json_file, "w") as f:
         json.dump(excl_data, f, indent=2)
 
+    fig = memo_grafico('histograma_call_put', df, excl_data, lambda: _figura_histograma(df, excl_data))
+    st.plotly_chart(fig, use_container_width=True, key=chart_key)
+
+
+def _figura_histograma(df: pd.DataFrame, excl_data: dict) -> go.Figure:
+    df = df.copy().reset_index(drop=True)
+
+    # 2) Filtrar depósitos/retiros si existen
+    cols_to_check = ["Deposito", "Retiro"]
+    cols_existentes = [col for col in cols_to_check if col in df.columns]
+    if cols_existentes:
+        df = df[df[cols_existentes].isnull().all(axis=1)]
+
     # 6) Separar CALL y PUT
     df_call = df[df['C&P'].str.upper() == 'CALL']
     df_put  = df[df['C&P'].str.upper() == 'PUT']
@@ -135,5 +142,4 @@ def histograma_profit_call_put(df: pd.DataFrame, chart_key: str = "histograma_ca
         height=400,
         width=900
     )
-
-    st.plotly_chart(fig, use_container_width=True, key=chart_key)
+    return fig
@@ -1,7 +1,206 @@
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 import streamlit as st
 
+from cache_graficos import memo_grafico
+from cubo_tiempo import agregado
+
+DIAS = ['Monday','Tuesday','Wednesday','Thursday','Friday','Saturday','Sunday']
+METRICAS = ["Operaciones", "Profit total", "Profit medio", "% Acierto", "Esperanza"]
+# Celdas con menos operaciones con Profit se dejan en blanco en las métricas
+# por celda: Profit total, Profit medio, % Acierto y Esperanza
+MIN_OPERACIONES = 3
+
+
+def _dia_hora(celdas: pd.DataFrame) -> pd.DataFrame:
+    """
+    Celdas del cubo con 'Day' (nombre) y 'Hour'. 'Hour' es entera salvo
+    que haya filas sin fecha, como .dt.hour sobre las filas.
+    """
+    horas = celdas['Hora']
+    if not celdas['Fecha'].isna().any():
+        horas = horas.astype('int64')
+    return celdas.assign(Day=celdas['Dia'].map(dict(enumerate(DIAS))), Hour=horas)
+
+
+def _hora_texto(horas) -> list:
+    return [f"{(h%12 or 12)}{'AM' if h<12 else 'PM'}" for h in horas]
+
+
+def _top3(celdas: pd.DataFrame, columna: str) -> pd.Series:
+    """Las 3 claves de `columna` con más filas, como value_counts().nlargest(3)."""
+    celdas = celdas[celdas[columna].notna()]
+    conteo = (
+        celdas.groupby(columna, sort=False)
+              .agg(n=('n', 'sum'), primera=('primera', 'min'))
+              .sort_values('primera')['n']
+    )
+    return conteo.sort_values(ascending=False).nlargest(3)
+
+
+def _resumen(celdas: pd.DataFrame):
+    """Tablas de resumen, top 3 días y top 3 horas de las filas de `celdas`."""
+    t = int(celdas['n'].sum())
+    w = celdas['ganadoras'].sum()
+    l = celdas['perdedoras'].sum()
+    wr = (w/t*100) if t else 0
+    sum_df = pd.DataFrame({
+        "Métrica": ["Total ops","Ganadoras","Perdedoras","Win rate (%)"],
+        "Valor":   [t, w, l, round(wr,1)]
+    })
+    td = _top3(celdas, 'Day')
+    days_df = pd.DataFrame({"Día": td.index, "Operaciones": td.values})
+    th = _top3(celdas, 'Hour')
+    hours_df = pd.DataFrame({
+        "Hora": _hora_texto(th.index),
+        "Operaciones": th.values
+    })
+    return sum_df, days_df, hours_df
+
+
+def _datos_heatmaps(df: pd.DataFrame, tipo: str):
+    """
+    Para `tipo`: pivots de operaciones (todas, ganadoras, perdedoras), los
+    acumuladores por (día, hora) de las operaciones sin depósitos ni
+    retiros ('con_profit', 'suma', 'suma2', 'ganadoras', 'perdedoras') y las tablas
+    de resumen.
+    """
+    # 3) CELDAS DEL CUBO (día, hora, C&P…) DEL RANGO, FILTRADAS POR TIPO
+    celdas = agregado(df)
+    filtradas = celdas
+    if tipo in ("CALL", "PUT"):
+        filtradas = celdas[celdas['C&P'].astype(str).str.strip().str.upper() == tipo]
+    filtradas = _dia_hora(filtradas)
+
+    def make_pivot(medida: str) -> pd.DataFrame:
+        sub = filtradas[filtradas[medida] > 0]
+        p = sub.groupby(['Day','Hour'])[medida].sum().unstack(fill_value=0)
+        return p.reindex(DIAS, fill_value=0)
+
+    # 4) PREPARAMOS HEATMAPS: todas, ganadoras y perdedoras
+    pivots = {
+        "Todas":      make_pivot('n'),
+        "Ganadoras":  make_pivot('ganadoras'),
+        "Perdedoras": make_pivot('perdedoras'),
+    }
+    operaciones = filtradas[filtradas['Mov'] == '']
+    acumulados = operaciones.groupby(['Day','Hour'])[['con_profit','suma','suma2','ganadoras','perdedoras']].sum()
+    return pivots, acumulados, _tablas_heatmaps(celdas, filtradas)
+
+
+def _figuras_operaciones(pivots: dict, tipo: str) -> dict:
+    """Heatmaps del número de operaciones (todas, ganadoras, perdedoras)."""
+    # 5) FIGURAS DE LOS HEATMAPS
+    figuras = {}
+    for titulo, pivot in pivots.items():
+        fig = go.Figure(go.Heatmap(
+            z=pivot.values,
+            x=pivot.columns,
+            y=pivot.index,
+            colorscale=[
+            [0.0, '#0E1117'],
+            [0.2, '#440154'], 
+            [0.4, '#31688e'], 
+            [0.6, '#35b779'], 
+            [0.8, '#fde725'], 
+            [1.0, '#00FF00'] 
+            ],
+            colorbar=dict(title="# Ops")
+        ))
+        ticktext = _hora_texto(pivot.columns)
+        fig.update_xaxes(tickmode='array', tickvals=list(pivot.columns), ticktext=ticktext)
+        fig.data[0].customdata = [ticktext] * len(pivot.index)
+        fig.data[0].hovertemplate = (
+            "Día: %{y}<br>"
+            "Hora: %{customdata}<br>"
+            "Operaciones: %{z}<extra></extra>"
+        )
+        fig.update_layout(
+            title=f"{titulo} — {tipo}",
+            xaxis_title="Hora",
+            yaxis_title="Día de la Semana",
+            template="plotly_dark"
+        )
+        figuras[titulo] = fig
+    return figuras
+
+
+def _figura_metrica(acumulados: pd.DataFrame, metrica: str, tipo: str, minimo: int) -> go.Figure:
+    """
+    Heatmap de `metrica` por día y hora a partir de los acumuladores de
+    cada celda, en blanco las celdas con menos de `minimo` operaciones.
+    Solo cuentan las operaciones con Profit numérico: las abiertas y las
+    filas vacías no entran en la media, la desviación ni el mínimo.
+    """
+    n = acumulados['con_profit']
+    suma = acumulados['suma']
+    # Operaciones con resultado (sin las de profit 0), como % Acierto / % Error
+    con_resultado = (acumulados['ganadoras'] + acumulados['perdedoras']).replace(0, np.nan)
+    if metrica == "Profit total":
+        valor = suma
+    elif metrica == "Profit medio":
+        valor = suma / n.replace(0, np.nan)
+    elif metrica == "% Acierto":
+        valor = acumulados['ganadoras'] / con_resultado * 100
+    else:
+        # % Acierto · Beneficio M. − % Error · Riesgo M. = suma / operaciones con resultado
+        valor = suma / con_resultado
+    valor = valor.where(n >= minimo)
+    varianza = (acumulados['suma2'] - suma * suma / n.replace(0, np.nan)) / (n - 1).where(n > 1)
+    desviacion = np.sqrt(varianza.clip(lower=0))
+
+    z = valor.unstack().reindex(DIAS)
+    horas = z.columns
+    celda = lambda serie: serie.unstack().reindex(index=DIAS, columns=horas)
+    ticktext = _hora_texto(horas)
+    customdata = np.dstack([
+        np.tile(np.array(ticktext, dtype=object), (len(DIAS), 1)),
+        celda(n).fillna(0).to_numpy(dtype=object),
+        celda(desviacion).round(2).to_numpy(dtype=object),
+    ])
+    porcentaje = metrica == "% Acierto"
+    fig = go.Figure(go.Heatmap(
+        z=z.values,
+        x=horas,
+        y=z.index,
+        customdata=customdata,
+        colorscale=[[0.0, 'red'], [0.5, '#0E1117'], [1.0, '#00FF00']],
+        zmid=50 if porcentaje else 0,
+        hoverongaps=False,
+        colorbar=dict(title="%" if porcentaje else "$"),
+        hovertemplate=(
+            "Día: %{y}<br>"
+            "Hora: %{customdata[0]}<br>"
+            f"{metrica}: %{{z:,.2f}}<br>"
+            "Operaciones: %{customdata[1]}<br>"
+            "Desv. típica: %{customdata[2]}<extra></extra>"
+        ),
+    ))
+    fig.update_xaxes(tickmode='array', tickvals=list(horas), ticktext=ticktext)
+    fig.update_layout(
+        title=f"{metrica} — {tipo} (mín. {minimo} ops)",
+        xaxis_title="Hora",
+        yaxis_title="Día de la Semana",
+        template="plotly_dark"
+    )
+    return fig
+
+
+def _tablas_heatmaps(celdas: pd.DataFrame, filtradas: pd.DataFrame) -> tuple:
+    """Resumen y top 3 de `filtradas` y de las CALL y las PUT de `celdas`."""
+    # 6) TABLAS DE RESUMEN Y TOP 3
+    summary_global, days_global, hours_global = _resumen(filtradas)
+
+    # 7) TABLAS CALL y PUT INDEPENDIENTES
+    celdas = _dia_hora(celdas)
+    sum_call, days_call, hours_call = _resumen(celdas[celdas['C&P'].str.upper()=="CALL"])
+    sum_put,  days_put,  hours_put  = _resumen(celdas[celdas['C&P'].str.upper()=="PUT"])
+
+    return (summary_global, days_global, hours_global,
+            sum_call, days_call, hours_call, sum_put, days_put, hours_put)
+
+
 def mostrar_heatmaps_dia_hora(df: pd.DataFrame, chart_key: str):
     # 1) COLUMNAS NECESARIAS
     if not {'Fecha / Hora', 'Profit', 'C&P'}.issubset(df.columns):
@@ -14,113 +213,39 @@ def mostrar_heatmaps_dia_hora(df: pd.DataFrame, chart_key: str):
         ["Ambas", "CALL", "PUT"],
         key=f"filtro_{chart_key}"
     )
-    df_filtrado = df.copy()
-    if tipo == "CALL":
-        df_filtrado = df_filtrado[
-            df_filtrado['C&P'].astype(str).str.strip().str.upper() == 'CALL'
-        ]
-    elif tipo == "PUT":
-        df_filtrado = df_filtrado[
-            df_filtrado['C&P'].astype(str).str.strip().str.upper() == 'PUT'
-        ]
-
-    # 3) EXTRAER DÍA y HORA
-    df_filtrado['Fecha / Hora'] = pd.to_datetime(df_filtrado['Fecha / Hora'])
-    df_filtrado['Day']  = df_filtrado['Fecha / Hora'].dt.day_name()
-    df_filtrado['Hour'] = df_filtrado['Fecha / Hora'].dt.hour
-
-    def make_pivot(subdf: pd.DataFrame) -> pd.DataFrame:
-        p = subdf.groupby(['Day','Hour']).size().unstack(fill_value=0)
-        return p.reindex(
-            ['Monday','Tuesday','Wednesday','Thursday','Friday','Saturday','Sunday'],
-            fill_value=0
-        )
+    # Métrica de cada celda; las de profit ocultan las celdas con pocas operaciones
+    col_metrica, col_minimo = st.columns(2)
+    with col_metrica:
+        metrica = st.selectbox("Métrica por celda:", METRICAS, key=f"metrica_{chart_key}")
+    with col_minimo:
+        minimo = int(st.number_input(
+            "Mín. operaciones por celda:", min_value=1, value=MIN_OPERACIONES, step=1,
+            key=f"minimo_{chart_key}", disabled=metrica == "Operaciones"
+        ))
 
-    # 4) PREPARAMOS HEATMAPS: todas, ganadoras y perdedoras
-    pivots = {
-        "Todas":      make_pivot(df_filtrado),
-        "Ganadoras":  make_pivot(df_filtrado[df_filtrado['Profit'] > 0]),
-        "Perdedoras": make_pivot(df_filtrado[df_filtrado['Profit'] < 0]),
-    }
+    # Los acumuladores por celda no dependen de la métrica: cambiarla solo
+    # redibuja el heatmap
+    pivots, acumulados, tablas = memo_grafico(
+        'heatmaps_dia_hora.datos', df, {'tipo': tipo}, lambda: _datos_heatmaps(df, tipo)
+    )
+    if metrica == "Operaciones":
+        figuras = memo_grafico(
+            'heatmaps_dia_hora', df, {'tipo': tipo}, lambda: _figuras_operaciones(pivots, tipo)
+        )
+    else:
+        figuras = {metrica: memo_grafico(
+            'heatmaps_dia_hora.metrica', df, {'tipo': tipo, 'metrica': metrica, 'minimo': minimo},
+            lambda: _figura_metrica(acumulados, metrica, tipo, minimo)
+        )}
+    (summary_global, days_global, hours_global,
+     sum_call, days_call, hours_call, sum_put, days_put, hours_put) = tablas
 
     # 5) MOSTRAR HEATMAPS EN PESTAÑAS
-    tabs = st.tabs(list(pivots.keys()))
-    for tab, (titulo, pivot) in zip(tabs, pivots.items()):
+    tabs = st.tabs(list(figuras.keys()))
+    for tab, (titulo, fig) in zip(tabs, figuras.items()):
         with tab:
-            fig = go.Figure(go.Heatmap(
-                z=pivot.values,
-                x=pivot.columns,
-                y=pivot.index,
-                colorscale=[
-                [0.0, '#0E1117'],
-                [0.2, '#440154'], 
-                [0.4, '#31688e'], 
-                [0.6, '#35b779'], 
-                [0.8, '#fde725'], 
-                [1.0, '#00FF00'] 
-                ],
-                colorbar=dict(title="# Ops")
-            ))
-            ticktext = [f"{(h%12 or 12)}{'AM' if h<12 else 'PM'}" for h in pivot.columns]
-            fig.update_xaxes(tickmode='array', tickvals=list(pivot.columns), ticktext=ticktext)
-            fig.data[0].customdata = [ticktext] * len(pivot.index)
-            fig.data[0].hovertemplate = (
-                "Día: %{y}<br>"
-                "Hora: %{customdata}<br>"
-                "Operaciones: %{z}<extra></extra>"
-            )
-            fig.update_layout(
-                title=f"{titulo} — {tipo}",
-                xaxis_title="Hora",
-                yaxis_title="Día de la Semana",
-                template="plotly_dark"
-            )
             st.plotly_chart(fig, use_container_width=True, key=f"{chart_key}_{titulo}")
 
-    # 6) PREPARAMOS TABLAS DE RESUMEN Y TOP 3
-    total = len(df_filtrado)
-    w = (df_filtrado['Profit'] > 0).sum()
-    l = (df_filtrado['Profit'] < 0).sum()
-    wr = (w/total*100) if total else 0
-    summary_global = pd.DataFrame({
-        "Métrica": ["Total ops","Ganadoras","Perdedoras","Win rate (%)"],
-        "Valor":   [total, w, l, round(wr,1)]
-    })
-    top_days = df_filtrado['Day'].value_counts().nlargest(3)
-    days_global = pd.DataFrame({"Día": top_days.index, "Operaciones": top_days.values})
-    top_hours = df_filtrado['Hour'].value_counts().nlargest(3)
-    hours_global = pd.DataFrame({
-        "Hora": [f"{(h%12 or 12)}{'AM' if h<12 else 'PM'}" for h in top_hours.index],
-        "Operaciones": top_hours.values
-    })
-
-    # 7) TABLAS CALL y PUT INDEPENDIENTES
-    df_all = df.copy()
-    df_all['Fecha / Hora'] = pd.to_datetime(df_all['Fecha / Hora'])
-    df_all['Day']  = df_all['Fecha / Hora'].dt.day_name()
-    df_all['Hour'] = df_all['Fecha / Hora'].dt.hour
-
-    def gen(subdf):
-        t = len(subdf)
-        w = (subdf['Profit'] > 0).sum()
-        l = (subdf['Profit'] < 0).sum()
-        wr = (w/t*100) if t else 0
-        sum_df = pd.DataFrame({
-            "Métrica": ["Total ops","Ganadoras","Perdedoras","Win rate (%)"],
-            "Valor":   [t, w, l, round(wr,1)]
-        })
-        td = subdf['Day'].value_counts().nlargest(3)
-        days_df = pd.DataFrame({"Día": td.index, "Operaciones": td.values})
-        th = subdf['Hour'].value_counts().nlargest(3)
-        hours_df = pd.DataFrame({
-            "Hora":[f"{(h%12 or 12)}{'AM' if h<12 else 'PM'}" for h in th.index],
-            "Operaciones": th.values
-        })
-        return sum_df, days_df, hours_df
-
-    sum_call, days_call, hours_call = gen(df_all[df_all['C&P'].str.upper()=="CALL"])
-    sum_put,  days_put,  hours_put  = gen(df_all[df_all['C&P'].str.upper()=="PUT"])
-
     # 8) SEIS PESTAÑAS DE TABLAS
     tabs2 = st.tabs([
         "Resumen",
@@ -1,60 +1,38 @@
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 import streamlit as st
 import os
 import json
 
+from cache_graficos import memo_grafico
+from calculos_drawdown import episodios_drawdown, top_k
 
-def detectar_tramos(dd_numeric: list, fechas: list, modo: str, df: pd.DataFrame) -> list:
-    tramos = []
-    in_tramo = False
-    inicio = None
-    valor_extremo = 0.0
-
-    for idx, val in enumerate(dd_numeric):
-        if val is None:
-            if in_tramo:
-                fecha_inicio = fechas[inicio]
-                fecha_fin = fechas[idx]
-                duracion = fecha_fin - fecha_inicio
-                duracion_str = f"{duracion.days}d {duracion.seconds // 3600}h {(duracion.seconds // 60) % 60}m"
-                cantidad_ops = df.iloc[inicio:idx+1][
-                    ~((df['Deposito'].notna() & df['Deposito'].ne(0)) |
-                      (df['Retiro'].notna() & df['Retiro'].ne(0)))
-                ].shape[0]
-                tramos.append((inicio, idx, duracion_str, valor_extremo, duracion, cantidad_ops))
-            in_tramo = False
-            continue
-        if not in_tramo and ((modo == 'ddw' and val < 0) or (modo == 'dup' and val > 0)):
-            in_tramo = True
-            inicio = idx
-            valor_extremo = val
-        elif in_tramo:
-            if (modo == 'ddw' and val < valor_extremo) or (modo == 'dup' and val > valor_extremo):
-                valor_extremo = val
-            if (modo == 'ddw' and val >= 0) or (modo == 'dup' and val <= 0):
-                fecha_inicio = fechas[inicio]
-                fecha_fin = fechas[idx]
-                duracion = fecha_fin - fecha_inicio
-                duracion_str = f"{duracion.days}d {duracion.seconds // 3600}h {(duracion.seconds // 60) % 60}m"
-                cantidad_ops = df.iloc[inicio:idx+1][
-                    ~((df['Deposito'].notna() & df['Deposito'].ne(0)) |
-                      (df['Retiro'].notna() & df['Retiro'].ne(0)))
-                ].shape[0]
-                tramos.append((inicio, idx, duracion_str, valor_extremo, duracion, cantidad_ops))
-                in_tramo = False
-
-    if in_tramo and inicio is not None:
-        fecha_inicio = fechas[inicio]
-        fecha_fin = fechas[-1]
-        duracion = fecha_fin - fecha_inicio
-        duracion_str = f"{duracion.days}d {duracion.seconds // 3600}h {(duracion.seconds // 60) % 60}m"
-        cantidad_ops = df.iloc[inicio:][
-            ~((df['Deposito'].notna() & df['Deposito'].ne(0)) |
-              (df['Retiro'].notna() & df['Retiro'].ne(0)))
-        ].shape[0]
-        tramos.append((inicio, len(fechas)-1, duracion_str, valor_extremo, duracion, cantidad_ops))
 
+def _formato_duracion(duracion: pd.Timedelta) -> str:
+    return f"{duracion.days}d {duracion.seconds // 3600}h {(duracion.seconds // 60) % 60}m"
+
+
+def detectar_tramos(dd_numeric, fechas, modo: str, df: pd.DataFrame, k: int = 5) -> list:
+    """
+    Los k tramos de caída ('ddw', de mayor a menor caída) o de subida
+    ('dup') de la serie DD/Max, como (inicio, fin, duración, extremo,
+    duración TD, ops). Los tramos salen de episodios_drawdown en una
+    pasada; solo los k elegidos se convierten a tuplas.
+    """
+    es_operacion = ~(
+        (df['Deposito'].notna() & df['Deposito'].ne(0)) |
+        (df['Retiro'].notna() & df['Retiro'].ne(0))
+    ).to_numpy()
+    episodios = episodios_drawdown(dd_numeric, modo, fechas, es_operacion)
+    extremo = episodios['extremo']
+    tramos = []
+    for i in top_k(-extremo if modo == 'ddw' else extremo, k):
+        duracion = pd.Timedelta(episodios['duracion'][i])
+        tramos.append((
+            int(episodios['inicio'][i]), int(episodios['fin'][i]), _formato_duracion(duracion),
+            float(extremo[i]), duracion, int(episodios['ops'][i])
+        ))
     return tramos
 
 
@@ -94,34 +72,58 @@ def mostrar_dd_max(df: pd.DataFrame, chart_key: str) -> None:
         st.warning("Faltan datos o columnas necesarias.")
         return
 
+    fig, top5_ddw, top5_dup = memo_grafico('dd_max', df, cfg, lambda: _grafico_dd_max(df, cfg))
+    st.plotly_chart(fig, use_container_width=True)
+
+    # Tablas resumen
+    tab1, tab2 = st.tabs(['🔴 Top D.Dw', '🟢 Top D.Up'])
+    with tab1:
+        if top5_ddw:
+            df_ddw = pd.DataFrame(top5_ddw, columns=['Desde','Hasta','Duración','Máx Caída','Duración TD','Ops'])
+            df_ddw.set_index('Desde', inplace=True)
+            df_ddw['Máx Caída'] = df_ddw['Máx Caída'].map(lambda x: f"{x:.2f}%")
+            st.dataframe(df_ddw.drop(columns=['Duración TD']))
+        else:
+            st.info('No hay D.Dw')
+    with tab2:
+        if top5_dup:
+            df_dup = pd.DataFrame(top5_dup, columns=['Desde','Hasta','Duración','Máx Subida','Duración TD','Ops'])
+            df_dup.set_index('Desde', inplace=True)
+            df_dup['Máx Subida'] = df_dup['Máx Subida'].map(lambda x: f"{x:.2f}%")
+            st.dataframe(df_dup.drop(columns=['Duración TD']))
+        else:
+            st.info('No hay D.Up')
+
+
+def _grafico_dd_max(df: pd.DataFrame, cfg: dict):
+    """(figura, top 5 D.Dw, top 5 D.Up)."""
+    mostrar_sombras, mostrar_ddw, mostrar_dup = cfg['sombras'], cfg['ddw'], cfg['dup']
+
     # Procesar valores de DD/Max y fechas
-    dd_series = pd.to_numeric(df['DD/Max'].astype(str).str.rstrip('%'), errors='coerce')
-    dd_list = [v if not pd.isna(v) else None for v in dd_series.tolist()]
-    fechas = pd.to_datetime(df['Fecha / Hora'], errors='coerce').tolist()
-    valid_indices = [i for i, v in enumerate(dd_list) if v is not None]
-    last_valid = max(valid_indices) if valid_indices else -1
-
-    # Detectar tramos
-    tramos_ddw = detectar_tramos([v if v is not None else 0.0 for v in dd_list], fechas, 'ddw', df) if mostrar_ddw else []
-    tramos_dup = detectar_tramos([v if v is not None else 0.0 for v in dd_list], fechas, 'dup', df) if mostrar_dup else []
-    top5_ddw = sorted(tramos_ddw, key=lambda x: x[3])[:5]
-    top5_dup = sorted(tramos_dup, key=lambda x: -x[3])[:5]
+    dd = pd.to_numeric(df['DD/Max'], errors='coerce').to_numpy(dtype=float)
+    fechas = pd.to_datetime(df['Fecha / Hora'], errors='coerce').to_numpy(dtype='datetime64[ns]')
+    validos = ~np.isnan(dd)
+    last_valid = np.flatnonzero(validos)[-1] if validos.any() else -1
+
+    # Detectar tramos (los 5 mayores de cada tipo)
+    top5_ddw = detectar_tramos(dd, fechas, 'ddw', df) if mostrar_ddw else []
+    top5_dup = detectar_tramos(dd, fechas, 'dup', df) if mostrar_dup else []
 
     # Límites del eje Y
-    y_vals = [v for v in dd_list if v is not None]
-    y_max = max(y_vals) if y_vals else 0.0
-    y_min = min(y_vals) if y_vals else 0.0
+    y_max = float(dd[validos].max()) if validos.any() else 0.0
+    y_min = float(dd[validos].min()) if validos.any() else 0.0
     pad = (y_max - y_min) * 0.1 if y_max != y_min else 1
     yt, yb = y_max + pad, y_min - pad
 
     fig = go.Figure()
-    total = len(dd_list)
+    total = len(dd)
+    tras_ultimo = np.arange(total) > last_valid
 
     # Área de caídas (DDw)
     if mostrar_ddw:
-        y_ddw = [None if i > last_valid else (v if (v is not None and v < 0) else 0) for i, v in enumerate(dd_list)]
+        y_ddw = np.where(tras_ultimo, np.nan, np.where(dd < 0, dd, 0.0))
         fig.add_trace(go.Scatter(
-            x=list(range(total)),
+            x=np.arange(total),
             y=y_ddw,
             fill='tozeroy',
             fillcolor='rgba(255,0,0,0.3)',
@@ -133,9 +135,9 @@ def mostrar_dd_max(df: pd.DataFrame, chart_key: str) -> None:
 
     # Área de subidas (DUp)
     if mostrar_dup:
-        y_dup = [None if i > last_valid else (v if (v is not None and v > 0) else 0) for i, v in enumerate(dd_list)]
+        y_dup = np.where(tras_ultimo, np.nan, np.where(dd > 0, dd, 0.0))
         fig.add_trace(go.Scatter(
-            x=list(range(total)),
+            x=np.arange(total),
             y=y_dup,
             fill='tozeroy',
             fillcolor='rgba(0,255,0,0.3)',
@@ -168,23 +170,4 @@ def mostrar_dd_max(df: pd.DataFrame, chart_key: str) -> None:
         xaxis_title='Índice', yaxis_title='DD/Max (%)',
         template='plotly_dark', showlegend=False
     )
-    st.plotly_chart(fig, use_container_width=True)
-
-    # Tablas resumen
-    tab1, tab2 = st.tabs(['🔴 Top D.Dw', '🟢 Top D.Up'])
-    with tab1:
-        if top5_ddw:
-            df_ddw = pd.DataFrame(top5_ddw, columns=['Desde','Hasta','Duración','Máx Caída','Duración TD','Ops'])
-            df_ddw.set_index('Desde', inplace=True)
-            df_ddw['Máx Caída'] = df_ddw['Máx Caída'].map(lambda x: f"{x:.2f}%")
-            st.dataframe(df_ddw.drop(columns=['Duración TD']))
-        else:
-            st.info('No hay D.Dw')
-    with tab2:
-        if top5_dup:
-            df_dup = pd.DataFrame(top5_dup, columns=['Desde','Hasta','Duración','Máx Subida','Duración TD','Ops'])
-            df_dup.set_index('Desde', inplace=True)
-            df_dup['Máx Subida'] = df_dup['Máx Subida'].map(lambda x: f"{x:.2f}%")
-            st.dataframe(df_dup.drop(columns=['Duración TD']))
-        else:
-            st.info('No hay D.Up')
+    return fig, top5_ddw, top5_dup
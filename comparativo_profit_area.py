@@ -4,6 +4,9 @@ import streamlit as st
 import os
 import json
 
+from aplicar_color_general import formatear_derivada
+from cache_graficos import memo_grafico
+
 
 def mostrar_profit_area(df: pd.DataFrame, chart_key: str) -> None:
     """
@@ -43,21 +46,40 @@ def mostrar_profit_area(df: pd.DataFrame, chart_key: str) -> None:
     except:
         pass
 
-    # Series para gráfico y tabla
-    profit_plot_str = df['Profit Tot.'].astype(str)
-    profit_plot_num = pd.to_numeric(
-        profit_plot_str.str.rstrip('%'), errors='coerce'
+    fig = memo_grafico('profit_area', df, excl, lambda: _figura_area(df, excl))
+    st.plotly_chart(fig, use_container_width=True, key=chart_key)
+
+    # Tabla últimos 5 Depósitos y Retiros
+    tabla = memo_grafico('profit_area.movimientos', df, None, lambda: _tabla_movimientos(df))
+    if tabla is None:
+        st.info("No hay movimientos de Depósito o Retiro.")
+        return
+
+    # Colorear
+    sty = tabla.style
+    sty = sty.applymap(
+        lambda _: 'color: lightblue;',
+        subset=['Últimos 5 Depósitos', 'Deposito D up']
     )
-    profit_tbl_str = (
-        df['Profit T.'].astype(str)
-        if 'Profit T.' in df.columns else profit_plot_str
+    sty = sty.applymap(
+        lambda _: 'color: pink;',
+        subset=['Últimos 5 Retiros', 'Retiro D dw']
     )
+    st.dataframe(sty, use_container_width=True)
+
+
+def _figura_area(df: pd.DataFrame, excl: list) -> go.Figure:
+    df_idx = list(df.index)
+
+    # Series para gráfico y tabla
+    profit_plot_num = pd.to_numeric(df['Profit Tot.'], errors='coerce')
+    profit_plot_str = formatear_derivada('Profit Tot.', profit_plot_num)
 
     # Filtrar índices a graficar
-    plot_idx = [i for i in df_idx if i not in excl]
+    excluidos = set(excl)
+    plot_idx = [i for i in df_idx if i not in excluidos]
     # Excluir el último punto si corresponde a None o NaN
-    ultimo_val = df['Profit Tot.'].iloc[-1]
-    if plot_idx and (ultimo_val is None or str(ultimo_val).strip().lower() == 'none' or pd.isna(ultimo_val)):
+    if plot_idx and pd.isna(profit_plot_num.iloc[-1]):
         last_idx = df_idx[-1]
         if last_idx in plot_idx:
             plot_idx.remove(last_idx)
@@ -77,41 +99,50 @@ def mostrar_profit_area(df: pd.DataFrame, chart_key: str) -> None:
             name='Profit Tot.'
         )
     )
-    # Franjas para Depósito y Retiro
+    # Franjas para Depósito y Retiro (todas de una vez: add_shape por
+    # franja revalida el layout y se vuelve cuadrático)
+    franjas = []
     for idx in x_vals:
         prev = idx - 1
         if prev < 0:
             continue
         if 'Deposito' in df.columns and pd.notna(df.loc[idx, 'Deposito']):
-            fig.add_shape(
+            franjas.append(dict(
                 type='rect', xref='x', yref='paper',
                 x0=prev, x1=idx, y0=0, y1=1,
                 fillcolor='lightblue', opacity=0.3,
                 layer='below', line_width=0
-            )
+            ))
         if 'Retiro' in df.columns and pd.notna(df.loc[idx, 'Retiro']):
-            fig.add_shape(
+            franjas.append(dict(
                 type='rect', xref='x', yref='paper',
                 x0=prev, x1=idx, y0=0, y1=1,
                 fillcolor='pink', opacity=0.3,
                 layer='below', line_width=0
-            )
+            ))
 
     fig.update_layout(
         xaxis_title='Índice', yaxis_title='Profit Tot.',
-        template='plotly_dark', showlegend=False
+        template='plotly_dark', showlegend=False,
+        shapes=franjas
     )
-    st.plotly_chart(fig, use_container_width=True, key=chart_key)
+    return fig
 
-    # Tabla últimos 5 Depósitos y Retiros
+
+def _tabla_movimientos(df: pd.DataFrame):
+    """Últimos 5 depósitos y retiros con su Profit T. y totales, o None si no hay."""
+    profit_tbl_str = (
+        formatear_derivada('Profit T.', df['Profit T.'])
+        if 'Profit T.' in df.columns
+        else formatear_derivada('Profit Tot.', pd.to_numeric(df['Profit Tot.'], errors='coerce'))
+    )
     movs = df.loc[
         df.get('Deposito', pd.NA).notna() |
         df.get('Retiro', pd.NA).notna(),
         ['Deposito', 'Retiro']
     ].copy()
     if movs.empty:
-        st.info("No hay movimientos de Depósito o Retiro.")
-        return
+        return None
     movs = movs.reset_index().rename(columns={'index': 'Índice'})
     ult_dep = movs.loc[movs['Deposito'].notna(), ['Índice', 'Deposito']].tail(5)
     ult_ret = movs.loc[movs['Retiro'].notna(), ['Índice', 'Retiro']].tail(5)
@@ -157,15 +188,4 @@ def mostrar_profit_area(df: pd.DataFrame, chart_key: str) -> None:
             return v
     tabla['Últimos 5 Depósitos'] = tabla['Últimos 5 Depósitos'].apply(fmt)
     tabla['Últimos 5 Retiros'] = tabla['Últimos 5 Retiros'].apply(fmt)
-
-    # Colorear
-    sty = tabla.style
-    sty = sty.applymap(
-        lambda _: 'color: lightblue;',
-        subset=['Últimos 5 Depósitos', 'Deposito D up']
-    )
-    sty = sty.applymap(
-        lambda _: 'color: pink;',
-        subset=['Últimos 5 Retiros', 'Retiro D dw']
-    )
-    st.dataframe(sty, use_container_width=True)
+    return tabla
@@ -2,18 +2,26 @@ import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 
+from cache_graficos import memo_grafico
+from cubo_tiempo import agregado
+
 def comparativo_profit_dia_semana(df: pd.DataFrame, chart_key: str = "profit_dia_semana") -> None:
     if 'Día' not in df.columns or 'Profit' not in df.columns or 'C&P' not in df.columns:
         st.warning("Faltan columnas necesarias ('Día', 'Profit' o 'C&P') en el DataFrame.")
         return
 
-    df = df.copy()
-    df = df[df['C&P'].str.strip() != ""]  # excluir depósitos/retiros
+    fig = memo_grafico('profit_dia_semana', df, None, lambda: _figura_profit_dia_semana(df))
+    st.plotly_chart(fig, use_container_width=True, key=chart_key)
+
+
+def _figura_profit_dia_semana(df: pd.DataFrame) -> go.Figure:
+    celdas = agregado(df)
+    celdas = celdas[celdas['C&P'].str.strip() != ""]  # excluir depósitos/retiros
 
     dias_orden = ['Lu', 'Ma', 'Mi', 'Ju', 'Vi', 'Sa', 'Do']
-    df = df[df['Día'].isin(dias_orden)]
+    celdas = celdas.assign(Día=celdas['Dia'].map(dict(enumerate(dias_orden))))
 
-    resumen = df.groupby('Día')['Profit'].sum().reindex(dias_orden).fillna(0)
+    resumen = celdas.groupby('Día')['suma'].sum().reindex(dias_orden).fillna(0)
     colores = ['green' if val >= 0 else 'red' for val in resumen]
 
     fig = go.Figure(go.Bar(
@@ -31,5 +39,4 @@ def comparativo_profit_dia_semana(df: pd.DataFrame, chart_key: str = "profit_dia
         width=900,
         showlegend=False
     )
-
-    st.plotly_chart(fig, use_container_width=True, key=chart_key) 
\ No newline at end of file
+    return fig 
\ No newline at end of file
@@ -4,6 +4,8 @@ import streamlit as st
 import os
 import json
 
+from cache_graficos import memo_grafico
+
 def cargar_configuracion_exclusiones(chart_key, df_idx):
     json_file = f"{chart_key}_excl.json"
     excl_data = {
@@ -56,21 +58,6 @@ def mostrar_profit_puntos(df: pd.DataFrame, chart_key: str) -> None:
     df_idx    = list(df.index)
     excl_data = cargar_configuracion_exclusiones(chart_key, df_idx)
 
-    profit_str = df['Profit'].astype(str)
-    profit_num = pd.to_numeric(profit_str.str.replace(',', ''), errors='coerce').fillna(0.0)
-
-    # Detectar depósitos/retiros en distintas estructuras posibles
-    if 'Deposito' in df.columns and 'Retiro' in df.columns:
-        is_deposito = df['Deposito'].notna() & (df['Deposito'] != 0)
-        is_retiro   = df['Retiro'].notna()   & (df['Retiro']   != 0)
-    elif 'Deposito o Retiro' in df.columns:
-        col_dr      = df['Deposito o Retiro'].astype(str).str.strip().str.lower()
-        is_deposito = col_dr == 'deposito'
-        is_retiro   = col_dr == 'retiro'
-    else:
-        is_deposito = pd.Series(False, index=df.index)
-        is_retiro   = pd.Series(False, index=df.index)
-
     # Tres pestañas de control
     tab_color, tab_puntos, tab_dr = st.tabs([
         "Por Color", "Por Puntos", "Depósitos/Retiros"
@@ -117,6 +104,32 @@ def mostrar_profit_puntos(df: pd.DataFrame, chart_key: str) -> None:
     }
     guardar_configuracion_exclusiones(chart_key, excl_data)
 
+    fig = memo_grafico('profit_puntos', df, excl_data, lambda: _figura_profit_puntos(df, excl_data))
+    st.plotly_chart(fig, use_container_width=True, key=chart_key)
+
+
+def _figura_profit_puntos(df: pd.DataFrame, excl_data: dict) -> go.Figure:
+    excl_indices = excl_data["indices"]
+    show_cero, show_positivo, show_negativo = (
+        excl_data["series"]["cero"], excl_data["series"]["positivo"], excl_data["series"]["negativo"]
+    )
+    excl_depositos, excl_retiros = excl_data["dr"]["deposito"], excl_data["dr"]["retiro"]
+
+    profit_str = df['Profit'].astype(str)
+    profit_num = pd.to_numeric(profit_str.str.replace(',', ''), errors='coerce').fillna(0.0)
+
+    # Detectar depósitos/retiros en distintas estructuras posibles
+    if 'Deposito' in df.columns and 'Retiro' in df.columns:
+        is_deposito = df['Deposito'].notna() & (df['Deposito'] != 0)
+        is_retiro   = df['Retiro'].notna()   & (df['Retiro']   != 0)
+    elif 'Deposito o Retiro' in df.columns:
+        col_dr      = df['Deposito o Retiro'].astype(str).str.strip().str.lower()
+        is_deposito = col_dr == 'deposito'
+        is_retiro   = col_dr == 'retiro'
+    else:
+        is_deposito = pd.Series(False, index=df.index)
+        is_retiro   = pd.Series(False, index=df.index)
+
     # Máscara base: excluye manual y según DR
     mask_base = pd.Series(True, index=df.index)
     mask_base &= ~pd.Series(df.index.isin(excl_indices), index=df.index)
@@ -153,5 +166,4 @@ def mostrar_profit_puntos(df: pd.DataFrame, chart_key: str) -> None:
         template='plotly_dark',
         showlegend=False
     )
-
-    st.plotly_chart(fig, use_container_width=True, key=chart_key)
+    return fig
@@ -4,11 +4,14 @@ import plotly.graph_objects as go
 import os
 import json
 
+from cache_graficos import memo_grafico
+
 def comparativo_put_barra(df: pd.DataFrame, chart_key: str = "put_bar_chart") -> None:
     if 'C&P' not in df.columns or 'Profit' not in df.columns:
         st.warning("Faltan columnas necesarias ('C&P' o 'Profit') en el DataFrame.")
         return
 
+    df_rango = df
     df = df.copy().reset_index(drop=True)
     df["Index"] = df.index
     df_idx = list(df.index)
@@ -58,6 +61,11 @@ def comparativo_put_barra(df: pd.DataFrame, chart_key: str = "put_bar_chart") ->
     with open(json_file, "w") as f:
         json.dump(excl_data, f, indent=2)
 
+    fig = memo_grafico('put_barra', df_rango, excl_data, lambda: _figura_put_barra(df, excl_data))
+    st.plotly_chart(fig, use_container_width=True, key=chart_key)
+
+
+def _figura_put_barra(df: pd.DataFrame, excl_data: dict) -> go.Figure:
     df = df.loc[~df.index.isin(excl_data["indices"])]
     df = df.reset_index(drop=True)
     df["Index"] = df.index
@@ -96,5 +104,4 @@ def comparativo_put_barra(df: pd.DataFrame, chart_key: str = "put_bar_chart") ->
         width=900,
         showlegend=False
     )
-
-    st.plotly_chart(fig, use_container_width=True, key=chart_key) 
\ No newline at end of file
+    return fig 
\ No newline at end of file
@@ -1,7 +1,14 @@
+import numpy as np
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 
+from cache_graficos import memo_grafico
+from calculos_drawdown import rachas_signo, top_k
+
+# Color de los puntos: depósito, retiro, profit > 0, profit < 0, resto
+COLORES_PUNTO = ['#3399FF', '#FF69B4', 'green', 'red', 'yellow']
+
 def comparativo_racha_dd_max(df: pd.DataFrame, chart_key: str = "racha_dd_max") -> None:
     # 0) Salida temprana si no hay datos
     if df.empty:
@@ -15,111 +22,120 @@ def comparativo_racha_dd_max(df: pd.DataFrame, chart_key: str = "racha_dd_max")
         st.warning(f"Faltan columnas necesarias para el cálculo: {', '.join(missing_cols)}.")
         return
 
-    # 2) Preparar DataFrame y conservar índice original
-    df = df.copy()
-    df['Original_Index'] = df.index
-    df.reset_index(drop=True, inplace=True)
-    df["Index"] = df.index
-    df['es_deposito'] = df.get('Deposito', 0).notna() & (df.get('Deposito', 0) != 0)
-    df['es_retiro']   = df.get('Retiro', 0).notna() & (df.get('Retiro', 0) != 0)
-
-    df['dd_val'] = pd.to_numeric(
-        df['DD/Max'].astype(str).str.rstrip('%'),
-        errors='coerce'
-    )
+    # 4) Checkbox para mostrar/ocultar tablas
+    mostrar_tablas = st.checkbox("Mostrar tablas de rachas", value=True, key=f"{chart_key}_tbl_chk")
 
+    fig, df_pos, df_neg = memo_grafico('racha_dd_max', df, None, lambda: _grafico_racha(df))
+    st.plotly_chart(fig, use_container_width=True, key=chart_key)
 
-    df['signo_dd'] = df['dd_val'].apply(lambda v: 1 if v>0 else -1 if v<0 else 0)
-    df['run_id_dd'] = (df['signo_dd'] != df['signo_dd'].shift()).cumsum()
+    if not mostrar_tablas:
+        return
 
-    for col in ['Fecha / Hora', 'Fecha / Hora de Cierre']:
-        if col in df.columns:
-            df[col] = pd.to_datetime(df[col], errors='coerce')
-
-    # 3) Resumen de rachas DD/Max
-    resumen = (
-        df.groupby(['run_id_dd', 'signo_dd'])
-          .apply(lambda g: pd.Series({
-              'run_id_dd': g['run_id_dd'].iloc[0],
-              'signo_dd': g['signo_dd'].iloc[0],
-              'Racha_Ops': g.shape[0],
-              'DD_Maximo_Drawdown': g['dd_val'].min(),
-              'DD_Maximo_Drawup':    g['dd_val'].max(),
-              'Duracion': (
-                  pd.to_timedelta(
-                      g['Fecha / Hora de Cierre'].iloc[-1] 
-                      - g['Fecha / Hora'].iloc[0]
-                  ) if pd.notna(g['Fecha / Hora de Cierre'].iloc[-1]) 
-                        and pd.notna(g['Fecha / Hora'].iloc[0])
-                  else pd.Timedelta(0)
-              )
-          }))
-          .reset_index(drop=True)
-    )
+    tab1, tab2 = st.tabs(["Top 5 Positivas","Top 5 Negativas"])
+    with tab1:
+        sty_pos = df_pos.style.applymap(lambda _: 'color: green;', subset=['Racha Positiva','Maximo Drawup'])
+        st.dataframe(sty_pos, use_container_width=True)
+    with tab2:
+        sty_neg = df_neg.style.applymap(lambda _: 'color: red;', subset=['Racha Negativa','Maximo Drawdown'])
+        st.dataframe(sty_neg, use_container_width=True)
 
-    # 3.1) Calcular Media_Ops con seguridad
-    if resumen.empty:
-        resumen['Media_Ops'] = None
-    else:
-        try:
-            resumen['Media_Ops'] = resumen.groupby('signo_dd')['Racha_Ops'].transform('mean')
-        except KeyError as e:
-            st.warning(f"No se pudo calcular la media de operaciones: {e}")
-            resumen['Media_Ops'] = None
 
-    top_pos = resumen[resumen['signo_dd'] == 1].nlargest(5, 'Racha_Ops')
-    top_neg = resumen[resumen['signo_dd'] == -1].nlargest(5, 'Racha_Ops')
+def _grafico_racha(df: pd.DataFrame):
+    """(figura, tabla top 5 rachas positivas, tabla top 5 negativas)."""
+    # 2) Series como arrays (posición 0..n-1) y rachas de signo de DD/Max
+    n = len(df)
+    original = df.index.to_numpy()
+    dd_val = pd.to_numeric(df['DD/Max'], errors='coerce').to_numpy(dtype=float)
+    profit = pd.to_numeric(df['Profit'], errors='coerce').to_numpy(dtype=float)
 
-    # 4) Checkbox para mostrar/ocultar tablas
-    mostrar_tablas = st.checkbox("Mostrar tablas de rachas", value=True, key=f"{chart_key}_tbl_chk")
+    inicios, fines, signos = rachas_signo(dd_val)
+    largos = fines - inicios + 1
+
+    def fechas(col):
+        if col in df.columns:
+            return pd.to_datetime(df[col], errors='coerce').to_numpy(dtype='datetime64[ns]')
+        return np.full(n, np.datetime64('NaT'), dtype='datetime64[ns]')
 
-    # 5) Construir gráfico de rachas
-    shapes = []
-    destacados = set(top_pos['run_id_dd']).union(top_neg['run_id_dd'])
-    for run, grupo in df.groupby('run_id_dd'):
-        if run in destacados:
-            color = 'green' if grupo['signo_dd'].iloc[0] > 0 else 'red'
-            shapes.append(dict(
-                type='rect', xref='x', yref='paper',
-                x0=grupo['Index'].min(), x1=grupo['Index'].max(),
-                y0=0, y1=1, fillcolor=color, opacity=0.1,
-                layer='below', line_width=0
-            ))
+    # 3) Resumen de rachas DD/Max: extremos por racha con reduceat (sin NaN)
+    if n:
+        minimos = np.fmin.reduceat(dd_val, inicios)
+        maximos = np.fmax.reduceat(dd_val, inicios)
+    else:
+        minimos = maximos = np.empty(0)
+    fin_racha, inicio_racha = fechas('Fecha / Hora de Cierre')[fines], fechas('Fecha / Hora')[inicios]
+    duraciones = np.where(
+        np.isnat(fin_racha) | np.isnat(inicio_racha),
+        np.timedelta64(0, 'ns'), fin_racha - inicio_racha
+    )
+    # Media de operaciones por racha de cada signo
+    clase = signos + 1
+    medias = (np.bincount(clase, weights=largos, minlength=3)
+              / np.maximum(np.bincount(clase, minlength=3), 1))[clase]
+
+    resumen = pd.DataFrame({
+        'signo_dd': signos,
+        'Racha_Ops': largos,
+        'DD_Maximo_Drawdown': minimos,
+        'DD_Maximo_Drawup': maximos,
+        'Duracion': pd.to_timedelta(duraciones),
+        'Media_Ops': medias,
+    })
+    pos_runs = np.flatnonzero(signos == 1)
+    neg_runs = np.flatnonzero(signos == -1)
+    top_pos = resumen.iloc[pos_runs[top_k(largos[pos_runs])]]
+    top_neg = resumen.iloc[neg_runs[top_k(largos[neg_runs])]]
+
+    # 5) Construir gráfico de rachas: franjas de las rachas destacadas
+    shapes = [
+        dict(
+            type='rect', xref='x', yref='paper',
+            x0=int(inicios[r]), x1=int(fines[r]),
+            y0=0, y1=1, fillcolor='green' if signos[r] > 0 else 'red', opacity=0.1,
+            layer='below', line_width=0
+        )
+        for r in np.sort(np.r_[top_pos.index, top_neg.index])
+    ]
 
     fig = go.Figure().update_layout(hovermode="x unified", shapes=shapes)
 
-    for run, grupo in df.groupby('run_id_dd'):
-        signo = grupo['signo_dd'].iloc[0]
-        line_color = 'green' if signo > 0 else 'red' if signo < 0 else 'yellow'
-
-        if grupo['Index'].iloc[0] > 0:
-            prev = grupo['Index'].iloc[0] - 1
-            x_vals = [prev] + grupo['Index'].tolist()
-            y_vals = [df.loc[prev, 'dd_val']] + grupo['dd_val'].tolist()
-        else:
-            x_vals = grupo['Index'].tolist()
-            y_vals = grupo['dd_val'].tolist()
-
-        marker_colors = []
-        for idx in x_vals:
-            dep  = df.at[idx, 'Deposito'] if 'Deposito' in df.columns else None
-            ret  = df.at[idx, 'Retiro']   if 'Retiro' in df.columns else None
-            if pd.notna(dep) and dep != 0:
-                marker_colors.append('#3399FF')
-            elif pd.notna(ret) and ret != 0:
-                marker_colors.append('#FF69B4')
-            else:
-                p = df.at[idx, 'Profit']
-                marker_colors.append('green' if p>0 else 'red' if p<0 else 'yellow')
-
-        custom_idx = [df.loc[idx, 'Original_Index'] for idx in x_vals]
+    # Color de cada punto (depósito, retiro o signo del profit) como código
+    # numérico con una escala discreta: plotly valida los números de golpe y
+    # los nombres de color uno a uno
+    deposito = pd.to_numeric(df['Deposito'], errors='coerce').to_numpy(dtype=float) if 'Deposito' in df.columns else np.zeros(n)
+    retiro = pd.to_numeric(df['Retiro'], errors='coerce').to_numpy(dtype=float) if 'Retiro' in df.columns else np.zeros(n)
+    codigos = np.select(
+        [(deposito != 0) & ~np.isnan(deposito), (retiro != 0) & ~np.isnan(retiro), profit > 0, profit < 0],
+        [0, 1, 2, 3], default=4
+    )
+    escala = []
+    for i, color in enumerate(COLORES_PUNTO):
+        escala += [[i / len(COLORES_PUNTO), color], [(i + 1) / len(COLORES_PUNTO), color]]
+
+    # Una traza por signo: cada racha empieza en el último punto de la
+    # anterior (para que la línea no se corte) y acaba en un hueco (NaN)
+    for signo, line_color in ((1, 'green'), (-1, 'red'), (0, 'yellow')):
+        runs = np.flatnonzero(signos == signo)
+        if not len(runs):
+            continue
+        desde = np.maximum(inicios[runs] - 1, 0)
+        tramo = fines[runs] - desde + 2
+        salto = np.cumsum(tramo) - tramo
+        pos = np.arange(tramo.sum()) - np.repeat(salto, tramo) + np.repeat(desde, tramo)
+        hueco = np.zeros(len(pos), dtype=bool)
+        hueco[np.cumsum(tramo) - 1] = True
+        pos = np.where(hueco, 0, pos)
+
+        x_vals = np.where(hueco, np.nan, pos)
+        y_vals = np.where(hueco, np.nan, dd_val[pos])
+        custom_idx = np.where(hueco, None, original[pos].astype(object))
         fig.add_trace(go.Scatter(
-            x=x_vals,
-            y=y_vals,
+            x=x_vals[:-1],
+            y=y_vals[:-1],
             mode="lines+markers",
             line=dict(color=line_color),
-            marker=dict(color=marker_colors, size=12),
-            customdata=custom_idx,
+            marker=dict(color=codigos[pos][:-1], colorscale=escala, cmin=-0.5,
+                        cmax=len(COLORES_PUNTO) - 0.5, size=12),
+            customdata=custom_idx[:-1],
             hovertemplate="Fila real: %{customdata}<br>Valor: %{y:.2f}%<extra></extra>",
             showlegend=False
         ))
@@ -130,11 +146,6 @@ def comparativo_racha_dd_max(df: pd.DataFrame, chart_key: str = "racha_dd_max")
         template='plotly_dark',
         height=400
     )
-    st.plotly_chart(fig, use_container_width=True, key=chart_key)
-
-    if not mostrar_tablas:
-        return
-
     def fmt_pct(v): return f"{v:.2f}%"
     def fmt_td(td):
         if pd.isna(td): return "NaT"
@@ -165,21 +176,16 @@ def comparativo_racha_dd_max(df: pd.DataFrame, chart_key: str = "racha_dd_max")
         'Media_Ops':'Media Ops dw'
     }, inplace=True)
 
-    df_pf = df.copy()
-    df_pf['signo_pf'] = df_pf['Profit'].apply(lambda v: 1 if v>0 else -1 if v<0 else 0)
-    df_pf['run_id_pf'] = (df_pf['signo_pf'] != df_pf['signo_pf'].shift()).cumsum()
-    resumen_pf = df_pf.groupby(['run_id_pf','signo_pf'], as_index=False).agg(Racha_Profit=('Index','count'))
-    up = resumen_pf[resumen_pf['signo_pf']==1].nlargest(5,'Racha_Profit')['Racha_Profit'].tolist()
-    dw = resumen_pf[resumen_pf['signo_pf']==-1].nlargest(5,'Racha_Profit')['Racha_Profit'].tolist()
+    # Rachas del signo del profit (operación a operación)
+    inicios_pf, fines_pf, signos_pf = rachas_signo(profit)
+    largos_pf = fines_pf - inicios_pf + 1
+    up = largos_pf[signos_pf == 1]
+    dw = largos_pf[signos_pf == -1]
+    up = up[top_k(up)].tolist()
+    dw = dw[top_k(dw)].tolist()
 
     n_pos, n_neg = len(df_pos), len(df_neg)
     df_pos['Racha Positiva'] = up[:n_pos] + [None]*(n_pos - len(up))
     df_neg['Racha Negativa'] = dw[:n_neg] + [None]*(n_neg - len(dw))
 
-    tab1, tab2 = st.tabs(["Top 5 Positivas","Top 5 Negativas"])
-    with tab1:
-        sty_pos = df_pos.style.applymap(lambda _: 'color: green;', subset=['Racha Positiva','Maximo Drawup'])
-        st.dataframe(sty_pos, use_container_width=True)
-    with tab2:
-        sty_neg = df_neg.style.applymap(lambda _: 'color: red;', subset=['Racha Negativa','Maximo Drawdown'])
-        st.dataframe(sty_neg, use_container_width=True)
+    return fig, df_pos, df_neg
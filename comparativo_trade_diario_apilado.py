@@ -4,16 +4,16 @@ import plotly.graph_objects as go
 import os
 import json
 
+from cache_graficos import memo_grafico
+from cubo_tiempo import agregado
+
 def comparativo_trade_diario_apilado(df: pd.DataFrame, chart_key: str = "trade_diario_apilado") -> None:
     if 'C&P' not in df.columns or 'Fecha / Hora' not in df.columns:
         st.warning("Faltan columnas necesarias ('C&P' o 'Fecha / Hora') en el DataFrame.")
         return
 
-    df = df.copy()
-    df = df[df['C&P'].str.strip() != ""]  # excluir depósitos y retiros
-    df = df.reset_index(drop=True)
-    df['Fecha'] = pd.to_datetime(df['Fecha / Hora']).dt.date.astype(str)
-    fechas_unicas = df['Fecha'].unique().tolist()
+    df_rango = df
+    df, fechas_unicas = memo_grafico('trade_diario_apilado.datos', df_rango, None, lambda: _datos_trade_diario(df_rango))
 
     # Configuración de exclusiones
     chart_key = chart_key.replace('/', '_').replace('\\', '_').replace(' ', '_')
@@ -62,11 +62,25 @@ def comparativo_trade_diario_apilado(df: pd.DataFrame, chart_key: str = "trade_d
     with open(json_file, 'w') as f:
         json.dump(excl_data, f, indent=2)
 
+    fig = memo_grafico('trade_diario_apilado', df_rango, excl_data, lambda: _figura_trade_diario(df, excl_data))
+    st.plotly_chart(fig, use_container_width=True, key=chart_key)
+
+
+def _datos_trade_diario(df: pd.DataFrame):
+    """Celdas del cubo de las operaciones (sin depósitos ni retiros) con su 'Fecha' en texto y las fechas distintas."""
+    celdas = agregado(df)
+    celdas = celdas[celdas['C&P'].str.strip() != ""]  # excluir depósitos y retiros
+    celdas = celdas.assign(Fecha=celdas['Fecha'].dt.strftime('%Y-%m-%d').fillna('NaT'))
+    orden = celdas.groupby('Fecha', sort=False)['primera'].min().sort_values()
+    return celdas, orden.index.tolist()
+
+
+def _figura_trade_diario(df: pd.DataFrame, excl_data: dict) -> go.Figure:
     # Aplicar exclusiones
     df = df[~df['Fecha'].isin(excl_data['excl_fechas'])]
 
     # Agrupar y contar operaciones por día
-    conteo = df.groupby(['Fecha', 'C&P']).size().unstack(fill_value=0)
+    conteo = df.groupby(['Fecha', 'C&P'])['n'].sum().unstack(fill_value=0)
 
     fechas = conteo.index.tolist()
     call_vals = conteo['CALL'] if 'CALL' in conteo.columns and excl_data['series']['CALL'] else [0] * len(fechas)
@@ -101,5 +115,4 @@ def comparativo_trade_diario_apilado(df: pd.DataFrame, chart_key: str = "trade_d
         width=900,
         showlegend=True
     )
-
-    st.plotly_chart(fig, use_container_width=True, key=chart_key)
+    return fig
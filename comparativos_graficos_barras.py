@@ -4,6 +4,8 @@ import pandas as pd
 import plotly.graph_objects as go
 import streamlit as st
 
+from cache_graficos import memo_grafico
+
 def mostrar_profit_interactivo(df: pd.DataFrame, chart_key: str) -> None:
     """Gráfico de barras interactivo con pestañas para excluir índices y depósitos/retiros,
     persistencia en JSON y exclusión por defecto de índice 0 que puedes ajustar."""
@@ -34,18 +36,6 @@ def mostrar_profit_interactivo(df: pd.DataFrame, chart_key: str) -> None:
         st.warning("No hay datos")
         return
 
-    # convertir Profit a numérico
-    profit = pd.to_numeric(df['Profit'].astype(str).str.replace(',', ''), errors='coerce').fillna(0)
-
-    # detectar depósitos/retiros
-    if 'Deposito o Retiro' in df.columns:
-        dr = df['Deposito o Retiro'].astype(str).str.strip().str.lower()
-        is_deposito = dr == 'deposito'
-        is_retiro   = dr == 'retiro'
-    else:
-        is_deposito = df.get('Deposito', pd.Series(False, index=df.index)).notna() & (df.get('Deposito') != 0)
-        is_retiro   = df.get('Retiro',   pd.Series(False, index=df.index)).notna()   & (df.get('Retiro')   != 0)
-
     # — UI en pestañas —
     tab_idxs, tab_dr = st.tabs(["Excluir Índices", "Filtros Depósitos/Retiros"])
 
@@ -86,6 +76,23 @@ def mostrar_profit_interactivo(df: pd.DataFrame, chart_key: str) -> None:
     except Exception as e:
         st.error(f"Error al guardar configuración: {e}")
 
+    fig = memo_grafico('barras', df, cfg, lambda: _figura_barras(df, excl_indices, excl_dep, excl_ret))
+    st.plotly_chart(fig, use_container_width=True, key=chart_key)
+
+
+def _figura_barras(df: pd.DataFrame, excl_indices: list, excl_dep: bool, excl_ret: bool) -> go.Figure:
+    # convertir Profit a numérico
+    profit = pd.to_numeric(df['Profit'].astype(str).str.replace(',', ''), errors='coerce').fillna(0)
+
+    # detectar depósitos/retiros
+    if 'Deposito o Retiro' in df.columns:
+        dr = df['Deposito o Retiro'].astype(str).str.strip().str.lower()
+        is_deposito = dr == 'deposito'
+        is_retiro   = dr == 'retiro'
+    else:
+        is_deposito = df.get('Deposito', pd.Series(False, index=df.index)).notna() & (df.get('Deposito') != 0)
+        is_retiro   = df.get('Retiro',   pd.Series(False, index=df.index)).notna()   & (df.get('Retiro')   != 0)
+
     # — aplicar exclusiones al serie de profit —
     mask = ~profit.index.isin(excl_indices)
     profit = profit[mask]
@@ -112,5 +119,4 @@ def mostrar_profit_interactivo(df: pd.DataFrame, chart_key: str) -> None:
         legend={'itemclick': 'toggle', 'itemdoubleclick': 'toggleothers'},
         showlegend=True
     )
-
-    st.plotly_chart(fig, use_container_width=True, key=chart_key)
+    return fig
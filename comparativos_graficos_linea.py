@@ -4,6 +4,8 @@ import streamlit as st
 import os
 import json
 
+from cache_graficos import memo_grafico
+
 def mostrar_profit_trend_interactivo(df: pd.DataFrame, chart_key: str) -> None:
     cols_req = ['Profit Tot.', 'Profit Alcanzado', 'Profit Media']
     if df.empty or not all(col in df.columns for col in cols_req):
@@ -72,6 +74,16 @@ def mostrar_profit_trend_interactivo(df: pd.DataFrame, chart_key: str) -> None:
     except Exception:
         pass
 
+    fig = memo_grafico('lineas', df, excl_data, lambda: _figura_lineas(df, excl_data))
+    st.plotly_chart(fig, use_container_width=True, key=chart_key)
+
+
+def _figura_lineas(df: pd.DataFrame, excl_data: dict) -> go.Figure:
+    cols_req = ['Profit Tot.', 'Profit Alcanzado', 'Profit Media']
+    show_tot = excl_data["series"]["Profit Tot."]
+    show_alc = excl_data["series"]["Profit Alcanzado"]
+    show_med = excl_data["series"]["Profit Media"]
+
     # Preparar datos filtrados
     sub_df = df.loc[~df.index.isin(excl_data["indices"]), cols_req].copy()
     sub_df = sub_df.apply(lambda s: pd.to_numeric(
@@ -109,7 +121,6 @@ def mostrar_profit_trend_interactivo(df: pd.DataFrame, chart_key: str) -> None:
         template='plotly_dark',
         showlegend=False  # oculta la leyenda pero mantiene los colores
     )
-
-    st.plotly_chart(fig, use_container_width=True, key=chart_key)
+    return fig
 
 
@@ -6,6 +6,8 @@ import os
 import json
 import re
 
+from cache_graficos import memo_grafico
+
 def mostrar_tiempo_puntos(df: pd.DataFrame, chart_key: str) -> None:
     # 1) Validar columnas
     for col in ['T. Op', 'Profit', 'Deposito', 'Retiro']:
@@ -46,23 +48,10 @@ def mostrar_tiempo_puntos(df: pd.DataFrame, chart_key: str) -> None:
         excl_points = []
     excl_points = [i for i in excl_points if i in df_idx]
 
-    # 4) Convertir 'T. Op' a minutos y preparar formato
-    tiempo_str = df['T. Op'].astype(str)
-    def to_min(t):
-        d = int(re.search(r"(\d+)d", t).group(1)) if re.search(r"(\d+)d", t) else 0
-        h = int(re.search(r"(\d+)h", t).group(1)) if re.search(r"(\d+)h", t) else 0
-        m = int(re.search(r"(\d+)m", t).group(1)) if re.search(r"(\d+)m", t) else 0
-        return d*1440 + h*60 + m
-    tiempo_min = tiempo_str.apply(to_min)
-    tiempo_fmt = {
-        i: f"{tiempo_min[i]//1440}d {((tiempo_min[i]%1440)//60):02d}:{(tiempo_min[i]%60):02d}"
-        for i in df_idx
-    }
-
-    # 5) Valores numéricos
-    profit_num   = pd.to_numeric(df['Profit'].astype(str).str.replace(',', ''), errors='coerce')
-    deposito_num = pd.to_numeric(df['Deposito'].astype(str), errors='coerce').fillna(0)
-    retiro_num   = pd.to_numeric(df['Retiro'].astype(str), errors='coerce').fillna(0)
+    # 4)-5) y 10) Tiempos, valores y franjas por defecto (según las exclusiones guardadas)
+    datos = memo_grafico('tiempo_puntos.datos', df, excl_points, lambda: _datos_tiempo(df, excl_points))
+    edges = datos['edges']
+    default_green, default_red, default_yellow = datos['default_green'], datos['default_red'], datos['default_yellow']
 
     # 6) Crear pestañas
     tabs = st.tabs([
@@ -96,38 +85,6 @@ def mostrar_tiempo_puntos(df: pd.DataFrame, chart_key: str) -> None:
     show_pos  = not ex_pos
     show_neg  = not ex_neg
 
-    # 10) Bines de 4h para franjas por defecto
-    bin_size = 4 * 60
-    edges    = np.arange(0, tiempo_min.max() + bin_size, bin_size)
-
-    def get_max_bin(mask):
-        datos = [tiempo_min[i] for i in df_idx if mask(i)]
-        if not datos:
-            return 0
-        counts, _ = np.histogram(datos, bins=edges)
-        if counts.sum() == 0:
-            return 0
-        return counts.argmax()
-
-    def get_bin_range(bin_idx):
-        if len(edges) < 2:
-            return edges[0], edges[0]
-        if bin_idx + 1 < len(edges):
-            return edges[bin_idx], edges[bin_idx + 1]
-        return edges[-2], edges[-1]
-
-    mask_neg  = lambda i: profit_num[i] < 0 and deposito_num[i] == 0 and retiro_num[i] == 0 and i not in excl_points
-    mask_pos  = lambda i: profit_num[i] > 0 and deposito_num[i] == 0 and retiro_num[i] == 0 and i not in excl_points
-    mask_zero = lambda i: profit_num[i] == 0 and deposito_num[i] == 0 and retiro_num[i] == 0 and i not in excl_points
-
-    bin_pos  = get_max_bin(mask_pos)
-    bin_neg  = get_max_bin(mask_neg)
-    bin_zero = get_max_bin(mask_zero)
-
-    default_green  = get_bin_range(bin_pos)
-    default_red    = get_bin_range(bin_neg)
-    default_yellow = get_bin_range(bin_zero)
-
     # 11) Slider Franjas (con chequeo de valores por defecto)
     def create_slider(tab, label, key, default_range):
         with tab:
@@ -172,6 +129,97 @@ def mostrar_tiempo_puntos(df: pd.DataFrame, chart_key: str) -> None:
     y0_red,    y1_red    = label_to_min(selected_red[0]),    label_to_min(selected_red[1])
     y0_yellow, y1_yellow = label_to_min(selected_yellow[0]), label_to_min(selected_yellow[1])
 
+    # 15) Persistencia
+    excl_data.update({
+        'deposito': ex_dep, 'retiro': ex_ret,
+        'cero': ex_cero,   'positivo': ex_pos, 'negativo': ex_neg,
+        'green': selected_green,
+        'red':   selected_red,
+        'yellow':selected_yellow
+    })
+    with open(settings, 'w') as f:
+        json.dump(excl_data, f)
+    with open(points_file, 'w') as f:
+        json.dump(excl_points, f)
+
+    # Mostrar figura
+    ajustes = {
+        'puntos': excl_points,
+        'series': [show_dep, show_ret, show_cero, show_pos, show_neg],
+        'franjas': [y0_green, y1_green, y0_red, y1_red, y0_yellow, y1_yellow],
+    }
+    fig = memo_grafico('tiempo_puntos', df, ajustes, lambda: _figura_tiempo(df, datos, ajustes))
+    st.plotly_chart(fig, use_container_width=True, key=f"{chart_key}_tiempo")
+
+
+def _datos_tiempo(df: pd.DataFrame, excl_points: list) -> dict:
+    df_idx = list(df.index)
+
+    # 4) Convertir 'T. Op' a minutos y preparar formato
+    tiempo_str = df['T. Op'].astype(str)
+    def to_min(t):
+        d = int(re.search(r"(\d+)d", t).group(1)) if re.search(r"(\d+)d", t) else 0
+        h = int(re.search(r"(\d+)h", t).group(1)) if re.search(r"(\d+)h", t) else 0
+        m = int(re.search(r"(\d+)m", t).group(1)) if re.search(r"(\d+)m", t) else 0
+        return d*1440 + h*60 + m
+    tiempo_min = tiempo_str.apply(to_min)
+    tiempo_fmt = {
+        i: f"{tiempo_min[i]//1440}d {((tiempo_min[i]%1440)//60):02d}:{(tiempo_min[i]%60):02d}"
+        for i in df_idx
+    }
+
+    # 5) Valores numéricos
+    profit_num   = pd.to_numeric(df['Profit'].astype(str).str.replace(',', ''), errors='coerce')
+    deposito_num = pd.to_numeric(df['Deposito'].astype(str), errors='coerce').fillna(0)
+    retiro_num   = pd.to_numeric(df['Retiro'].astype(str), errors='coerce').fillna(0)
+
+    # 10) Bines de 4h para franjas por defecto
+    bin_size = 4 * 60
+    edges    = np.arange(0, tiempo_min.max() + bin_size, bin_size)
+
+    def get_max_bin(mask):
+        datos = [tiempo_min[i] for i in df_idx if mask(i)]
+        if not datos:
+            return 0
+        counts, _ = np.histogram(datos, bins=edges)
+        if counts.sum() == 0:
+            return 0
+        return counts.argmax()
+
+    def get_bin_range(bin_idx):
+        if len(edges) < 2:
+            return edges[0], edges[0]
+        if bin_idx + 1 < len(edges):
+            return edges[bin_idx], edges[bin_idx + 1]
+        return edges[-2], edges[-1]
+
+    mask_neg  = lambda i: profit_num[i] < 0 and deposito_num[i] == 0 and retiro_num[i] == 0 and i not in excl_points
+    mask_pos  = lambda i: profit_num[i] > 0 and deposito_num[i] == 0 and retiro_num[i] == 0 and i not in excl_points
+    mask_zero = lambda i: profit_num[i] == 0 and deposito_num[i] == 0 and retiro_num[i] == 0 and i not in excl_points
+
+    bin_pos  = get_max_bin(mask_pos)
+    bin_neg  = get_max_bin(mask_neg)
+    bin_zero = get_max_bin(mask_zero)
+
+    default_green  = get_bin_range(bin_pos)
+    default_red    = get_bin_range(bin_neg)
+    default_yellow = get_bin_range(bin_zero)
+
+    return {
+        'tiempo_min': tiempo_min, 'tiempo_fmt': tiempo_fmt, 'profit_num': profit_num,
+        'deposito_num': deposito_num, 'retiro_num': retiro_num, 'edges': edges,
+        'default_green': default_green, 'default_red': default_red, 'default_yellow': default_yellow,
+    }
+
+
+def _figura_tiempo(df: pd.DataFrame, datos: dict, ajustes: dict) -> go.Figure:
+    df_idx = list(df.index)
+    excl_points = ajustes['puntos']
+    show_dep, show_ret, show_cero, show_pos, show_neg = ajustes['series']
+    y0_green, y1_green, y0_red, y1_red, y0_yellow, y1_yellow = ajustes['franjas']
+    tiempo_min, tiempo_fmt = datos['tiempo_min'], datos['tiempo_fmt']
+    profit_num, deposito_num, retiro_num = datos['profit_num'], datos['deposito_num'], datos['retiro_num']
+
     # 13) Plot de puntos
     fig = go.Figure()
     if show_dep:
@@ -234,24 +282,11 @@ def mostrar_tiempo_puntos(df: pd.DataFrame, chart_key: str) -> None:
             opacity=0.2, layer='below', line_width=0
         )
 
-    # 15) Persistencia
-    excl_data.update({
-        'deposito': ex_dep, 'retiro': ex_ret,
-        'cero': ex_cero,   'positivo': ex_pos, 'negativo': ex_neg,
-        'green': selected_green,
-        'red':   selected_red,
-        'yellow':selected_yellow
-    })
-    with open(settings, 'w') as f:
-        json.dump(excl_data, f)
-    with open(points_file, 'w') as f:
-        json.dump(excl_points, f)
-
-    # Mostrar figura
     fig.update_layout(
         xaxis_title='Índice', yaxis_title='Tiempo (min)',
         template='plotly_dark', showlegend=False,
         margin=dict(t=40, b=40, l=40, r=40)
     )
-    st.plotly_chart(fig, use_container_width=True, key=f"{chart_key}_tiempo")
+    return fig
+
 
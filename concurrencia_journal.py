@@ -0,0 +1,81 @@
+"""
+Concurrencia optimista al guardar journals en S3.
+
+Cada sesión recuerda la versión (ETag) del objeto que cargó y las firmas
+de sus operaciones (la "base"). Al guardar, la escritura es condicional
+(If-Match con ese ETag, o If-None-Match: * si el objeto aún no existía):
+si otro escritor lo cambió entretanto S3 la rechaza y, en lugar de
+sobrescribirlo, se intenta combinar. Solo se combina la divergencia de
+solo añadir: cuando tanto la copia local como la remota conservan intactas
+las filas de la base y únicamente añaden operaciones al final. Cualquier
+otra divergencia es un ConflictoGuardado.
+"""
+
+import numpy as np
+import pandas as pd
+from pandas.util import hash_pandas_object
+
+import config
+from formato_journal import preparar_para_parquet
+
+FECHAS = ['Fecha / Hora', 'Fecha / Hora de Cierre']
+
+# Columnas que identifican una operación (las que introduce el usuario)
+COLUMNAS_OPERACION = [c for c in config.FIXED_COLS if c not in ('D', 'Día')]
+
+
+class ConflictoGuardado(Exception):
+    """El objeto cambió en S3 desde la última carga y los cambios no se pueden combinar."""
+
+
+def firmas_operaciones(df: pd.DataFrame) -> np.ndarray:
+    """
+    Un hash por fila de las columnas de operación, con los tipos
+    normalizados (números como float64, fechas como datetime64) para que la
+    copia local y la recargada de S3 den las mismas firmas.
+    """
+    cols = [c for c in COLUMNAS_OPERACION if c in df.columns]
+    x = preparar_para_parquet(df[cols])
+    for col in cols:
+        if col in FECHAS:
+            x[col] = pd.to_datetime(x[col], errors='coerce')
+        elif pd.api.types.is_numeric_dtype(x[col]) and not pd.api.types.is_bool_dtype(x[col]):
+            x[col] = x[col].astype('float64')
+    return hash_pandas_object(x, index=False).to_numpy()
+
+
+def base_guardado(clave: str, etag: str | None, df: pd.DataFrame) -> dict:
+    """Base contra la que se guardan los cambios de una sesión."""
+    return {'clave': clave, 'etag': etag, 'firmas': firmas_operaciones(df)}
+
+
+def condicion_escritura(base: dict | None, destino: str, crear: bool = True) -> dict:
+    """
+    Argumentos de put_object para escribir `destino` solo si sigue en la
+    versión de `base`. Si la base es otro objeto (el journal cambia de
+    formato al guardarse), con `crear` se exige que `destino` aún no
+    exista; sin `crear` la escritura no lleva condición.
+    """
+    if base is None:
+        return {}
+    if base['clave'] == destino and base['etag']:
+        return {'IfMatch': base['etag']}
+    return {'IfNoneMatch': '*'} if crear else {}
+
+
+def combinar_anexados(firmas_base: np.ndarray, local: pd.DataFrame, remoto: pd.DataFrame):
+    """
+    Si `local` y `remoto` conservan las filas de la base y solo añaden
+    filas al final, devuelve la base seguida de las filas nuevas del
+    remoto y luego las locales (sin repetir las que ya están en el
+    remoto, p. ej. de un guardado anterior de la misma sesión). Si no,
+    devuelve None.
+    """
+    n = len(firmas_base)
+    f_local, f_remoto = firmas_operaciones(local), firmas_operaciones(remoto)
+    if len(f_local) < n or len(f_remoto) < n:
+        return None
+    if not (np.array_equal(f_local[:n], firmas_base) and np.array_equal(f_remoto[:n], firmas_base)):
+        return None
+    nuevas_local = local.iloc[n:][~np.isin(f_local[n:], f_remoto[n:])]
+    return pd.concat([local.iloc[:n], remoto.iloc[n:], nuevas_local], ignore_index=True)
@@ -27,3 +27,46 @@ ASSETS = [
     'AMD','MU','QCOM','NVDA','AVGO','TSM','SPY','QQQ',
     'DIA','IWM','DEP','RET'
 ]
+
+# Calendario para las duraciones en tiempo hábil ('T. Op', 'Dia LIVE',
+# 'Tiempo D/R'): 'NYSE' excluye además sus festivos; None, solo fines de semana
+CALENDARIO_MERCADO = 'NYSE'
+
+# True: contar solo la sesión regular (9:30-16:00, 13:00 en cierres
+# anticipados), tomando las fechas de la tabla como hora de Nueva York
+SOLO_SESION_REGULAR = False
+
+# Formato en S3 de los journals guardados desde la app: 'parquet' guarda una
+# copia tipada en parquet/{nombre}.parquet (requiere pyarrow); 'csv'
+# sobrescribe el archivo original en uploads/
+FORMATO_ALMACENAMIENTO = 'parquet'
+
+# Journals particionados en S3 (journal_particionado): 'mes' guarda un objeto
+# por mes de 'Fecha / Hora', un número N uno cada N filas; con None cada
+# guardado sube el journal completo
+PARTICIONES_JOURNAL = None
+
+# Caché en disco de los journals descargados de S3 (validada por ETag) y
+# su tamaño máximo; con None no se usa. Tiene que ser un directorio privado
+# del usuario (cache_disco lo crea con permisos 700 y rechaza otro)
+CACHE_DISCO_DIR = os.path.join(
+    os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "hoja_trading"
+)
+CACHE_DISCO_MAX_MB = 512
+
+# Segundos que se reutiliza el listado de archivos de S3 de la barra lateral
+LISTADO_TTL_S = 30
+
+# Memoria máxima de los journals parseados compartidos entre sesiones
+# (registro_journals)
+MEMORIA_JOURNALS_MB = 1024
+
+# Perfilado por etapas de cada rerun (perfil_etapas): se activa con la
+# variable de entorno PERFIL_ETAPAS=1 y deja una línea JSON por etapa en
+# PERFIL_ETAPAS_LOG (por defecto perfil_etapas.jsonl junto a la app)
+PERFIL_ETAPAS = os.getenv("PERFIL_ETAPAS", "").lower() not in ("", "0", "false", "no")
+PERFIL_ETAPAS_LOG = os.getenv("PERFIL_ETAPAS_LOG", os.path.join(BASE_DIR, "perfil_etapas.jsonl"))
+
+# Datos preparados y figuras de los gráficos comparativos que se guardan
+# (cache_graficos); con 0 no se cachean
+CACHE_GRAFICOS_MAX = 64
@@ -1,7 +1,54 @@
+import threading
+from collections import OrderedDict
+
 import pandas as pd
 from dateutil import parser
 from datetime import datetime
 
+# Formatos que se prueban, en orden, sobre las celdas de texto. Los que
+# empiezan por el año (ISO) no son ambiguos y van primero; los de día y mes
+# se ordenan según `dayfirst`.
+FORMATOS_ISO = [
+    '%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M',
+    '%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d',
+    '%Y/%m/%d %H:%M:%S', '%Y/%m/%d %H:%M', '%Y/%m/%d',
+]
+FORMATOS_DIA_MES = [
+    '%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%d/%m/%Y',
+    '%d-%m-%Y %H:%M:%S', '%d-%m-%Y %H:%M', '%d-%m-%Y',
+]
+FORMATOS_MES_DIA = [
+    '%m/%d/%Y %H:%M:%S', '%m/%d/%Y %H:%M', '%m/%d/%Y',
+    '%m-%d-%Y %H:%M:%S', '%m-%d-%Y %H:%M', '%m-%d-%Y',
+]
+
+# Celdas con las que se elige cada formato
+TAM_MUESTRA = 200
+
+# Formatos detectados por (clave de archivo, columna, dayfirst): los reruns
+# sobre el mismo archivo no vuelven a detectarlos. Se guardan los últimos
+# MAX_FORMATOS_DETECTADOS (LRU); las sesiones comparten el proceso
+MAX_FORMATOS_DETECTADOS = 256
+_formatos_detectados: OrderedDict = OrderedDict()
+_formatos_lock = threading.Lock()
+
+
+def _formatos_guardados(clave_cache) -> list | None:
+    with _formatos_lock:
+        formatos = _formatos_detectados.get(clave_cache)
+        if formatos is not None:
+            _formatos_detectados.move_to_end(clave_cache)
+        return formatos
+
+
+def _guardar_formatos(clave_cache, formatos: list) -> None:
+    with _formatos_lock:
+        _formatos_detectados[clave_cache] = formatos
+        _formatos_detectados.move_to_end(clave_cache)
+        while len(_formatos_detectados) > MAX_FORMATOS_DETECTADOS:
+            _formatos_detectados.popitem(last=False)
+
+
 def _robust_parse(val: any, dayfirst: bool, yearfirst: bool) -> pd.Timestamp:
     """
     Fallback para parsear cadenas ambigüas usando dateutil.parser.
@@ -16,16 +63,100 @@ def _robust_parse(val: any, dayfirst: bool, yearfirst: bool) -> pd.Timestamp:
     except Exception:
         return pd.NaT
 
+
+def _formatos_candidatos(dayfirst: bool) -> list:
+    if dayfirst:
+        return FORMATOS_ISO + FORMATOS_DIA_MES + FORMATOS_MES_DIA
+    return FORMATOS_ISO + FORMATOS_MES_DIA + FORMATOS_DIA_MES
+
+
+def _aplicar_formato(textos: pd.Series, formato: str) -> pd.Series:
+    return pd.to_datetime(textos, format=formato, errors='coerce')
+
+
+def _detectar_formatos(textos: pd.Series, dayfirst: bool) -> list:
+    """
+    Formatos presentes en `textos`: con una muestra de las celdas aún sin
+    fecha se elige el candidato que más convierte, se aplica a todas y se
+    repite con las que quedan hasta que ningún candidato convierte nada.
+    """
+    candidatos = _formatos_candidatos(dayfirst)
+    formatos = []
+    pendientes = textos
+    while len(pendientes) and candidatos:
+        muestra = pendientes.iloc[:TAM_MUESTRA]
+        aciertos = [_aplicar_formato(muestra, f).notna().sum() for f in candidatos]
+        mejor = max(range(len(candidatos)), key=lambda i: (aciertos[i], -i))
+        if aciertos[mejor] == 0:
+            break
+        formato = candidatos.pop(mejor)
+        formatos.append(formato)
+        pendientes = pendientes[_aplicar_formato(pendientes, formato).isna()]
+    return formatos
+
+
+def _parsear_columna(serie: pd.Series, dayfirst: bool, yearfirst: bool, clave) -> pd.Series:
+    """
+    Convierte una columna por grupos de formato: cada formato detectado con
+    un pd.to_datetime(format=...) sobre las celdas pendientes, y solo las
+    celdas que no encajan en ninguno pasan por dateutil.
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+    res = pd.Series(pd.NaT, index=serie.index, dtype='datetime64[ns]')
+
+    # Valores que ya son fechas (o números) no necesitan formato
+    if pd.api.types.infer_dtype(serie, skipna=True) in ('string', 'empty'):
+        es_texto = serie.notna()
+    else:
+        es_texto = serie.map(lambda v: isinstance(v, str))
+    otros = serie[~es_texto & serie.notna()]
+    if len(otros):
+        res.loc[otros.index] = pd.to_datetime(otros, errors='coerce')
+
+    textos = serie[es_texto].str.strip()
+    textos = textos[textos != '']
+    if textos.empty:
+        return res
+
+    clave_cache = (clave, serie.name, dayfirst)
+    formatos = _formatos_guardados(clave_cache) if clave is not None else None
+    if formatos is None:
+        formatos = _detectar_formatos(textos, dayfirst)
+        if clave is not None:
+            _guardar_formatos(clave_cache, formatos)
+
+    pendientes = textos
+    for formato in formatos:
+        if pendientes.empty:
+            break
+        fechas = _aplicar_formato(pendientes, formato)
+        ok = fechas.notna()
+        res.loc[fechas.index[ok]] = fechas[ok]
+        pendientes = pendientes[~ok]
+
+    # Solo las celdas sobrantes pasan por dateutil
+    if len(pendientes):
+        sobrantes = pendientes.apply(lambda v: _robust_parse(v, dayfirst, yearfirst))
+        res = res.astype(object)
+        res.loc[sobrantes.index] = sobrantes
+    return res
+
+
 def convertir_fechas(
     df: pd.DataFrame,
     cols: list[str],
     dayfirst: bool = False,
-    yearfirst: bool = False
+    yearfirst: bool = False,
+    clave: str | None = None
 ) -> pd.DataFrame:
     """
-    Convierte las columnas indicadas a datetime64[ns], intentando:
-      1) pd.to_datetime(..., errors='raise')
-      2) .apply(_robust_parse) si falla el paso 1
+    Convierte las columnas indicadas a datetime64[ns]:
+      1) detecta los formatos presentes y convierte cada grupo de celdas
+         con su `format=` explícito (los ISO nunca se leen con dayfirst),
+      2) solo las celdas que no encajan en ninguno pasan por dateutil.
+    Con `clave` (p. ej. el nombre del archivo) los formatos detectados se
+    guardan y los reruns sobre el mismo archivo se saltan la detección.
     Al final fuerza dtype datetime o NaT con errors='coerce'.
     """
     df = df.copy()
@@ -33,22 +164,9 @@ def convertir_fechas(
         if col not in df.columns:
             continue
 
-        # (Opcional) conservar raw
-        # df[f"{col}_raw"] = df[col].astype(str)
-
-        # 1) Intento rápido con pandas
-        try:
-            df[col] = pd.to_datetime(
-                df[col],
-                dayfirst=dayfirst,
-                yearfirst=yearfirst,
-                errors='raise'
-            )
-        except Exception:
-            # 2) Fallback robusto
-            df[col] = df[col].apply(lambda v: _robust_parse(v, dayfirst, yearfirst))
-
-        # 3) Asegurar dtype final
+        df[col] = _parsear_columna(df[col], dayfirst, yearfirst, clave)
+
+        # Asegurar dtype final
         df[col] = pd.to_datetime(df[col], errors='coerce')
 
     return df
@@ -0,0 +1,200 @@
+"""
+Cubo de agregados por fecha, hora, activo, C&P y movimiento.
+
+Los gráficos de tiempo (mapa de calor día/hora, profit por día de la
+semana, operaciones por día apiladas, calendario) agrupaban cada uno las
+filas del journal en cada dibujo. CuboTiempo guarda, para cada fila, su
+celda —día ('Fecha'), 'Hora', 'Activo', 'C&P' y 'Mov' ('DEP' si la fila
+trae un depósito, 'RET' si trae un retiro, si no '')— como códigos,
+junto con su 'Profit' y su 'Deposito', y `agregado` suma por celda
+cualquier rango de filas con np.bincount: número de filas, filas con
+Profit numérico, suma y suma de cuadrados de Profit, ganadoras, perdedoras
+y depósitos. Cada gráfico reduce luego esas
+celdas (por día de la semana, por hora, por fecha…).
+
+ui.py mantiene un cubo por sesión y lo actualiza en cada cambio de los
+datos con las firmas por fila del pipeline (que cubren todas las columnas
+que lee el cubo): solo se vuelven a clasificar las filas nuevas o
+modificadas. Los gráficos lo leen con `agregado(df)` dentro de `usar_cubo`;
+fuera (benchmarks, sin ui.py) se construye uno para el df recibido.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import numpy as np
+import pandas as pd
+
+from pipeline_incremental import FRACCION_RECALCULO_TOTAL
+
+MOVIMIENTOS = np.array(['', 'DEP', 'RET'], dtype=object)
+SIN_HORA = 24
+
+_cubo = ContextVar('cubo_tiempo', default=None)
+
+
+def _texto(serie: pd.Series) -> np.ndarray:
+    return serie.to_numpy(dtype=object)
+
+
+def _numero(df: pd.DataFrame, columna: str) -> np.ndarray:
+    if columna not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[columna], errors='coerce').to_numpy(dtype=float, copy=True)
+
+
+class CuboTiempo:
+    def __init__(self):
+        self._vaciar()
+
+    def _vaciar(self) -> None:
+        # Vocabularios de las dimensiones (solo crecen) y códigos por fila
+        self._vocabulario = {'Fecha': pd.DatetimeIndex([]), 'Activo': pd.Index([], dtype=object),
+                             'C&P': pd.Index([], dtype=object)}
+        self._codigos = {c: np.empty(0, dtype=np.int64) for c in ('Fecha', 'Hora', 'Activo', 'C&P', 'Mov')}
+        self._profit = np.empty(0)
+        self._deposito = np.empty(0)
+        self._firmas = None
+
+    def __len__(self) -> int:
+        return len(self._profit)
+
+    def _codificar(self, dimension: str, valores) -> np.ndarray:
+        vocabulario = self._vocabulario[dimension]
+        codigos = vocabulario.get_indexer(valores)
+        nuevos = codigos < 0
+        if nuevos.any():
+            vocabulario = vocabulario.append(pd.Index(pd.unique(valores[nuevos])))
+            self._vocabulario[dimension] = vocabulario
+            codigos[nuevos] = vocabulario.get_indexer(valores[nuevos])
+        return codigos
+
+    def _clasificar(self, df: pd.DataFrame) -> dict:
+        """Códigos y medidas de las filas de df."""
+        fechas = pd.to_datetime(df['Fecha / Hora'], errors='coerce')
+        deposito = _numero(df, 'Deposito')
+        retiro = _numero(df, 'Retiro')
+        return {
+            'Fecha': self._codificar('Fecha', pd.DatetimeIndex(fechas.dt.normalize())),
+            'Hora': fechas.dt.hour.fillna(SIN_HORA).to_numpy(dtype=np.int64),
+            'Activo': self._codificar('Activo', _texto(df['Activo']) if 'Activo' in df.columns
+                                      else np.full(len(df), np.nan, dtype=object)),
+            'C&P': self._codificar('C&P', _texto(df['C&P'])),
+            'Mov': np.select([np.nan_to_num(deposito) != 0, retiro > 0], [1, 2], default=0),
+            'profit': _numero(df, 'Profit'),
+            'deposito': np.nan_to_num(deposito),
+        }
+
+    def _asignar(self, posiciones: np.ndarray, filas: dict) -> None:
+        for dimension, codigos in self._codigos.items():
+            codigos[posiciones] = filas[dimension]
+        self._profit[posiciones] = filas['profit']
+        self._deposito[posiciones] = filas['deposito']
+
+    def actualizar(self, df: pd.DataFrame, firmas: np.ndarray | None = None) -> 'CuboTiempo':
+        """
+        Pone el cubo al día con df (filas en posiciones 0..n-1). Con las
+        `firmas` por fila del pipeline de la versión anterior y la actual,
+        solo se clasifican las filas cuya firma cambió y las añadidas.
+        """
+        n = len(df)
+        if firmas is None or self._firmas is None:
+            cambiadas = None
+        else:
+            comunes = min(n, len(self._firmas))
+            cambiadas = np.union1d(
+                np.flatnonzero(firmas[:comunes] != self._firmas[:comunes]), np.arange(comunes, n)
+            )
+            if len(cambiadas) > FRACCION_RECALCULO_TOTAL * max(n, 1):
+                cambiadas = None
+
+        if cambiadas is None:
+            self._vaciar()
+            filas = self._clasificar(df)
+            self._codigos = {c: filas[c].astype(np.int64) for c in self._codigos}
+            self._profit, self._deposito = filas['profit'], filas['deposito']
+        else:
+            n_prev = len(self)
+            if n != n_prev:
+                for dimension, codigos in self._codigos.items():
+                    self._codigos[dimension] = np.resize(codigos, n)
+                self._profit = np.resize(self._profit, n)
+                self._deposito = np.resize(self._deposito, n)
+            if len(cambiadas):
+                self._asignar(cambiadas, self._clasificar(df.iloc[cambiadas]))
+        self._firmas = None if firmas is None else np.array(firmas, copy=True)
+        return self
+
+    def agregado(self, inicio: int = 0, fin: int | None = None) -> pd.DataFrame:
+        """
+        Celdas con filas en [inicio, fin): 'Fecha' (día), 'Dia' (0 = lunes),
+        'Hora', 'Activo', 'C&P', 'Mov' y las medidas 'n' (filas),
+        'con_profit' (filas con Profit numérico; las operaciones abiertas y
+        las filas vacías suman 0 en 'suma'), 'suma' y 'suma2' (de Profit y
+        de su cuadrado), 'ganadoras', 'perdedoras', 'deposito',
+        'primer_deposito' (importe de la primera fila de la celda con
+        depósito) y 'primera' (posición de la primera fila de la celda
+        dentro del rango). Las celdas salen en el orden de su primera fila,
+        como un groupby(sort=False).
+        """
+        fin = len(self) if fin is None else fin
+        c = {d: codigos[inicio:fin] for d, codigos in self._codigos.items()}
+        radios = [len(self._vocabulario['Fecha']) or 1, SIN_HORA + 1, len(self._vocabulario['Activo']) or 1,
+                  len(self._vocabulario['C&P']) or 1, len(MOVIMIENTOS)]
+        clave = np.ravel_multi_index([c['Fecha'], c['Hora'], c['Activo'], c['C&P'], c['Mov']], radios)
+        celda, claves = pd.factorize(clave)
+        k = len(claves)
+
+        con_profit = ~np.isnan(self._profit[inicio:fin])
+        profit = np.nan_to_num(self._profit[inicio:fin])
+        m = len(profit)
+        primera = np.empty(k, dtype=np.int64)
+        primera[celda[::-1]] = np.arange(m)[::-1]
+        deposito = self._deposito[inicio:fin]
+        con_deposito = np.flatnonzero(deposito > 0)[::-1]
+        primer_deposito = np.zeros(k)
+        primer_deposito[celda[con_deposito]] = deposito[con_deposito]
+
+        fecha, hora, activo, cp, mov = np.unravel_index(claves, radios)
+        fechas = self._vocabulario['Fecha'].take(fecha)
+        return pd.DataFrame({
+            'Fecha': fechas,
+            'Dia': fechas.weekday,
+            'Hora': np.where(hora == SIN_HORA, np.nan, hora),
+            'Activo': self._vocabulario['Activo'].take(activo).to_numpy(dtype=object),
+            'C&P': self._vocabulario['C&P'].take(cp).to_numpy(dtype=object),
+            'Mov': MOVIMIENTOS[mov],
+            'n': np.bincount(celda, minlength=k),
+            'con_profit': np.bincount(celda, weights=con_profit, minlength=k).astype(np.int64),
+            'suma': np.bincount(celda, weights=profit, minlength=k),
+            'suma2': np.bincount(celda, weights=profit * profit, minlength=k),
+            'ganadoras': np.bincount(celda, weights=profit > 0, minlength=k).astype(np.int64),
+            'perdedoras': np.bincount(celda, weights=profit < 0, minlength=k).astype(np.int64),
+            'deposito': np.bincount(celda, weights=deposito, minlength=k),
+            'primer_deposito': primer_deposito,
+            'primera': primera,
+        })
+
+
+@contextmanager
+def usar_cubo(cubo: CuboTiempo | None):
+    """Los gráficos que se dibujen dentro leen sus agregados de `cubo`."""
+    token = _cubo.set(cubo)
+    try:
+        yield
+    finally:
+        _cubo.reset(token)
+
+
+def agregado(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Celdas del cubo (ver CuboTiempo.agregado) para las filas de df: del
+    cubo de ui.py si df es un rango de sus filas, si no de un cubo nuevo.
+    """
+    cubo = _cubo.get()
+    if (cubo is not None and len(df) and pd.api.types.is_integer_dtype(df.index)
+            and df.index.is_monotonic_increasing):
+        inicio, fin = int(df.index[0]), int(df.index[-1]) + 1
+        if 0 <= inicio and fin <= len(cubo) and fin - inicio == len(df):
+            return cubo.agregado(inicio, fin)
+    return CuboTiempo().actualizar(df).agregado()
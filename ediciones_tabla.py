@@ -0,0 +1,87 @@
+"""
+Ediciones de la pestaña Edición como un lote de cambios.
+
+st.data_editor guarda en st.session_state[key] lo que cambió respecto de
+la tabla que recibió: 'edited_rows' ({posición: {columna: valor}}),
+'added_rows' y 'deleted_rows'. En lugar de sustituir la tabla por la
+editada entera, aquí se aplican solo esos cambios (con los valores ya
+convertidos que devuelve el editor) y se devuelven las posiciones de las
+filas modificadas, para que el pipeline incremental recalcule solo esas.
+Una celda que se edita con el mismo valor que tenía no cuenta como cambio,
+ni una de las columnas que recalcula el pipeline (COLUMNAS_CALCULADAS): el
+editor las muestra de solo lectura, y un valor suyo que quedara en
+'edited_rows' se volvería a aplicar en cada rerun.
+"""
+
+import numpy as np
+import pandas as pd
+
+from pipeline_incremental import COLUMNAS_CALCULADAS
+
+# Columnas que el editor añade a la tabla (no son del journal)
+COLUMNAS_EDITOR = ['Contador', 'Eliminar']
+
+# Columnas cuyas ediciones se ignoran
+IGNORADAS = set(COLUMNAS_EDITOR) | set(COLUMNAS_CALCULADAS)
+
+
+def _iguales(a, b) -> bool:
+    if pd.isna(a) and pd.isna(b):
+        return True
+    try:
+        return bool(a == b)
+    except (TypeError, ValueError):
+        return False
+
+
+def aplicar_ediciones(df: pd.DataFrame, editado: pd.DataFrame, cambios: dict | None):
+    """
+    Aplica a `df` los `cambios` del editor (su estado en session_state),
+    tomando los valores de `editado` (lo que devolvió st.data_editor).
+    Devuelve (tabla, filas_modificadas) o (df, None) si no cambió nada.
+    Las filas marcadas en 'Eliminar' se borran como las de 'deleted_rows'.
+    """
+    if not cambios:
+        return df, None
+    n = len(df)
+    nuevo = df.reset_index(drop=True)
+    marcadas = editado.index[editado['Eliminar'] == True] if 'Eliminar' in editado.columns else []
+    borrar = set(int(i) for i in cambios.get('deleted_rows', [])) | set(int(i) for i in marcadas)
+
+    # Celdas editadas que de verdad cambian
+    editadas = set()
+    for fila, columnas in cambios.get('edited_rows', {}).items():
+        pos = int(fila)
+        if pos in borrar or pos >= n:
+            continue
+        for col in columnas:
+            if col in IGNORADAS or col not in nuevo.columns:
+                continue
+            valor = editado.at[pos, col]
+            if not _iguales(nuevo.at[pos, col], valor):
+                nuevo.loc[pos, col] = valor
+                editadas.add(pos)
+
+    # Filas añadidas (el editor las etiqueta a partir de n), salvo las marcadas para eliminar
+    anadidas = [i for i in editado.index[editado.index >= n] if i not in borrar]
+    if anadidas:
+        filas_nuevas = editado.loc[anadidas].drop(columns=COLUMNAS_EDITOR, errors='ignore')
+        nuevo = pd.concat([nuevo, filas_nuevas.reindex(columns=nuevo.columns)], ignore_index=True)
+
+    borrar = sorted(i for i in borrar if i < n)
+    if not (editadas or anadidas or borrar):
+        return df, None
+    if borrar:
+        nuevo = nuevo.drop(index=borrar).reset_index(drop=True)
+
+    # Posiciones en la tabla resultante: las editadas se desplazan por las
+    # borradas anteriores; tras un borrado, la fila que ocupa su lugar
+    # también se recalcula.
+    desplazamiento = np.searchsorted(np.array(borrar, dtype=int), sorted(editadas))
+    filas = set((np.array(sorted(editadas), dtype=int) - desplazamiento).tolist())
+    filas |= set(range(n - len(borrar), len(nuevo)))
+    if borrar:
+        primera = borrar[0]
+        if primera < len(nuevo):
+            filas.add(primera)
+    return nuevo, sorted(filas)
@@ -5,8 +5,7 @@ Módulo para cálculos de esperanza matemática en operaciones de trading.
 import pandas as pd
 import streamlit as st
 
-from aciertos_beneficios import calcular_porcentajes_acierto_error
-from riesgo_beneficio    import calcular_medias_operaciones
+from estadisticas_operaciones import EstadisticasOperaciones, calcular_estadisticas
 
 
 def calcular_esperanza_matematica(df: pd.DataFrame) -> float:
@@ -17,10 +16,7 @@ def calcular_esperanza_matematica(df: pd.DataFrame) -> float:
     Retorna:
       Un float representando la esperanza matemática en proporción.
     """
-    pct_acierto, pct_error = calcular_porcentajes_acierto_error(df)
-    media_pos, media_neg = calcular_medias_operaciones(df)
-    em = (pct_acierto / 100 * media_pos) - (pct_error / 100 * media_neg)
-    return em
+    return calcular_estadisticas(df).esperanza
 
 
 def calcular_ganancia_esperada(df: pd.DataFrame) -> float:
@@ -31,22 +27,23 @@ def calcular_ganancia_esperada(df: pd.DataFrame) -> float:
     Retorna:
       Un float con la ganancia esperada.
     """
-    pct_acierto, _ = calcular_porcentajes_acierto_error(df)
-    media_pos, _ = calcular_medias_operaciones(df)
-    return pct_acierto / 100 * media_pos
+    return calcular_estadisticas(df).ganancia_esperada
 
 
-def render_esperanza_matematica(df: pd.DataFrame) -> None:
+def render_esperanza_matematica(df: pd.DataFrame, estadisticas: EstadisticasOperaciones | None = None) -> None:
     """
     Renderiza en la barra lateral la sección 'Esperanza Matemática' con dos métricas:
       - EM (%)           : Esperanza matemática en %
       - Ganancia Esperada: Ganancia esperada en dinero ($)
 
     Cambia el título y el color según si la EM es positiva, negativa o cero.
+    `estadisticas` son las de df ya calculadas (si no, se calculan).
     """
     # Calcular valores
-    em = calcular_esperanza_matematica(df)
-    ge = calcular_ganancia_esperada(df)
+    if estadisticas is None:
+        estadisticas = calcular_estadisticas(df)
+    em = estadisticas.esperanza
+    ge = estadisticas.ganancia_esperada
 
     # Determinar título según señal
     titulo = "Esperanza Matemática Positiva" if em > 0 else ("Esperanza Matemática Nula" if em == 0 else "Esperanza Matemática Negativa")
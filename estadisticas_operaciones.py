@@ -0,0 +1,101 @@
+"""
+Estadísticas de las operaciones del journal para la barra lateral.
+
+Los paneles Riesgo / Beneficio, % de Aciertos, Op. Ganadoras / Perdedoras,
+Capital y Esperanza Matemática convertían cada uno 'Profit' a número y
+rehacían la máscara de depósitos/retiros (la esperanza, dos veces más).
+`calcular_estadisticas` lo hace una sola vez, vectorizado, y devuelve un
+EstadisticasOperaciones inmutable que leen todos los paneles; ui.py lo
+calcula una vez por versión del journal.
+
+Reglas (las de los paneles):
+  - son depósitos/retiros las filas con 'Deposito' o 'Retiro' (si existen
+    las dos columnas); el resto son operaciones;
+  - un Profit no numérico cuenta como 0: ni ganadora ni perdedora;
+  - % Acierto / % Error se redondean a 2 decimales, también para la
+    esperanza y la ganancia esperada;
+  - I. T. Capital y Ganancias Tot. usan todas las filas.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class EstadisticasOperaciones:
+    ganadoras: int
+    perdedoras: int
+    suma_ganancias: float
+    suma_perdidas: float       # en valor absoluto
+    media_ganancias: float     # Beneficio M.
+    media_perdidas: float      # Riesgo M. (en valor absoluto)
+    pct_acierto: float
+    pct_error: float
+    profit_factor: float       # Profit F.: ganancias / pérdidas
+    total_depositos: float
+    total_retiros: float
+    ganancias_totales: float   # Profit de todas las filas - depósitos + retiros
+    pct_ganancia: float
+    esperanza: float           # % Acierto · Beneficio M. - % Error · Riesgo M.
+    ganancia_esperada: float   # % Acierto · Beneficio M.
+
+
+def _presentes(df: pd.DataFrame, columna: str) -> np.ndarray:
+    if columna not in df.columns:
+        return np.zeros(len(df), dtype=bool)
+    return df[columna].notna().to_numpy(dtype=bool)
+
+
+def _numero(serie: pd.Series) -> np.ndarray:
+    return np.nan_to_num(pd.to_numeric(serie, errors='coerce').to_numpy(dtype=float))
+
+
+def calcular_estadisticas(df: pd.DataFrame) -> EstadisticasOperaciones:
+    """Estadísticas de los paneles de la barra lateral en una pasada sobre df."""
+    profit = _numero(df['Profit']) if 'Profit' in df.columns else np.zeros(len(df))
+    # 'Deposito' y 'Retiro' son casi todas vacías: solo se convierten las que tienen valor
+    con_deposito, con_retiro = _presentes(df, 'Deposito'), _presentes(df, 'Retiro')
+    if 'Deposito' in df.columns and 'Retiro' in df.columns:
+        operacion = ~(con_deposito | con_retiro)
+    else:
+        operacion = np.ones(len(df), dtype=bool)
+
+    ganancias = profit[operacion & (profit > 0)]
+    perdidas = -profit[operacion & (profit < 0)]
+    ganadoras, perdedoras = len(ganancias), len(perdidas)
+    suma_ganancias, suma_perdidas = float(ganancias.sum()), float(perdidas.sum())
+    media_ganancias = suma_ganancias / ganadoras if ganadoras else 0.0
+    media_perdidas = suma_perdidas / perdedoras if perdedoras else 0.0
+
+    con_resultado = ganadoras + perdedoras
+    pct_acierto = round(ganadoras / con_resultado * 100, 2) if con_resultado else 0.0
+    pct_error = round(perdedoras / con_resultado * 100, 2) if con_resultado else 0.0
+
+    if 'Profit' not in df.columns:
+        profit_factor = 0.0
+    else:
+        profit_factor = suma_ganancias / suma_perdidas if suma_perdidas != 0 else float('inf')
+
+    total_depositos = float(_numero(df['Deposito'][con_deposito]).sum()) if con_deposito.any() else 0.0
+    total_retiros = float(np.abs(_numero(df['Retiro'][con_retiro])).sum()) if con_retiro.any() else 0.0
+    ganancias_totales = float(profit.sum()) - total_depositos + total_retiros
+
+    return EstadisticasOperaciones(
+        ganadoras=ganadoras,
+        perdedoras=perdedoras,
+        suma_ganancias=suma_ganancias,
+        suma_perdidas=suma_perdidas,
+        media_ganancias=media_ganancias,
+        media_perdidas=media_perdidas,
+        pct_acierto=pct_acierto,
+        pct_error=pct_error,
+        profit_factor=profit_factor,
+        total_depositos=total_depositos,
+        total_retiros=total_retiros,
+        ganancias_totales=ganancias_totales,
+        pct_ganancia=(ganancias_totales / total_depositos * 100) if total_depositos != 0 else float('inf'),
+        esperanza=(pct_acierto / 100 * media_ganancias) - (pct_error / 100 * media_perdidas),
+        ganancia_esperada=pct_acierto / 100 * media_ganancias,
+    )
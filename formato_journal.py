@@ -0,0 +1,81 @@
+"""
+Serialización de journals (DataFrame de operaciones) para S3.
+
+El formato de trabajo es Parquet: guarda los dtypes (datetime64 en las
+fechas, float64 en las columnas numéricas), así al cargar el pipeline se
+salta el parseo de fechas y números, y el objeto es mucho más pequeño que
+el CSV. Si pyarrow no está instalado todo sigue funcionando en CSV.
+"""
+
+from io import BytesIO
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_DISPONIBLE = True
+except ImportError:
+    PARQUET_DISPONIBLE = False
+
+# Los archivos Parquet empiezan y terminan con estos bytes
+MAGIC_PARQUET = b"PAR1"
+
+COMPRESION_PARQUET = "zstd"
+
+
+def es_parquet(data: bytes) -> bool:
+    return data[:4] == MAGIC_PARQUET and data[-4:] == MAGIC_PARQUET
+
+
+def _tipar_columna(serie: pd.Series) -> pd.Series:
+    """
+    Deja una columna object con un solo tipo para pyarrow: fechas a
+    datetime64, números (con celdas vacías) a float64 como haría read_csv,
+    y el resto a texto conservando los vacíos.
+    """
+    tipo = pd.api.types.infer_dtype(serie, skipna=True)
+    if tipo in ("string", "empty", "boolean"):
+        return serie
+    if tipo in ("datetime", "datetime64", "date"):
+        return pd.to_datetime(serie, errors="coerce")
+    vacio = serie.isna() | (serie.astype(str).str.strip() == "")
+    numeros = pd.to_numeric(serie.where(~vacio), errors="coerce")
+    if numeros[~vacio].notna().all():
+        return numeros.astype(float)
+    return serie.astype(str).where(~vacio, None)
+
+
+def preparar_para_parquet(df: pd.DataFrame) -> pd.DataFrame:
+    """Copia de `df` con nombres de columna de texto y columnas object de un solo tipo."""
+    df = df.copy()
+    df.columns = [str(c) for c in df.columns]
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = _tipar_columna(df[col])
+    return df.reset_index(drop=True)
+
+
+def df_a_parquet(df: pd.DataFrame) -> bytes:
+    buf = BytesIO()
+    preparar_para_parquet(df).to_parquet(
+        buf, engine="pyarrow", index=False, compression=COMPRESION_PARQUET
+    )
+    return buf.getvalue()
+
+
+def df_a_csv(df: pd.DataFrame) -> bytes:
+    buf = BytesIO()
+    df.to_csv(buf, index=False, encoding="utf-8")
+    return buf.getvalue()
+
+
+def leer_journal(data: bytes, name: str) -> pd.DataFrame:
+    """
+    DataFrame a partir de los bytes de un objeto: Parquet (por su
+    cabecera), .csv o, si no, Excel.
+    """
+    if es_parquet(data):
+        return pd.read_parquet(BytesIO(data), engine="pyarrow")
+    if name.lower().endswith(".csv"):
+        return pd.read_csv(BytesIO(data))
+    return pd.read_excel(BytesIO(data))
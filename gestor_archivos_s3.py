@@ -1,4 +1,11 @@
-import os, boto3, streamlit as st
+import os, threading, time, streamlit as st
+
+import config
+from cache_disco import CacheDisco
+from concurrencia_journal import ConflictoGuardado, base_guardado, combinar_anexados, condicion_escritura
+from formato_journal import PARQUET_DISPONIBLE, df_a_csv, df_a_parquet, leer_journal
+from journal_particionado import JournalParticionado, version_manifiesto
+from registro_journals import registro
 
 AWS_KEY    = os.getenv("AWS_ACCESS_KEY_ID")
 AWS_SECRET = os.getenv("AWS_SECRET_ACCESS_KEY")
@@ -9,27 +16,152 @@ if not all([AWS_KEY, AWS_SECRET, REGION, BUCKET]):
     st.error("🔑 Faltan credenciales de AWS en el entorno.")
     st.stop()
 
-session = boto3.Session(
-    aws_access_key_id=AWS_KEY,
-    aws_secret_access_key=AWS_SECRET,
-    region_name=REGION
-)
-s3 = session.client("s3")
 
+class _ClienteS3Diferido:
+    """
+    Cliente de S3 que se crea (e importa boto3) la primera vez que se usa,
+    no al importar el módulo: arrancar la app no espera a boto3.
+    """
+
+    def __init__(self):
+        self._cliente = None
+        self._lock = threading.Lock()
+
+    def _obtener(self):
+        with self._lock:
+            if self._cliente is None:
+                import boto3
+                session = boto3.Session(
+                    aws_access_key_id=AWS_KEY,
+                    aws_secret_access_key=AWS_SECRET,
+                    region_name=REGION
+                )
+                self._cliente = session.client("s3")
+        return self._cliente
+
+    def __getattr__(self, nombre):
+        return getattr(self._obtener(), nombre)
+
+
+s3 = _ClienteS3Diferido()
+
+# Copia de trabajo en Parquet de cada archivo de uploads/: parquet/{name}.parquet
+PREFIJO_PARQUET = "parquet/"
+
+def _crear_cache():
+    # Las entradas son Parquet; sin pyarrow o si el directorio no es privado no hay caché
+    if not config.CACHE_DISCO_DIR or not PARQUET_DISPONIBLE:
+        return None
+    try:
+        return CacheDisco(config.CACHE_DISCO_DIR, config.CACHE_DISCO_MAX_MB * 2**20)
+    except PermissionError:
+        return None
+
+
+# Caché local de los journals ya decodificados, validada por ETag
+cache = _crear_cache()
 
+# Journals particionados (config.PARTICIONES_JOURNAL): journals/{name}/
+journals = JournalParticionado(s3, BUCKET, "journals/", config.PARTICIONES_JOURNAL or "mes", cache=cache)
+
+# Códigos con los que S3 rechaza una escritura condicional (el objeto cambió)
+CODIGOS_CONFLICTO = ("PreconditionFailed", "412", "ConditionalRequestConflict", "409")
+
+# Veces que guardar_df recarga y combina antes de darse por vencido
+MAX_COMBINACIONES = 3
+
+# Último listado de uploads/ y cuándo se pidió (ver list_saved_files)
+_listado = {"archivos": None, "ts": 0.0}
+_listado_lock = threading.Lock()
+
+
+def _usar_parquet() -> bool:
+    return PARQUET_DISPONIBLE and config.FORMATO_ALMACENAMIENTO == "parquet"
+
+
+def _clave_parquet(name: str) -> str:
+    return f"{PREFIJO_PARQUET}{name}.parquet"
+
+
+def _codigo_error(e) -> str:
+    """Código de error de un botocore ClientError."""
+    return e.response.get("Error", {}).get("Code", "")
+
+
+def _leer_df(key: str, name: str):
+    """
+    (DataFrame, ETag) del objeto `key`, o (None, None) si no existe. El
+    DataFrame es una vista del registro de journals del proceso: si otra
+    sesión ya leyó esa versión no se vuelve a parsear. Si la caché en disco
+    tiene una copia, el GET es condicional (If-None-Match con su ETag): con
+    un 304 se usa la copia local sin descargar ni volver a parsear.
+    """
+    from botocore.exceptions import ClientError
+    etag = cache.etag(key) if cache is not None else None
+    obj = None
+    try:
+        if etag is not None:
+            try:
+                obj = s3.get_object(Bucket=BUCKET, Key=key, IfNoneMatch=etag)
+            except ClientError as e:
+                if _codigo_error(e) not in ("304", "NotModified"):
+                    raise
+        else:
+            obj = s3.get_object(Bucket=BUCKET, Key=key)
+    except ClientError as e:
+        if _codigo_error(e) in ("NoSuchKey", "404"):
+            return None, None
+        raise
+    if obj is not None:
+        etag = obj.get("ETag")
+
+    entrada = registro.obtener(("journal", key, etag))
+    if entrada is not None:
+        if obj is not None:
+            obj["Body"].close()
+        return entrada[0], etag
+
+    df = None
+    if obj is None:
+        df = cache.obtener(key, etag)
+        if df is None:
+            obj = s3.get_object(Bucket=BUCKET, Key=key)
+            etag = obj.get("ETag")
+    if df is None:
+        df = leer_journal(obj["Body"].read(), name)
+        if cache is not None and etag:
+            cache.guardar(key, etag, df)
+    return registro.registrar(("journal", key, etag), df), etag
+
+
+def _invalidar_listado():
+    with _listado_lock:
+        _listado["archivos"] = None
+
+
+def _borrar_parquet(name: str):
+    s3.delete_object(Bucket=BUCKET, Key=_clave_parquet(name))
 
 
 def list_saved_files():
     """
     Lista todos los objetos bajo 'uploads/' en el bucket.
     Devuelve [{'name':…, 'path':…},…].
+    El listado se reutiliza durante config.LISTADO_TTL_S segundos (la barra
+    lateral lo pide en cada rerun); subir o borrar un archivo lo invalida.
     """
+    with _listado_lock:
+        if _listado["archivos"] is not None and time.monotonic() - _listado["ts"] < config.LISTADO_TTL_S:
+            return [dict(f) for f in _listado["archivos"]]
     resp = s3.list_objects_v2(Bucket=BUCKET, Prefix="uploads/")
     contents = resp.get("Contents", [])
-    return [
+    archivos = [
         {"name": obj["Key"].split("/", 1)[1], "path": obj["Key"]}
         for obj in contents
     ]
+    with _listado_lock:
+        _listado.update(archivos=archivos, ts=time.monotonic())
+    return [dict(f) for f in archivos]
 
 
 def save_uploaded_file(uploaded_file):
@@ -45,6 +177,10 @@ def save_uploaded_file(uploaded_file):
     try:
         st.write(f"🔄 Subiendo a S3: bucket={BUCKET}, key={key} …")
         s3.upload_fileobj(uploaded_file, BUCKET, key)
+        # La copia Parquet de un archivo anterior con el mismo nombre ya no vale
+        _borrar_parquet(uploaded_file.name)
+        journals.borrar(uploaded_file.name)
+        _invalidar_listado()
         st.success(f"✅ Subida OK: {key}")
         # Marcamos flag para que no vuelva a subir en este rerun
         st.session_state["ya_subido"] = True
@@ -53,17 +189,44 @@ def save_uploaded_file(uploaded_file):
         st.error(f"❌ Error al subir a S3: {e}")
 
 
+def cargar_journal(name):
+    """
+    (DataFrame, clave del objeto, versión, ETag) de {name}: el journal
+    particionado si existe, si no su copia Parquet (con las fechas y
+    números ya tipados) o, si tampoco, uploads/{name}. La versión es el
+    ETag (o la del manifiesto) e identifica el journal en registro_journals;
+    el ETag es el del objeto (el manifiesto) del que salió el DataFrame.
+    """
+    for intento in range(2):
+        manifiesto, etag = journals.leer_manifiesto(name, refrescar=True)
+        if manifiesto is None:
+            break
+        key, version = journals.clave_manifiesto(name), version_manifiesto(manifiesto)
+        entrada = registro.obtener(("journal", key, version))
+        if entrada is not None:
+            return entrada[0], key, version, etag
+        try:
+            df = journals.cargar(name, manifiesto)
+        except FileNotFoundError:
+            # Dos guardados seguidos borraron tramos de este manifiesto: se vuelve a leer
+            if intento:
+                raise
+            continue
+        return registro.registrar(("journal", key, version), df), key, version, etag
+    claves = [_clave_parquet(name)] if PARQUET_DISPONIBLE else []
+    for key in claves + [f"uploads/{name}"]:
+        df, etag = _leer_df(key, name)
+        if df is not None:
+            return df, key, etag, etag
+    raise FileNotFoundError(f"No existe uploads/{name} en S3")
+
+
 def load_file_df(name):
     """
-    Descarga uploads/{name} desde S3 y devuelve un DataFrame.
+    Devuelve el DataFrame de {name} (ver cargar_journal).
     Soporta .csv y .xlsx.
     """
-    key = f"uploads/{name}"
-    obj = s3.get_object(Bucket=BUCKET, Key=key)
-    data = obj["Body"].read()
-    if name.lower().endswith(".csv"):
-        return pd.read_csv(BytesIO(data))
-    return pd.read_excel(BytesIO(data))
+    return cargar_journal(name)[0]
 
 
 def delete_saved_file(name):
@@ -73,11 +236,18 @@ def delete_saved_file(name):
     key = f"uploads/{name}"
     try:
         s3.delete_object(Bucket=BUCKET, Key=key)
+        _borrar_parquet(name)
+        journals.borrar(name)
+        _invalidar_listado()
+        for clave in (key, _clave_parquet(name), journals.clave_manifiesto(name)):
+            registro.descartar(clave)
         st.success(f"🗑️ Eliminado OK: {key}")
     except Exception as e:
         st.error(f"❌ Error al eliminar de S3: {e}")
     finally:
         st.rerun()
+
+
 def update_file(name: str, data_bytes: bytes):
     """
     Reemplaza en S3 el objeto uploads/{name} con los bytes pasados.
@@ -85,4 +255,73 @@ def update_file(name: str, data_bytes: bytes):
     key = f"uploads/{name}"
     # Puedes usar put_object o upload_fileobj
     s3.put_object(Bucket=BUCKET, Key=key, Body=data_bytes)
-       
+
+
+def _escribir(name: str, df, base):
+    """
+    Escribe `df` en el formato que toca (ver guardar_df), condicionado a
+    que el objeto siga en la versión de `base`. Devuelve (clave, ETag).
+    """
+    if config.PARTICIONES_JOURNAL:
+        nuevo = not journals.existe(name)
+        clave = journals.clave_manifiesto(name)
+        resultado = journals.guardar(name, df, condicion=condicion_escritura(base, clave))
+        if nuevo and PARQUET_DISPONIBLE:
+            _borrar_parquet(name)
+        return clave, resultado["etag"]
+    if journals.existe(name):
+        journals.borrar(name)
+    data = None
+    if _usar_parquet():
+        try:
+            data = df_a_parquet(df)
+        except (TypeError, ValueError, NotImplementedError):
+            data = None
+    if data is not None:
+        clave, condicion = _clave_parquet(name), condicion_escritura(base, _clave_parquet(name))
+    else:
+        clave = f"uploads/{name}"
+        data, condicion = df_a_csv(df), condicion_escritura(base, clave, crear=False)
+    resp = s3.put_object(Bucket=BUCKET, Key=clave, Body=data, **condicion)
+    if clave != _clave_parquet(name) and PARQUET_DISPONIBLE:
+        _borrar_parquet(name)
+    return clave, resp.get("ETag")
+
+
+def guardar_df(name: str, df, base=None):
+    """
+    Guarda el DataFrame de {name}: particionado si config.PARTICIONES_JOURNAL
+    está definido (solo se suben los tramos modificados); si no, en Parquet
+    (parquet/{name}.parquet) si config.FORMATO_ALMACENAMIENTO es 'parquet'
+    y pyarrow está disponible; si no, o si alguna columna no se puede pasar
+    a Parquet, como CSV en uploads/{name}. Se borran las copias en los
+    otros formatos para no leerlas desfasadas.
+
+    Con `base` (concurrencia_journal.base_guardado de la versión cargada)
+    la escritura es condicional: si otro escritor cambió el journal, se
+    recarga, se combinan las operaciones añadidas por ambos y se vuelve a
+    intentar; si los cambios no se pueden combinar lanza ConflictoGuardado.
+    Devuelve {'base': base de lo escrito, 'combinado': DataFrame combinado
+    o None si no hizo falta}.
+    """
+    from botocore.exceptions import ClientError
+    combinado = None
+    for _ in range(MAX_COMBINACIONES + 1):
+        try:
+            clave, etag = _escribir(name, df, base)
+            return {"base": base_guardado(clave, etag, df), "combinado": combinado}
+        except ClientError as e:
+            if base is None or _codigo_error(e) not in CODIGOS_CONFLICTO:
+                raise
+        from pipeline_incremental import crear_pipeline_principal
+        remoto, clave, _, etag = cargar_journal(name)
+        pipeline = crear_pipeline_principal()
+        remoto = pipeline.ejecutar(remoto)
+        filas = combinar_anexados(base["firmas"], df, remoto)
+        if filas is None:
+            raise ConflictoGuardado(
+                f"'{name}' cambió en S3 desde que se cargó y los cambios no se pueden combinar"
+            )
+        df = combinado = pipeline.ejecutar(filas)
+        base = base_guardado(clave, etag, remoto)
+    raise ConflictoGuardado(f"'{name}' sigue cambiando en S3; no se pudo guardar")
@@ -0,0 +1,289 @@
+"""
+Journal particionado en S3: el DataFrame se guarda en tramos contiguos de
+filas (uno por mes de 'Fecha / Hora', o cada N filas) más un manifiesto
+JSON con el orden de los tramos:
+
+    {prefijo}{name}/manifiesto.json
+    {prefijo}{name}/part-{etiqueta}-{hash}.parquet
+
+Cada tramo se nombra con el hash de su contenido, así que un objeto de
+tramo nunca se sobrescribe: al guardar solo se suben los tramos cuyo hash
+no está ya en el manifiesto y después el manifiesto. Un autoguardado tras
+añadir una operación reescribe el tramo del último mes y el manifiesto,
+no todo el historial. La carga descarga los tramos en paralelo y los
+concatena.
+
+Los tramos que deja de usar un guardado no se borran enseguida: otra
+sesión puede estar cargando el manifiesto anterior. El nuevo manifiesto
+los apunta en "obsoletos" y se borran en el guardado siguiente, cuando ya
+son de dos generaciones atrás.
+
+El manifiesto es el único objeto que se sobrescribe, así que es el que
+versiona el journal: guardar() acepta una condición de escritura de S3
+(IfMatch con el ETag del manifiesto leído, o IfNoneMatch='*') y, si otro
+escritor lo cambió antes, no lo pisa y borra los tramos que acababa de
+subir (ver concurrencia_journal).
+
+Funciona con cualquier cliente con la interfaz de boto3 (get_object,
+put_object, delete_object), p. ej. cliente_s3_local.ClienteS3Local.
+botocore (ClientError) se importa en los métodos que lo capturan, así
+importar el módulo al arrancar ui.py no lo carga.
+"""
+
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from pandas.util import hash_pandas_object
+
+from formato_journal import PARQUET_DISPONIBLE, preparar_para_parquet, df_a_parquet, df_a_csv, leer_journal
+
+COLUMNA_FECHA = 'Fecha / Hora'
+
+# Cambian solas con el tiempo y se recalculan al cargar: no ensucian tramos
+COLUMNAS_VOLATILES = ['Dia LIVE']
+
+# Descargas y subidas simultáneas de tramos
+MAX_HILOS = 8
+
+# ETag con el que se guardan los tramos en la caché en disco: su clave ya
+# identifica el contenido, así que nunca hay que revalidarlos
+ETAG_INMUTABLE = "inmutable"
+
+VERSION_MANIFIESTO = 1
+
+
+def tramos_por_mes(df: pd.DataFrame) -> list:
+    """
+    (etiqueta, desde, hasta) de cada tramo contiguo de filas del mismo mes.
+    Las filas sin fecha van con el mes de la fila anterior (o siguiente,
+    al principio); si el journal no está ordenado un mes puede tener
+    varios tramos.
+    """
+    n = len(df)
+    if n == 0:
+        return []
+    meses = pd.Series(np.nan, index=df.index)
+    if COLUMNA_FECHA in df.columns:
+        fechas = pd.to_datetime(df[COLUMNA_FECHA], errors='coerce', format='mixed')
+        meses = (fechas.dt.year * 100 + fechas.dt.month).ffill().bfill()
+    meses = meses.fillna(0).to_numpy()
+    inicios = np.flatnonzero(np.diff(meses)) + 1
+    desde = np.concatenate([[0], inicios])
+    hasta = np.append(inicios, n)
+    return [
+        (f"{int(meses[d]) // 100:04d}-{int(meses[d]) % 100:02d}" if meses[d] else 'sin-fecha', int(d), int(h))
+        for d, h in zip(desde, hasta)
+    ]
+
+
+def tramos_por_filas(df: pd.DataFrame, filas: int) -> list:
+    """(etiqueta, desde, hasta) de tramos de `filas` filas."""
+    return [(f"{d:07d}", d, min(d + filas, len(df))) for d in range(0, len(df), filas)]
+
+
+def hash_filas(df: pd.DataFrame) -> tuple:
+    """
+    (cabecera, hashes) para identificar tramos por contenido: la cabecera
+    resume columnas y dtypes, y `hashes` es un uint64 por fila. Las
+    columnas numéricas cuentan como float64, así que una columna entera
+    que pasa a float (p. ej. al añadir una fila vacía) no ensucia tramos.
+    """
+    df = df.drop(columns=[c for c in COLUMNAS_VOLATILES if c in df.columns])
+    numericas = [c for c in df.columns
+                 if pd.api.types.is_numeric_dtype(df[c]) and not pd.api.types.is_bool_dtype(df[c])]
+    df = df.astype(dict.fromkeys(numericas, 'float64'))
+    cabecera = json.dumps([[str(c), str(t)] for c, t in df.dtypes.items()]).encode()
+    return cabecera, hash_pandas_object(df, index=False).to_numpy()
+
+
+def hash_tramo(cabecera: bytes, hashes: np.ndarray) -> str:
+    """Hash estable de un tramo a partir de los hashes de sus filas."""
+    h = hashlib.blake2b(cabecera, digest_size=8)
+    h.update(hashes.tobytes())
+    return h.hexdigest()
+
+
+def version_manifiesto(manifiesto: dict) -> str:
+    """Identifica el contenido descrito por un manifiesto (columnas y tramos)."""
+    h = hashlib.blake2b(digest_size=8)
+    h.update(json.dumps([manifiesto["columnas"], [t["key"] for t in manifiesto["tramos"]]]).encode())
+    return h.hexdigest()
+
+
+class JournalParticionado:
+    """
+    Guarda y carga journals particionados bajo `prefijo` en `bucket`.
+    `particion` es 'mes' o un número de filas por tramo. Recuerda el
+    último manifiesto leído o escrito de cada journal junto con su ETag
+    (None si no existe); los dos se guardan y se leen juntos, porque la
+    instancia la comparten las sesiones y el hilo de guardado.
+    Con `cache` (cache_disco.CacheDisco) los tramos ya descargados se leen
+    del disco sin pedirlos a S3.
+    """
+
+    def __init__(self, cliente, bucket: str, prefijo: str = 'journals/', particion='mes', cache=None):
+        self.cliente = cliente
+        self.bucket = bucket
+        self.prefijo = prefijo
+        self.particion = particion
+        self.cache = cache
+        self._leidos = {}  # name -> (manifiesto, ETag)
+
+    def _base(self, name: str) -> str:
+        return f"{self.prefijo}{name}/"
+
+    def clave_manifiesto(self, name: str) -> str:
+        return f"{self._base(name)}manifiesto.json"
+
+    def _leer(self, key: str):
+        from botocore.exceptions import ClientError
+        try:
+            return self.cliente.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                return None
+            raise
+
+    def _tramos(self, df: pd.DataFrame) -> list:
+        if self.particion == 'mes':
+            return tramos_por_mes(df)
+        return tramos_por_filas(df, int(self.particion))
+
+    def leer_manifiesto(self, name: str, refrescar: bool = False) -> tuple:
+        """(manifiesto, ETag) del journal `name`, o (None, None) si no está particionado."""
+        leido = self._leidos.get(name)
+        if refrescar or leido is None:
+            from botocore.exceptions import ClientError
+            try:
+                obj = self.cliente.get_object(Bucket=self.bucket, Key=self.clave_manifiesto(name))
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") not in ("NoSuchKey", "404"):
+                    raise
+                leido = (None, None)
+            else:
+                leido = (json.loads(obj["Body"].read()), obj.get("ETag"))
+            self._leidos[name] = leido
+        return leido
+
+    def existe(self, name: str) -> bool:
+        return self.leer_manifiesto(name)[0] is not None
+
+    def cargar(self, name: str, manifiesto: dict | None = None) -> pd.DataFrame:
+        """
+        Descarga en paralelo los tramos de `manifiesto` (de leer_manifiesto;
+        si no se pasa, el actual en S3) y los concatena en orden.
+        """
+        if manifiesto is None:
+            manifiesto = self.leer_manifiesto(name, refrescar=True)[0]
+        if manifiesto is None:
+            raise FileNotFoundError(f"No existe el journal particionado {name}")
+        tramos = manifiesto["tramos"]
+        if not tramos:
+            return pd.DataFrame(columns=manifiesto["columnas"])
+
+        def descargar(tramo):
+            if self.cache is not None:
+                parte = self.cache.obtener(tramo["key"], ETAG_INMUTABLE)
+                if parte is not None:
+                    return parte
+            data = self._leer(tramo["key"])
+            if data is None:
+                raise FileNotFoundError(f"Falta el tramo {tramo['key']} de {name}")
+            parte = leer_journal(data, tramo["key"])
+            if self.cache is not None:
+                self.cache.guardar(tramo["key"], ETAG_INMUTABLE, parte)
+            return parte
+
+        with ThreadPoolExecutor(max_workers=min(MAX_HILOS, len(tramos))) as pool:
+            partes = list(pool.map(descargar, tramos))
+        df = pd.concat(partes, ignore_index=True)
+        return df[[c for c in manifiesto["columnas"] if c in df.columns]]
+
+    def guardar(self, name: str, df: pd.DataFrame, condicion: dict | None = None) -> dict:
+        """
+        Sube los tramos nuevos o modificados y luego el manifiesto, que apunta
+        como obsoletos los tramos que ya no usa, y borra los obsoletos del
+        manifiesto anterior. Devuelve cuántos tramos se subieron,
+        reutilizaron, quedaron obsoletos y se borraron, y el 'etag' del
+        manifiesto escrito. `condicion` (p. ej.
+        {'IfMatch': etag}) se aplica al manifiesto: si S3 lo rechaza se borran
+        los tramos subidos que no use el manifiesto actual y se relanza el
+        ClientError.
+        """
+        if PARQUET_DISPONIBLE:
+            df, extension, serializar = preparar_para_parquet(df), 'parquet', df_a_parquet
+        else:
+            df, extension, serializar = df.reset_index(drop=True), 'csv', df_a_csv
+        condicion = condicion or {}
+        # Los tramos que se reutilizan tienen que ser los del manifiesto que se sustituye
+        etag_leido = self._leidos.get(name, (None, None))[1]
+        refrescar = "IfMatch" in condicion and condicion["IfMatch"] != etag_leido
+        anterior = self.leer_manifiesto(name, refrescar=refrescar)[0] or {"tramos": []}
+        previas = {t["key"] for t in anterior["tramos"]}
+        obsoletos_previos = set(anterior.get("obsoletos", []))
+
+        cabecera, hashes = hash_filas(df)
+        tramos, pendientes = [], {}
+        for etiqueta, desde, hasta in self._tramos(df):
+            key = f"{self._base(name)}part-{etiqueta}-{hash_tramo(cabecera, hashes[desde:hasta])}.{extension}"
+            tramos.append({"key": key, "etiqueta": etiqueta, "filas": hasta - desde})
+            if key not in previas:
+                pendientes[key] = df.iloc[desde:hasta]
+
+        def subir(key):
+            self.cliente.put_object(Bucket=self.bucket, Key=key, Body=serializar(pendientes[key]))
+
+        if pendientes:
+            with ThreadPoolExecutor(max_workers=min(MAX_HILOS, len(pendientes))) as pool:
+                list(pool.map(subir, pendientes))
+
+        usadas = {t["key"] for t in tramos}
+        # Los que deja de usar este guardado se conservan para quien esté
+        # cargando el manifiesto anterior
+        obsoletos = sorted(previas - usadas)
+        manifiesto = {
+            "version": VERSION_MANIFIESTO,
+            "particion": self.particion,
+            "columnas": [str(c) for c in df.columns],
+            "filas": len(df),
+            "tramos": tramos,
+            "obsoletos": obsoletos,
+        }
+        from botocore.exceptions import ClientError
+        try:
+            resp = self.cliente.put_object(
+                Bucket=self.bucket, Key=self.clave_manifiesto(name),
+                Body=json.dumps(manifiesto, ensure_ascii=False).encode("utf-8"), **condicion
+            )
+        except ClientError:
+            actual = self.leer_manifiesto(name, refrescar=True)[0] or {"tramos": []}
+            en_uso = {t["key"] for t in actual["tramos"]} | set(actual.get("obsoletos", []))
+            for key in set(pendientes) - en_uso:
+                self.cliente.delete_object(Bucket=self.bucket, Key=key)
+            raise
+        self._leidos[name] = (manifiesto, resp.get("ETag"))
+
+        # Los obsoletos del guardado anterior ya no los lee ningún manifiesto vigente
+        sobrantes = obsoletos_previos - usadas
+        for key in sobrantes:
+            self.cliente.delete_object(Bucket=self.bucket, Key=key)
+        return {
+            "subidos": len(pendientes),
+            "reutilizados": len(tramos) - len(pendientes),
+            "obsoletos": len(obsoletos),
+            "borrados": len(sobrantes),
+            "etag": resp.get("ETag"),
+        }
+
+    def borrar(self, name: str) -> None:
+        """Borra el manifiesto y todos los tramos del journal `name`."""
+        manifiesto = self.leer_manifiesto(name, refrescar=True)[0]
+        if manifiesto is None:
+            return
+        self.cliente.delete_object(Bucket=self.bucket, Key=self.clave_manifiesto(name))
+        for key in [t["key"] for t in manifiesto["tramos"]] + manifiesto.get("obsoletos", []):
+            self.cliente.delete_object(Bucket=self.bucket, Key=key)
+        self._leidos[name] = (None, None)
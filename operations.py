@@ -37,12 +37,16 @@ def agregar_operacion(df: pd.DataFrame, porcentaje: float, tipo_op: str) -> pd.D
         row['STRK Sell'] = strike_buy * (1 + porcentaje / 100)
         row['Profit'] = (row['STRK Sell'] - row['STRK Buy']) * row['#Cont']
 
-    nueva = pd.DataFrame([row])
     for col in ['Fecha / Hora', 'Fecha / Hora de Cierre']:
-        nueva[col] = pd.to_datetime(nueva[col], errors='coerce')
+        row[col] = pd.to_datetime(row[col], errors='coerce')
 
     df0 = df.dropna(how='all')
-    df_final = pd.concat([df0, nueva], ignore_index=True)
+    pipeline = st.session_state.get('pipeline')
+    if pipeline is not None:
+        # Ruta rápida: solo se calculan las columnas derivadas de la fila nueva
+        df_final = pipeline.anexar(df0, row)
+    else:
+        df_final = pd.concat([df0, pd.DataFrame([row])], ignore_index=True)
 
     st.session_state.datos = df_final
     st.session_state.data_modified = True
@@ -51,22 +55,28 @@ def agregar_operacion(df: pd.DataFrame, porcentaje: float, tipo_op: str) -> pd.D
 
 
 def procesar_deposito_retiro(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normaliza filas de depósito/retiro: Profit = +Deposito / -Retiro y
+    'Retiro' se guarda en positivo. Un 'Retiro' ya guardado en positivo se
+    sigue tratando como retiro, de modo que aplicar la función sobre su
+    propia salida no cambia nada (el pipeline incremental depende de ello).
+    """
     df = df.copy()
     dep_num = pd.to_numeric(df['Deposito'], errors='coerce')
-    ret_num = pd.to_numeric(df['Retiro'],   errors='coerce')
+    ret_num = pd.to_numeric(df['Retiro'],   errors='coerce').abs()
 
     mask_dep = dep_num.notna() & (dep_num > 0)
-    mask_ret = ret_num.notna() & (ret_num < 0)
+    mask_ret = ret_num.notna() & (ret_num > 0)
 
     df.loc[mask_dep, 'Profit'] = dep_num[mask_dep]
     df.loc[mask_dep, 'Activo'] = 'DEP'
-    df.loc[mask_ret, 'Profit'] = ret_num[mask_ret]
+    df.loc[mask_ret, 'Profit'] = -ret_num[mask_ret]
     df.loc[mask_ret, 'Activo'] = 'RET'
 
     df['Deposito'] = pd.NA
     df['Retiro']   = pd.NA
     df.loc[mask_dep, 'Deposito'] = dep_num[mask_dep].round(0).astype('Int64')
-    df.loc[mask_ret, 'Retiro']   = (-ret_num[mask_ret]).round(0).astype('Int64')
+    df.loc[mask_ret, 'Retiro']   = ret_num[mask_ret].round(0).astype('Int64')
 
     cols_limpieza = ['C&P', 'D', '#Cont', 'STRK Buy', 'STRK Sell']
     for col in cols_limpieza:
@@ -0,0 +1,138 @@
+"""
+Perfilado por etapas de un rerun de ui.py.
+
+Se activa con la variable de entorno PERFIL_ETAPAS=1 (config.PERFIL_ETAPAS);
+desactivado, `medir` devuelve la función sin envolver y `etapa` un
+contexto vacío, así que no cuesta nada. Activado, cada etapa registra:
+  - 'segundos': tiempo de reloj.
+  - 'filas':    filas del DataFrame que procesa (si se indica).
+  - 'bytes':    pico de memoria reservada durante la etapa por encima de
+                la que había al empezar (tracemalloc; incluye los arrays
+                de numpy, y con varias sesiones a la vez también lo que
+                reserven los otros hilos).
+  - 'nivel':    profundidad (las etapas pueden anidarse).
+
+ui.py llama a iniciar_rerun() al principio y a cerrar_rerun() al final:
+este añade las etapas del rerun al log JSONL (config.PERFIL_ETAPAS_LOG),
+una línea por etapa, y devuelve los registros para mostrar_panel().
+"""
+
+import functools
+import json
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+import config
+
+ACTIVO = config.PERFIL_ETAPAS
+
+_local = threading.local()
+_log_lock = threading.Lock()
+
+
+def _registros() -> list:
+    if not hasattr(_local, 'registros'):
+        _local.registros, _local.pila = [], []
+    return _local.registros
+
+
+@contextmanager
+def _medir_etapa(nombre: str, filas: int | None):
+    registros = _registros()
+    pila = _local.pila
+    actual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    marco = {'inicio_bytes': actual, 'pico': actual}
+    pila.append(marco)
+    registro = {'etapa': nombre, 'nivel': len(pila) - 1, 'filas': filas}
+    registros.append(registro)
+    inicio = time.perf_counter()
+    try:
+        yield registro
+    finally:
+        registro['segundos'] = time.perf_counter() - inicio
+        _, pico = tracemalloc.get_traced_memory()
+        pico = max(pico, marco['pico'])
+        registro['bytes'] = pico - marco['inicio_bytes']
+        pila.pop()
+        if pila:
+            pila[-1]['pico'] = max(pila[-1]['pico'], pico)
+
+
+def etapa(nombre: str, df=None):
+    """
+    Contexto que mide la etapa `nombre` (con las filas de `df`, si se da):
+
+        with etapa('aplicar_color_general', df):
+            ...
+    """
+    if not ACTIVO:
+        return nullcontext()
+    return _medir_etapa(nombre, len(df) if df is not None else None)
+
+
+def medir(nombre: str):
+    """
+    Decorador que mide cada llamada como la etapa `nombre`; las filas son
+    las del primer argumento si tiene len(). Sin perfilado devuelve la
+    función tal cual.
+    """
+    def decorador(funcion):
+        if not ACTIVO:
+            return funcion
+
+        @functools.wraps(funcion)
+        def envuelta(*args, **kwargs):
+            filas = len(args[0]) if args and hasattr(args[0], '__len__') else None
+            with _medir_etapa(nombre, filas):
+                return funcion(*args, **kwargs)
+        return envuelta
+    return decorador
+
+
+def iniciar_rerun() -> None:
+    """Empieza a registrar las etapas de un rerun."""
+    if not ACTIVO:
+        return
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _local.registros, _local.pila = [], []
+    _local.rerun = uuid.uuid4().hex[:12]
+
+
+def cerrar_rerun() -> list:
+    """Añade las etapas del rerun al log JSONL y las devuelve."""
+    if not ACTIVO:
+        return []
+    registros = _registros()
+    if registros and config.PERFIL_ETAPAS_LOG:
+        momento = datetime.now().isoformat(timespec='seconds')
+        rerun = getattr(_local, 'rerun', None)
+        lineas = [
+            json.dumps({'ts': momento, 'rerun': rerun, **r}, ensure_ascii=False) + '\n'
+            for r in registros if 'segundos' in r
+        ]
+        with _log_lock, open(config.PERFIL_ETAPAS_LOG, 'a', encoding='utf-8') as f:
+            f.writelines(lineas)
+    _local.registros, _local.pila = [], []
+    return registros
+
+
+def mostrar_panel(registros: list) -> None:
+    """Tabla con las etapas del rerun en la barra lateral."""
+    if not ACTIVO or not registros:
+        return
+    import pandas as pd
+    import streamlit as st
+
+    tabla = pd.DataFrame(registros)
+    tabla['etapa'] = ['  ' * n + e for n, e in zip(tabla['nivel'], tabla['etapa'])]
+    tabla['ms'] = (tabla['segundos'] * 1000).round(1)
+    tabla['KB'] = (tabla['bytes'] / 1024).round(0)
+    total = tabla.loc[tabla['nivel'] == 0, 'segundos'].sum()
+    with st.sidebar.expander(f"Perfil del rerun ({total * 1000:.0f} ms)", expanded=False):
+        st.dataframe(tabla[['etapa', 'ms', 'filas', 'KB']], hide_index=True)
@@ -0,0 +1,377 @@
+"""
+Pipeline incremental de las columnas derivadas de la tabla principal.
+
+Cada etapa declara las columnas que lee y las que escribe. En cada rerun se
+compara la firma (hash por fila) de esas columnas con la de la última
+ejecución y solo se recalcula lo que cambió:
+  - etapas de fila ('fila'): solo las filas modificadas o nuevas.
+  - etapas acumulativas ('acumulada'): el sufijo desde la primera fila
+    modificada, partiendo del estado guardado de la fila anterior.
+  - etapas volátiles (dependen de la hora actual): todas las filas.
+"""
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+from pandas.util import hash_pandas_object
+
+from eliminar_columnas_duplicadas_contador import limpiar_columnas
+from convertir_fechas import convertir_fechas
+from time_utils import calcular_tiempo_operacion_vectorizado, calcular_dia_live, calcular_tiempo_dr
+from operations import procesar_deposito_retiro
+from calculos_tabla_principal import (
+    calcular_profit_operacion, calcular_porcentaje_profit_op, calcular_profit_total,
+    calcular_dd_max, calcular_dd_up, calcular_profit_t, calcular_profit_alcanzado_vectorizado,
+    calcular_profit_media_vectorizado, calcular_estado_acumulado
+)
+from perfil_etapas import etapa as etapa_perfil, medir
+
+# Con PERFIL_ETAPAS cada etapa se mide como 'pipeline.<nombre>'
+limpiar_columnas = medir('pipeline.limpiar_columnas')(limpiar_columnas)
+
+# Si cambia más de esta fracción de filas, se recalcula todo de una vez
+FRACCION_RECALCULO_TOTAL = 0.5
+
+DIAS_SEMANA = {0: 'Lu', 1: 'Ma', 2: 'Mi', 3: 'Ju', 4: 'Vi', 5: 'Sa', 6: 'Do'}
+
+
+class Etapa:
+    """
+    Paso del pipeline: función df -> df con las columnas que lee (entradas)
+    y las que escribe (salidas). Las etapas 'acumulada' reciben además
+    `previo`, el estado de la fila anterior al sufijo recalculado.
+    """
+
+    def __init__(self, nombre: str, funcion, entradas: list, salidas: list,
+                 tipo: str = 'fila', volatil: bool = False):
+        self.nombre = nombre
+        self.funcion = medir(f'pipeline.{nombre}')(funcion)
+        self.entradas = entradas
+        self.salidas = salidas
+        self.tipo = tipo
+        self.volatil = volatil
+
+    def columnas(self, df: pd.DataFrame) -> list:
+        """Columnas de df que necesita la etapa (entradas y salidas existentes)."""
+        vistas = dict.fromkeys(self.entradas + self.salidas)
+        return [c for c in vistas if c in df.columns]
+
+
+class PipelineIncremental:
+    """
+    Ejecuta las etapas sobre la tabla y recuerda, entre reruns, la firma de
+    cada fila y el estado acumulado, para recalcular solo lo necesario.
+    """
+
+    def __init__(self, etapas: list):
+        self.etapas = etapas
+        # Identifica el archivo de origen (p. ej. para cachear sus formatos de fecha)
+        self.clave = None
+        self.invalidar()
+
+    def invalidar(self) -> None:
+        """Olvida la última ejecución: el próximo `ejecutar` recalcula todo."""
+        self._columnas = None
+        self._firmas = None
+        self._estado = None
+        self._ultimo_valido = -1
+
+    def exportar_estado(self) -> dict:
+        """Estado de la última ejecución, para que otro pipeline lo adopte."""
+        return {
+            'columnas': self._columnas,
+            'firmas': self._firmas,
+            'estado': self._estado,
+            'ultimo_valido': self._ultimo_valido,
+        }
+
+    def adoptar_estado(self, estado: dict) -> None:
+        """
+        Continúa desde el estado exportado por otro pipeline sobre la misma
+        tabla (ver registro_journals). Puede compartirse: el estado nunca se
+        modifica en sitio, cada ejecución lo reemplaza.
+        """
+        self._columnas = estado['columnas']
+        self._firmas = estado['firmas']
+        self._estado = estado['estado']
+        self._ultimo_valido = estado['ultimo_valido']
+
+    def version(self, df: pd.DataFrame) -> str | None:
+        """
+        Identificador del contenido de df (la salida de la última ejecución):
+        columnas, firma de cada fila y las columnas que el pipeline no lee
+        (IV Rank, Plan A…), sin las salidas volátiles. Cambia en cuanto cambia
+        una celda; None si aún no se ha ejecutado.
+        """
+        if self._firmas is None or len(self._firmas) != len(df):
+            return None
+        h = hashlib.blake2b(repr(self._columnas).encode(), digest_size=16)
+        h.update(np.ascontiguousarray(self._firmas).tobytes())
+        volatiles = {c for e in self.etapas if e.volatil for c in e.salidas}
+        firmadas = set(self._columnas_firma(df))
+        resto = [c for c in df.columns if c not in firmadas and c not in volatiles and c != '#']
+        if resto and not df.empty:
+            h.update(hash_pandas_object(df[resto], index=False).to_numpy().tobytes())
+        return h.hexdigest()
+
+    def firmas(self) -> np.ndarray | None:
+        """
+        Firma de cada fila de la última ejecución (None si aún no se ha
+        ejecutado): cambia cuando cambia una de las columnas que lee o
+        calcula el pipeline. No debe modificarse.
+        """
+        return self._firmas
+
+    def _columnas_firma(self, df: pd.DataFrame) -> list:
+        # Las salidas volátiles cambian solas con el tiempo: no ensucian filas
+        vistas = {}
+        for etapa in self.etapas:
+            vistas.update(dict.fromkeys(etapa.entradas if etapa.volatil else etapa.entradas + etapa.salidas))
+        return [c for c in df.columns if c in vistas]
+
+    def _firmar(self, df: pd.DataFrame) -> np.ndarray:
+        cols = self._columnas_firma(df)
+        if not cols or df.empty:
+            return np.zeros(len(df), dtype=np.uint64)
+        with etapa_perfil('pipeline.firmas', df):
+            return hash_pandas_object(df[cols], index=False).to_numpy()
+
+    def ejecutar(self, df: pd.DataFrame, filas_modificadas=None) -> pd.DataFrame:
+        """
+        Devuelve df con todas las columnas derivadas al día.
+        `filas_modificadas` (posiciones) se suma a las filas detectadas por firma.
+        """
+        df = df.reset_index(drop=True)
+        if self._columnas is None or list(df.columns) != self._columnas:
+            return self._ejecutar_completo(df)
+
+        n, n_prev = len(df), len(self._firmas)
+        firmas = self._firmar(df)
+        comunes = min(n, n_prev)
+        sucias = np.flatnonzero(firmas[:comunes] != self._firmas[:comunes])
+        sucias = np.union1d(sucias, np.arange(comunes, n))
+        if filas_modificadas is not None:
+            extra = np.asarray(list(filas_modificadas), dtype=int)
+            sucias = np.union1d(sucias, extra[(extra >= 0) & (extra < n)])
+
+        if len(sucias) > FRACCION_RECALCULO_TOTAL * max(n, 1):
+            return self._ejecutar_completo(df)
+
+        # Primera fila del sufijo acumulativo. Se retrocede hasta después del
+        # último 'Profit Tot.' válido del prefijo: calcular_dd_up no rellena
+        # las filas vacías finales, pero sí las intermedias si luego aparece
+        # un dato.
+        inicio = int(sucias[0]) if len(sucias) else min(n, n_prev)
+        if inicio < n or n < n_prev:
+            inicio = min(inicio, _ultimo_valido(df, 0, inicio) + 1)
+
+        # Con copy-on-write la copia es perezosa: solo se duplican las
+        # columnas que se reescriben (p. ej. 'Dia LIVE')
+        trabajo = df.copy(deep=not pd.options.mode.copy_on_write)
+        for etapa in self.etapas:
+            if etapa.tipo == 'acumulada':
+                continue
+            if etapa.volatil:
+                self._aplicar_filas(trabajo, etapa, np.arange(n))
+            elif len(sucias):
+                self._aplicar_filas(trabajo, etapa, sucias)
+        trabajo['#'] = np.arange(n)
+        return self._recalcular_sufijo(trabajo, firmas, sucias, inicio)
+
+    def anexar(self, df: pd.DataFrame, fila: dict) -> pd.DataFrame:
+        """
+        Ruta rápida para añadir una operación al final de la tabla ya
+        procesada: calcula solo las columnas de la fila nueva, continuando los
+        acumulados (Profit Tot., pico de DD/Max, racha de calcular_dd_up,
+        metas y Profit T.) desde el estado de la última fila. El coste no
+        depende del largo de la tabla. Si el pipeline no tiene estado para df,
+        solo concatena y deja el cálculo al próximo `ejecutar`.
+        """
+        df = df.reset_index(drop=True)
+        nueva = pd.DataFrame([fila])
+        if (
+            self._columnas is None or list(df.columns) != self._columnas
+            or len(df) != len(self._firmas) or not set(nueva.columns) <= set(df.columns)
+        ):
+            return pd.concat([df, nueva], ignore_index=True)
+
+        n = len(df)
+        nueva = nueva.reindex(columns=df.columns)
+        nueva.index = [n]
+        for etapa in self.etapas:
+            if etapa.tipo != 'acumulada':
+                self._aplicar_filas(nueva, etapa, nueva.index.to_numpy())
+        nueva['#'] = n
+        trabajo = pd.concat([df, _alinear_tipos(nueva, df)])
+
+        # Solo se recalculan la fila nueva y, si las hay, las filas sin
+        # 'Profit Tot.' que la preceden (operaciones abiertas al final).
+        inicio = min(n, self._ultimo_valido + 1)
+        firmas = np.append(self._firmas, np.uint64(0))
+        return self._recalcular_sufijo(trabajo, firmas, np.array([n]), inicio)
+
+    def _recalcular_sufijo(self, trabajo: pd.DataFrame, firmas: np.ndarray,
+                           sucias: np.ndarray, inicio: int) -> pd.DataFrame:
+        """Etapas acumulativas desde `inicio` y actualización de firmas y estado."""
+        n = len(trabajo)
+        previo = self._previo(trabajo, inicio) if inicio < n else None
+        for etapa in self.etapas:
+            if etapa.tipo == 'acumulada' and inicio < n:
+                self._aplicar_sufijo(trabajo, etapa, inicio, previo)
+
+        recalculadas = np.union1d(sucias, np.arange(inicio, n)).astype(int)
+        firmas = firmas[:n].copy()
+        if len(recalculadas):
+            firmas[recalculadas] = self._firmar(trabajo.iloc[recalculadas])
+        self._firmas = firmas
+
+        if inicio < n:
+            sufijo = calcular_estado_acumulado(trabajo.iloc[inicio:], previo)
+            self._estado = pd.concat([self._estado.iloc[:inicio], sufijo], ignore_index=True)
+            ultimo = _ultimo_valido(trabajo, inicio, n)
+            if ultimo >= 0:
+                self._ultimo_valido = ultimo
+            elif self._ultimo_valido >= inicio:
+                self._ultimo_valido = _ultimo_valido(trabajo, 0, inicio)
+        else:
+            self._estado = self._estado.iloc[:n]
+            if self._ultimo_valido >= n:
+                self._ultimo_valido = _ultimo_valido(trabajo, 0, n)
+        return trabajo
+
+    def _ejecutar_completo(self, df: pd.DataFrame) -> pd.DataFrame:
+        trabajo = limpiar_columnas(df)
+        for etapa in self.etapas:
+            trabajo = etapa.funcion(trabajo)
+        trabajo = trabajo.reset_index(drop=True)
+        self._columnas = list(trabajo.columns)
+        self._firmas = self._firmar(trabajo)
+        self._estado = calcular_estado_acumulado(trabajo).reset_index(drop=True)
+        self._ultimo_valido = _ultimo_valido(trabajo, 0, len(trabajo))
+        return trabajo
+
+    def _previo(self, trabajo: pd.DataFrame, inicio: int) -> dict | None:
+        """Estado de la fila inicio-1, en el formato `previo` de calculos_tabla_principal."""
+        if inicio == 0:
+            return None
+        previo = self._estado.iloc[inicio - 1].to_dict()
+        previo['tot'] = trabajo['Profit Tot.'].iloc[inicio - 1]
+        return previo
+
+    def _aplicar_filas(self, trabajo: pd.DataFrame, etapa: Etapa, filas: np.ndarray) -> None:
+        cols = etapa.columnas(trabajo)
+        res = etapa.funcion(trabajo.loc[filas, cols])
+        _asignar(trabajo, filas, res, etapa.salidas)
+
+    def _aplicar_sufijo(self, trabajo: pd.DataFrame, etapa: Etapa, inicio: int, previo: dict | None) -> None:
+        filas = trabajo.index[inicio:]
+        cols = etapa.columnas(trabajo)
+        res = etapa.funcion(trabajo.loc[filas, cols], previo=previo)
+        _asignar(trabajo, filas, res, etapa.salidas)
+
+
+def _ultimo_valido(df: pd.DataFrame, desde: int, hasta: int) -> int:
+    """Posición de la última fila con 'Profit Tot.' numérico en [desde, hasta), o -1."""
+    if 'Profit Tot.' not in df.columns or hasta <= desde:
+        return -1
+    tot = pd.to_numeric(df['Profit Tot.'].iloc[desde:hasta], errors='coerce').to_numpy(dtype=float)
+    validos = np.flatnonzero(~np.isnan(tot))
+    return desde + int(validos[-1]) if len(validos) else -1
+
+
+def _alinear_tipos(nueva: pd.DataFrame, df: pd.DataFrame) -> pd.DataFrame:
+    """Convierte las columnas de `nueva` al dtype de df para que concat no las degrade a objeto."""
+    nueva = nueva.copy()
+    for col in nueva.columns:
+        if nueva[col].dtype != df[col].dtype:
+            try:
+                nueva[col] = nueva[col].astype(df[col].dtype)
+            except (TypeError, ValueError):
+                pass
+    return nueva
+
+
+def _asignar(trabajo: pd.DataFrame, filas: np.ndarray, res: pd.DataFrame, columnas: list) -> None:
+    """Copia en `trabajo` las columnas de `res` para las filas dadas."""
+    for col in columnas:
+        if col not in res.columns:
+            continue
+        valores = res[col]
+        if col not in trabajo.columns:
+            trabajo[col] = valores.reindex(trabajo.index)
+        elif trabajo[col].dtype == valores.dtype:
+            trabajo.loc[filas, col] = valores.to_numpy()
+        else:
+            # Distinto dtype (p. ej. fechas en texto): se mezcla como objeto
+            # y se deja que pandas infiera el tipo final.
+            mezcla = trabajo[col].astype(object)
+            mezcla.loc[filas] = valores.astype(object).to_numpy()
+            trabajo[col] = mezcla.infer_objects()
+
+
+# ———————— Etapas de la tabla principal (ui.py) ————————
+
+def convertir_fechas_tabla(df: pd.DataFrame, clave: str | None = None) -> pd.DataFrame:
+    return convertir_fechas(
+        df,
+        cols=['Fecha / Hora', 'Fecha / Hora de Cierre'],
+        dayfirst=True,
+        yearfirst=False,
+        clave=clave
+    )
+
+
+def agregar_dia_semana(df: pd.DataFrame) -> pd.DataFrame:
+    """Añade la columna 'Día' (Lu, Ma, Mi, etc.) a partir de 'Fecha / Hora'."""
+    df = df.copy()
+    df['Día'] = df['Fecha / Hora'].dt.weekday.map(DIAS_SEMANA)
+    return df
+
+
+def profit_op_numerico(df: pd.DataFrame) -> pd.DataFrame:
+    """'% Profit. Op' como float: los archivos antiguos lo guardan como texto '1.23%'."""
+    if '% Profit. Op' in df.columns and not pd.api.types.is_float_dtype(df['% Profit. Op']):
+        df = df.copy()
+        df['% Profit. Op'] = pd.to_numeric(
+            df['% Profit. Op'].astype(str).str.rstrip('%'), errors='coerce'
+        )
+    return df
+
+
+FECHAS = ['Fecha / Hora', 'Fecha / Hora de Cierre']
+STRK = ['#Cont', 'STRK Buy', 'STRK Sell']
+METAS = ['Profit Tot.', 'STRK Buy', '#Cont']
+
+# Columnas que el pipeline escribe siempre desde otras: un valor editado a
+# mano se pierde en el siguiente cálculo, así que el editor no las deja tocar
+COLUMNAS_CALCULADAS = [
+    'Día', 'T. Op', 'Dia LIVE', 'Tiempo D/R', 'Profit', '% Profit. Op',
+    'Profit Tot.', 'DD/Max', 'Profit Alcanzado', 'Profit Media', 'Profit T.',
+]
+
+
+def crear_pipeline_principal() -> PipelineIncremental:
+    """Pipeline con la misma cadena de cálculos que ejecutaba ui.py."""
+    pipeline = PipelineIncremental([
+        # Los formatos de fecha detectados se cachean por archivo (pipeline.clave)
+        Etapa('fechas', lambda df: convertir_fechas_tabla(df, clave=pipeline.clave), FECHAS, FECHAS),
+        Etapa('dia', agregar_dia_semana, ['Fecha / Hora'], ['Día']),
+        Etapa('t_op', calcular_tiempo_operacion_vectorizado, FECHAS + ['Deposito', 'Retiro'], ['T. Op']),
+        Etapa('profit_op', profit_op_numerico, ['% Profit. Op'], ['% Profit. Op']),
+        Etapa('dia_live', calcular_dia_live, FECHAS, ['Dia LIVE'], volatil=True),
+        Etapa('tiempo_dr', calcular_tiempo_dr, FECHAS + ['Deposito', 'Retiro'], ['Tiempo D/R']),
+        Etapa('profit', calcular_profit_operacion, STRK, STRK + ['Profit']),
+        Etapa('pct_profit', calcular_porcentaje_profit_op, ['STRK Buy', 'STRK Sell'], ['% Profit. Op']),
+        Etapa('dep_ret', procesar_deposito_retiro, ['Deposito', 'Retiro'],
+              ['Profit', 'Activo', 'Deposito', 'Retiro', 'C&P', 'D'] + STRK),
+        Etapa('profit_tot', calcular_profit_total, ['Profit'], ['Profit Tot.'], tipo='acumulada'),
+        Etapa('dd_max', calcular_dd_max, ['Profit Tot.'], ['DD/Max'], tipo='acumulada'),
+        Etapa('dd_up', calcular_dd_up, ['Profit Tot.', 'DD/Max'], ['DD/Max'], tipo='acumulada'),
+        Etapa('alcanzado', calcular_profit_alcanzado_vectorizado, METAS + ['% Alcanzado'],
+              ['Profit Alcanzado'], tipo='acumulada'),
+        Etapa('media', calcular_profit_media_vectorizado, METAS + ['% Media'],
+              ['Profit Media'], tipo='acumulada'),
+        Etapa('profit_t', calcular_profit_t, ['Profit Tot.'], ['Profit T.'], tipo='acumulada'),
+    ])
+    return pipeline
@@ -0,0 +1,45 @@
+"""
+Registro de los gráficos comparativos de la pestaña Vista.
+
+Cada gráfico se registra por su nombre en el selector con el módulo y la
+función que lo dibuja, sin importarlos: el módulo (y con él plotly.express
+y lo que use) se importa la primera vez que alguien elige ese gráfico, así
+que arrancar la app no carga los gráficos que nadie abre.
+"""
+
+import importlib
+
+# Nombre en el selector → (módulo, función(df, chart_key=...))
+GRAFICOS = {
+    "Barras": ("comparativos_graficos_barras", "mostrar_profit_interactivo"),
+    "Líneas": ("comparativos_graficos_linea", "mostrar_profit_trend_interactivo"),
+    "DD/Max": ("comparativo_mostrar_dd_max", "mostrar_dd_max"),
+    "Área": ("comparativo_profit_area", "mostrar_profit_area"),
+    "Puntos": ("comparativo_profit_puntos", "mostrar_profit_puntos"),
+    "Tiempo": ("comparativos_tiempo_puntos", "mostrar_tiempo_puntos"),
+    "CALL vs PUT Línea": ("comparativo_call_put_linea", "comparativo_call_put_linea"),
+    "CALL Barras": ("Comparativo_call_barra", "comparativo_call_barra"),
+    "PUT Barras": ("comparativo_put_barra", "comparativo_put_barra"),
+    "Días Línea": ("comparativo_dias_linea", "comparativo_dias_linea"),
+    "CALL/PUT por Día (Apilado)": ("comparativo_trade_diario_apilado", "comparativo_trade_diario_apilado"),
+    "Profit por Día de Semana": ("comparativo_profit_dia_semana", "comparativo_profit_dia_semana"),
+    "Porcentaje Aciertos CALL PUT (Dona)": ("comparativo_dona_call_put", "comparativo_dona_call_put"),
+    "Histograma Profit CALL/PUT": ("comparativo_histograma_profit_call_put", "histograma_profit_call_put"),
+    "Racha Operaciones DD/Max": ("comparativo_racha_operaciones_dd_max", "comparativo_racha_dd_max"),
+    "Mapa de calor Tiempo": ("comparativo_mapa_calor_tiempo", "mostrar_heatmaps_dia_hora"),
+    "Calendario": ("comparativo_calendario", "mostrar_calendario"),
+}
+
+# Gráficos que reciben el journal completo en lugar del rango del slider
+JOURNAL_COMPLETO = {"Calendario"}
+
+_cargados = {}
+
+
+def obtener_grafico(nombre: str):
+    """Función que dibuja el gráfico `nombre`, importando su módulo si hace falta."""
+    funcion = _cargados.get(nombre)
+    if funcion is None:
+        modulo, atributo = GRAFICOS[nombre]
+        funcion = _cargados[nombre] = getattr(importlib.import_module(modulo), atributo)
+    return funcion
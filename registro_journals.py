@@ -0,0 +1,91 @@
+"""
+Registro de journals ya parseados compartido por todas las sesiones del
+proceso (un servidor de Streamlit con varios usuarios).
+
+Cada entrada se identifica por (clave del objeto, versión) (la versión es
+el ETag, o el contenido del manifiesto en los journals particionados), así
+que nunca cambia: si el objeto cambia en S3 la nueva versión es otra
+entrada. Las sesiones no reciben el DataFrame registrado sino una vista
+copy-on-write (df.copy(deep=False) con pd.options.mode.copy_on_write, que
+ui.py activa): comparten los arrays y solo se duplican las columnas que
+cada sesión modifica, así que otro usuario que abre el mismo journal
+apenas ocupa memoria. Sin copy-on-write las vistas son copias completas.
+
+Cuando la memoria de las entradas supera el presupuesto se descartan las
+usadas hace más tiempo.
+"""
+
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+import config
+
+
+def _vista(df: pd.DataFrame) -> pd.DataFrame:
+    return df.copy(deep=not pd.options.mode.copy_on_write)
+
+
+class RegistroJournals:
+    def __init__(self, presupuesto_bytes: int):
+        self.presupuesto_bytes = presupuesto_bytes
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+
+    def obtener(self, clave: tuple):
+        """(vista, extra) de la entrada `clave`, o None si no está registrada."""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                return None
+            self._entradas.move_to_end(clave)
+            df, extra, _ = entrada
+        return _vista(df), extra
+
+    def registrar(self, clave: tuple, df: pd.DataFrame, extra=None) -> pd.DataFrame:
+        """
+        Registra `df` (con datos `extra` opcionales, p. ej. el estado del
+        pipeline) como la entrada `clave` y devuelve una vista. `df` no debe
+        modificarse después: el registro guarda su propia vista.
+        """
+        propio = _vista(df)
+        tamano = int(propio.memory_usage(index=True, deep=True).sum())
+        with self._lock:
+            previa = self._entradas.pop(clave, None)
+            if previa is not None:
+                self.bytes -= previa[2]
+            if tamano <= self.presupuesto_bytes:
+                self._entradas[clave] = (propio, extra, tamano)
+                self.bytes += tamano
+            while self.bytes > self.presupuesto_bytes and self._entradas:
+                _, (_, _, liberado) = self._entradas.popitem(last=False)
+                self.bytes -= liberado
+        return _vista(propio)
+
+    def descartar(self, clave_objeto: str) -> None:
+        """Quita todas las versiones registradas del objeto `clave_objeto`."""
+        with self._lock:
+            for clave in [c for c in self._entradas if c[1] == clave_objeto]:
+                self.bytes -= self._entradas.pop(clave)[2]
+
+
+# Registro del proceso
+registro = RegistroJournals(config.MEMORIA_JOURNALS_MB * 2**20)
+
+
+def procesar_compartido(pipeline, df: pd.DataFrame, clave_objeto: str, version: str) -> pd.DataFrame:
+    """
+    Primera ejecución del pipeline sobre un journal recién cargado. Si otra
+    sesión ya procesó esta versión, adopta su resultado (vista) y el estado
+    de su pipeline sin recalcular nada; si no, lo procesa y lo registra.
+    """
+    clave = ("procesado", clave_objeto, version)
+    entrada = registro.obtener(clave)
+    if entrada is not None:
+        vista, estado = entrada
+        pipeline.adoptar_estado(estado)
+        return vista
+    procesado = pipeline.ejecutar(df)
+    return registro.registrar(clave, procesado, pipeline.exportar_estado())
@@ -1,6 +1,8 @@
 import pandas as pd
 import streamlit as st
 
+from estadisticas_operaciones import EstadisticasOperaciones, calcular_estadisticas
+
 
 def calcular_medias_operaciones(df: pd.DataFrame) -> tuple[float, float]:
     """
@@ -18,23 +20,8 @@ def calcular_medias_operaciones(df: pd.DataFrame) -> tuple[float, float]:
     - media_positiva: media de todos los Profit > 0 (0.0 si no hay).
     - media_negativa: media de todos los abs(Profit < 0) (0.0 si no hay).
     """
-    if 'Profit' not in df.columns:
-        return 0.0, 0.0
-
-    # Normalizar y filtrar Profit
-    profits = pd.to_numeric(df['Profit'], errors='coerce').fillna(0.0)
-    # Excluir depósitos y retiros
-    if 'Deposito' in df.columns and 'Retiro' in df.columns:
-        mask = df[['Deposito', 'Retiro']].notna().any(axis=1)
-        profits = profits.loc[~mask]
-
-    positivas = profits[profits > 0]
-    negativas = profits[profits < 0].abs()
-
-    return (
-        positivas.mean() if not positivas.empty else 0.0,
-        negativas.mean() if not negativas.empty else 0.0
-    )
+    estadisticas = calcular_estadisticas(df)
+    return estadisticas.media_ganancias, estadisticas.media_perdidas
 
 
 def calcular_ratio_riesgo_beneficio(media_negativa: float, media_positiva: float) -> float:
@@ -68,36 +55,18 @@ def calcular_profit_final(df: pd.DataFrame) -> float:
 
     Si no hay pérdidas (negativos == 0), devuelve float('inf').
     """
-    if 'Profit' not in df.columns:
-        return 0.0
-
-    # Convertir Profit a numérico y rellenar NaN con 0
-    profits = pd.to_numeric(df['Profit'], errors='coerce').fillna(0.0)
-
-    # Excluir filas que son depósitos o retiros
-    if 'Deposito' in df.columns and 'Retiro' in df.columns:
-        mask_excluir = df['Deposito'].notna() | df['Retiro'].notna()
-        profits = profits[~mask_excluir]
-
-    # Suma de positivos y de negativos (en valor absoluto)
-    suma_positivos = profits[profits > 0].sum()
-    suma_negativos = profits[profits < 0].abs().sum()
-
-    # Evitar división por cero
-    if suma_negativos == 0:
-        return float('inf')
-
-    return suma_positivos / suma_negativos
+    return calcular_estadisticas(df).profit_factor
 
 
 
-def render_riesgo_beneficio(df: pd.DataFrame) -> None:
+def render_riesgo_beneficio(df: pd.DataFrame, estadisticas: EstadisticasOperaciones | None = None) -> None:
     """
     Renderiza la tabla de Riesgo / Beneficio en la sidebar:
       - Riesgo: ratio de pérdidas medias sobre ganancias medias. (color rojo)
       - Beneficio: beneficio por unidad de riesgo. (color verde)
       - Profit F.: profit final. (color amarillo)
-    Todo formateado con 2 decimales y centrado.
+    Todo formateado con 2 decimales y centrado. `estadisticas` son las de
+    df ya calculadas (si no, se calculan).
     """
     st.sidebar.markdown("### Riesgo / Beneficio")
     tabla = pd.DataFrame({
@@ -107,10 +76,11 @@ def render_riesgo_beneficio(df: pd.DataFrame) -> None:
     })
 
     if not df.empty and 'Profit' in df.columns:
-        media_pos, media_neg = calcular_medias_operaciones(df)
-        ratio = calcular_ratio_riesgo_beneficio(media_neg, media_pos)
+        if estadisticas is None:
+            estadisticas = calcular_estadisticas(df)
+        ratio = calcular_ratio_riesgo_beneficio(estadisticas.media_perdidas, estadisticas.media_ganancias)
         beneficio = calcular_beneficio_por_riesgo(ratio)
-        profit_final = calcular_profit_final(df)
+        profit_final = estadisticas.profit_factor
         tabla.loc[0] = [
             f"{ratio:.2f}",
             f"{beneficio:.2f}",
@@ -1,8 +1,10 @@
 import time
-from io import BytesIO
+import uuid
 import streamlit as st
-from gestor_archivos_s3 import update_file
-from datetime import datetime
+from cola_guardado import (
+    descartar_estado_guardado, encolar_guardado, estado_guardado, esperar_guardado, fijar_base_guardado,
+)
+from concurrencia_journal import base_guardado
 
 # Flag por defecto para autoguardado
 if 'auto_save_enabled' not in st.session_state:
@@ -10,18 +12,110 @@ if 'auto_save_enabled' not in st.session_state:
 
 AUTOSAVE_INTERVAL = 60  # segundos
 
+# Segundos que el botón manual espera a que la cola suba el archivo
+ESPERA_GUARDADO_MANUAL = 30
+
+
+def id_sesion() -> str:
+    """
+    Identifica la sesión en la cola de guardado (cada una guarda contra la
+    versión del journal que cargó). Se crea al pedirlo: el módulo solo se
+    importa en la primera sesión del servidor.
+    """
+    if 'id_sesion' not in st.session_state:
+        st.session_state.id_sesion = uuid.uuid4().hex
+    return st.session_state.id_sesion
+
+
+def fijar_version_cargada(archivo: str, clave: str, etag: str | None, datos):
+    """
+    Anota en la cola de guardado la versión de `archivo` que se acaba de
+    cargar (objeto `clave` con `etag`, ya procesado en `datos`): los
+    guardados de esta sesión solo sobrescriben esa versión.
+    """
+    fijar_base_guardado(archivo, id_sesion(), base_guardado(clave, etag, datos))
+
+
+def _version_datos() -> str | None:
+    """
+    pipeline.version de st.session_state.datos. Antes lo pasa por el
+    pipeline de la sesión (solo recalcula las filas que cambiaron), porque
+    la versión solo describe la salida de la última ejecución. None si la
+    sesión aún no tiene pipeline o acaba de cargar un journal sin procesar.
+    """
+    pipeline = st.session_state.get("pipeline")
+    if pipeline is None or st.session_state.get("journal_cargado") is not None:
+        return None
+    st.session_state.datos = datos = pipeline.ejecutar(st.session_state.datos)
+    return pipeline.version(datos)
+
+
+def encolar_archivo_actual(archivo: str, retardo: float | None = None) -> int:
+    """
+    Encarga a la cola de guardado una copia de st.session_state.datos como
+    `archivo` y anota el encargo (con la versión de los datos encargados)
+    en sesión para actualizar_estado_guardado. Devuelve la versión del
+    encargo.
+    """
+    version_datos = _version_datos()
+    datos = st.session_state.datos
+    version = encolar_guardado(archivo, datos.copy(), retardo, sesion=id_sesion())
+    st.session_state.guardado_pendiente = (archivo, version, version_datos)
+    st.session_state.ultimo_encargo = time.time()
+    return version
+
+
+def actualizar_estado_guardado():
+    """
+    Pasa a la sesión el resultado del último guardado encargado: al
+    completarse actualiza last_auto_save y, si los datos no han cambiado
+    desde el encargo (misma pipeline.version), baja data_modified (si la
+    cola tuvo que combinar con operaciones de otra sesión, pasa a usar el
+    DataFrame combinado y guarda desde entonces contra su versión); si
+    falló sin más reintentos o por un conflicto deja el error en
+    last_auto_save y el aviso en aviso_guardado. Se llama en cada rerun.
+    Una vez leído, el estado se descarta de la cola.
+    """
+    pendiente = st.session_state.get("guardado_pendiente")
+    if not pendiente:
+        return
+    archivo, version, version_datos = pendiente
+    estado = estado_guardado(archivo, id_sesion())
+    if estado is None:
+        return
+    if estado["guardada"] >= version:
+        st.session_state.last_auto_save = estado["ultimo_guardado"]
+        combinado = estado["combinado"]
+        if version_datos is not None and _version_datos() == version_datos:
+            if combinado is not None:
+                st.session_state.datos = combinado
+                fijar_base_guardado(archivo, id_sesion(), estado["base_combinada"])
+            st.session_state.data_modified = False
+        elif combinado is not None:
+            st.session_state.aviso_guardado = (
+                f"Se añadieron a '{archivo}' operaciones de otra sesión; recárgalo para verlas."
+            )
+        st.session_state.guardado_pendiente = None
+        descartar_estado_guardado(archivo, id_sesion())
+    elif estado["estado"] in ("error", "conflicto"):
+        st.session_state.last_auto_save = f"ERROR: {estado['error']}"
+        if estado["estado"] == "conflicto":
+            st.session_state.aviso_guardado = estado["error"]
+        st.session_state.guardado_pendiente = None
+        descartar_estado_guardado(archivo, id_sesion())
+
+
 def maybe_autosave():
     """
     Si st.session_state.data_modified es True, el autoguardado está habilitado y hace más de AUTOSAVE_INTERVAL
-    segundos que guardamos por última vez, ejecuta la misma lógica que
-    el botón manual de 'Guardar cambios en S3', sin mostrar toasts.
+    segundos que se encargó el último guardado, encarga uno a la cola, sin mostrar toasts.
     """
     # Solo si el autoguardado está activado
     if not st.session_state.get('auto_save_enabled', True):
         return
 
     ahora = time.time()
-    last = st.session_state.get("last_auto_save", 0)
+    last = st.session_state.get("ultimo_encargo", 0)
     archivo = st.session_state.get("selector_archivo")
 
     if (
@@ -30,24 +124,14 @@ def maybe_autosave():
         and st.session_state.get("data_modified", False)
         and (ahora - last) > AUTOSAVE_INTERVAL
     ):
-        buf = BytesIO()
-        st.session_state.datos.to_csv(buf, index=False, encoding="utf-8")
-        buf.seek(0)
-        try:
-            update_file(archivo, buf.getvalue())
-            ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            # Actualiza el timestamp en sesión, sin toasts
-            st.session_state.last_auto_save = ts
-            st.session_state.data_modified = False
-        except Exception as e:
-            # En caso de error, guarda mensaje de error en sesión
-            st.session_state.last_auto_save = f"ERROR: {e}"
+        encolar_archivo_actual(archivo)
 
 
 def save_current_file():
     """
-    Guarda inmediatamente en S3 el DataFrame actual sin interrumpir la UI,
-    solo si el autoguardado está habilitado. Actualiza el timestamp en sesión sin toasts.
+    Encarga a la cola de guardado subir a S3 el DataFrame actual, sin
+    esperar a S3 ni interrumpir la UI, solo si el autoguardado está
+    habilitado. El timestamp en sesión se actualiza al completarse.
     """
     # Solo si el autoguardado está activado
     if not st.session_state.get('auto_save_enabled', True):
@@ -56,13 +140,20 @@ def save_current_file():
     archivo = st.session_state.get("selector_archivo")
     if not archivo or archivo == "↑ Subir nuevo ↑":
         return
-    buf = BytesIO()
-    st.session_state.datos.to_csv(buf, index=False, encoding="utf-8")
-    buf.seek(0)
-    try:
-        update_file(archivo, buf.getvalue())
-        ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        st.session_state.last_auto_save = ts
-        st.session_state.data_modified = False
-    except Exception as e:
-        st.session_state.last_auto_save = f"ERROR: {e}"
+    encolar_archivo_actual(archivo)
+
+
+def guardar_archivo_ahora(archivo: str) -> str | None:
+    """
+    Guardado manual: pasa el DataFrame actual por la cola sin retardo (así
+    no lo pisa un guardado anterior aún en curso) y espera a que termine.
+    Devuelve None si se guardó o el motivo si no.
+    """
+    version = encolar_archivo_actual(archivo, retardo=0)
+    estado = esperar_guardado(archivo, version, timeout=ESPERA_GUARDADO_MANUAL, sesion=id_sesion())
+    actualizar_estado_guardado()
+    if estado["guardada"] >= version:
+        return None
+    if estado["estado"] in ("error", "conflicto"):
+        return estado["error"]
+    return f"sigue pendiente tras {ESPERA_GUARDADO_MANUAL} s ({estado['error'] or estado['estado']})"
@@ -0,0 +1,56 @@
+"""
+Ventana de filas de la tabla principal (pestaña Vista).
+
+Con journals de varios años, pintar la tabla entera en cada rerun (Styler
+genera el CSS de cada celda) y enviarla al navegador es lo que más tarda
+en la Vista. Aquí se elige una ventana de filas —las últimas N, una
+página de N o N filas desde una fila concreta— y solo esa ventana se
+pinta y se envía. Las columnas acumuladas (Profit Tot., DD/Max, Profit
+T.…) ya vienen calculadas sobre el journal completo, así que la ventana
+muestra los mismos valores que la tabla entera, y las estadísticas y los
+gráficos siguen usando el journal completo.
+"""
+
+import streamlit as st
+
+MODOS = ["Últimas filas", "Páginas", "Desde fila"]
+TAMANOS_VENTANA = [100, 250, 500, 1000, 'Todas']
+TAMANO_VENTANA = 250
+
+
+def rango_ventana(total: int, tamano, modo: str, pagina: int = 1, fila: int = 0) -> tuple[int, int]:
+    """(inicio, fin) de la ventana (fin excluido) dentro de `total` filas."""
+    if tamano == 'Todas' or total <= 0:
+        return 0, max(total, 0)
+    tamano = int(tamano)
+    if modo == "Páginas":
+        paginas = -(-total // tamano)
+        inicio = (min(max(int(pagina), 1), paginas) - 1) * tamano
+    elif modo == "Desde fila":
+        inicio = min(max(int(fila), 0), total - 1)
+    else:
+        inicio = max(0, total - tamano)
+    return inicio, min(inicio + tamano, total)
+
+
+def elegir_ventana(total: int) -> tuple[int, int]:
+    """Controles de la ventana encima de la tabla; devuelve (inicio, fin)."""
+    col_modo, col_tamano, col_pos = st.columns([2, 1, 1])
+    with col_modo:
+        modo = st.radio("Filas", MODOS, horizontal=True, key='vista_modo')
+    with col_tamano:
+        tamano = st.selectbox(
+            "Filas por vista", TAMANOS_VENTANA,
+            index=TAMANOS_VENTANA.index(TAMANO_VENTANA), key='vista_tamano'
+        )
+    pagina, fila = 1, 0
+    with col_pos:
+        if tamano != 'Todas' and modo == "Páginas":
+            paginas = max(1, -(-total // int(tamano)))
+            pagina = st.number_input(f"Página (de {paginas})", min_value=1, value=paginas, step=1, key='vista_pagina')
+        elif tamano != 'Todas' and modo == "Desde fila":
+            fila = st.number_input("Ir a la fila", min_value=0, value=max(0, total - int(tamano)), step=1, key='vista_fila')
+
+    inicio, fin = rango_ventana(total, tamano, modo, pagina, fila)
+    st.caption(f"Filas **{inicio}** a **{max(fin - 1, inicio)}** de **{total}**.")
+    return inicio, fin
@@ -0,0 +1,10 @@
+import os
+import sys
+
+# Los módulos de la app están en la raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# gestor_archivos_s3 se detiene al importarse si faltan las credenciales;
+# las pruebas usan cliente_s3_local
+for _variable in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "AWS_REGION", "AWS_BUCKET_NAME"):
+    os.environ.setdefault(_variable, "pruebas")
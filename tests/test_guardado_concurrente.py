@@ -0,0 +1,127 @@
+"""
+Dos sesiones que guardan el mismo journal a la vez, sobre cliente_s3_local:
+tras combinar las operaciones de la otra sesión, los guardados siguientes
+no pueden perderlas.
+"""
+
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+import cola_guardado
+import config
+import gestor_archivos_s3 as gestor
+import s3_utils
+from benchmarks.generador import generar_journal
+from cliente_s3_local import ClienteS3Local
+from journal_particionado import JournalParticionado
+from pipeline_incremental import crear_pipeline_principal
+
+ARCHIVO = "journal.csv"
+
+
+class Sesion(dict):
+    """st.session_state de una sesión: un dict con acceso por atributo."""
+
+    def __getattr__(self, nombre):
+        try:
+            return self[nombre]
+        except KeyError:
+            raise AttributeError(nombre) from None
+
+    def __setattr__(self, nombre, valor):
+        self[nombre] = valor
+
+
+@pytest.fixture(params=[None, "mes"], ids=["objeto", "particionado"])
+def s3(request, tmp_path, monkeypatch):
+    cliente = ClienteS3Local(str(tmp_path))
+    monkeypatch.setattr(gestor.s3, "_cliente", cliente)
+    monkeypatch.setattr(gestor, "cache", None)
+    monkeypatch.setattr(gestor, "journals", JournalParticionado(gestor.s3, gestor.BUCKET, "journals/"))
+    monkeypatch.setattr(config, "PARTICIONES_JOURNAL", request.param)
+    monkeypatch.setattr(cola_guardado, "_cola", None)
+    monkeypatch.setattr(s3_utils, "st", SimpleNamespace(session_state=Sesion()))
+    cliente.put_object(
+        Bucket=gestor.BUCKET, Key=f"uploads/{ARCHIVO}",
+        Body=generar_journal(30).to_csv(index=False).encode("utf-8"),
+    )
+    return cliente
+
+
+def activar(sesion: Sesion) -> Sesion:
+    s3_utils.st.session_state = sesion
+    return sesion
+
+
+def cargar(id_sesion: str) -> Sesion:
+    """Carga el journal como ui.py y fija la versión cargada."""
+    sesion = activar(Sesion(id_sesion=id_sesion, pipeline=crear_pipeline_principal()))
+    df, clave, _, etag = gestor.cargar_journal(ARCHIVO)
+    sesion.datos = sesion.pipeline.ejecutar(df)
+    s3_utils.fijar_version_cargada(ARCHIVO, clave, etag, sesion.datos)
+    return sesion
+
+
+def rerun(sesion: Sesion) -> None:
+    """Como cada rerun de ui.py: los datos pasan a ser una salida nueva del pipeline."""
+    activar(sesion)
+    s3_utils.actualizar_estado_guardado()
+    sesion.datos = sesion.pipeline.ejecutar(sesion.datos)
+
+
+def anadir(sesion: Sesion, activo: str) -> None:
+    activar(sesion)
+    fila = {'Activo': activo, 'C&P': 'CALL', 'Fecha / Hora': pd.Timestamp('2031-01-02 10:00'),
+            '#Cont': 1, 'STRK Buy': 1.0, 'STRK Sell': 2.0}
+    sesion.datos = sesion.pipeline.ejecutar(pd.concat([sesion.datos, pd.DataFrame([fila])], ignore_index=True))
+    sesion.data_modified = True
+
+
+def guardar(sesion: Sesion) -> None:
+    activar(sesion)
+    assert s3_utils.guardar_archivo_ahora(ARCHIVO) is None
+
+
+def activos_en_s3() -> list:
+    return gestor.cargar_journal(ARCHIVO)[0]['Activo'].tolist()
+
+
+def test_guardar_tras_combinar_conserva_las_filas_ajenas(s3):
+    a, b = cargar("a"), cargar("b")
+    anadir(b, "B1")
+    guardar(b)
+
+    anadir(a, "A1")
+    guardar(a)  # choca con el guardado de B y combina
+    assert a.datos['Activo'].tolist()[-2:] == ["B1", "A1"]
+    assert not a.data_modified
+
+    rerun(a)
+    anadir(a, "A2")
+    guardar(a)
+    activos = activos_en_s3()
+    assert len(activos) == 33
+    assert activos[-3:] == ["B1", "A1", "A2"]
+
+
+def test_sin_adoptar_el_combinado_el_siguiente_guardado_vuelve_a_combinar(s3):
+    a, b = cargar("a"), cargar("b")
+    anadir(b, "B1")
+    guardar(b)
+
+    anadir(a, "A1")
+    activar(a)
+    version = s3_utils.encolar_archivo_actual(ARCHIVO, retardo=0)
+    cola_guardado.esperar_guardado(ARCHIVO, version, timeout=30, sesion="a")
+    # A cambia sus datos antes de recoger el resultado: no adopta el combinado
+    anadir(a, "A2")
+    rerun(a)
+    assert "B1" not in a.datos['Activo'].tolist()
+    assert a.get("aviso_guardado")
+
+    guardar(a)
+    activos = activos_en_s3()
+    assert len(activos) == 33
+    assert sorted(activos[-3:]) == ["A1", "A2", "B1"]
@@ -1,16 +1,64 @@
 import numpy as np
 import pandas as pd
 
+import config
+from calendario_mercado import obtener_calendario, NS_DIA, NS_HORA
+
+NS_MINUTO = 60 * 10**9
+
+
+def _a_datetime64(fechas: pd.Series) -> np.ndarray:
+    """Fechas como datetime64[ns] sin zona horaria (hora local de la tabla)."""
+    fechas = pd.to_datetime(fechas, errors='coerce')
+    if getattr(fechas.dt, 'tz', None) is not None:
+        fechas = fechas.dt.tz_localize(None)
+    return fechas.to_numpy(dtype='datetime64[ns]')
+
+
+def tiempo_habil_ns(ini: pd.Series, fin: pd.Series) -> np.ndarray:
+    """
+    Nanosegundos hábiles entre `ini` y `fin` para toda la columna a la vez,
+    excluyendo fines de semana y los festivos del calendario de
+    config.CALENDARIO_MERCADO (y fuera de la sesión regular si
+    config.SOLO_SESION_REGULAR). Es lo mismo que sumar, día hábil a día
+    hábil, la parte de [ini, fin] que cae en cada uno. Devuelve int64;
+    negativo si fin < ini.
+    """
+    calendario = obtener_calendario(config.CALENDARIO_MERCADO)
+    return calendario.tiempo_habil_ns(
+        _a_datetime64(ini), _a_datetime64(fin), solo_sesion=config.SOLO_SESION_REGULAR
+    )
+
+
+def _partes_duracion(ns: np.ndarray):
+    """Días, horas y minutos (Series de texto) de una duración en nanosegundos."""
+    ns = pd.Series(ns)
+    dias = (ns // NS_DIA).astype(str)
+    horas = ((ns % NS_DIA) // NS_HORA).astype(str)
+    minutos = ((ns % NS_HORA) // NS_MINUTO).astype(str).str.zfill(2)
+    return dias, horas, minutos
+
+
+def formatear_duracion(ns: np.ndarray) -> np.ndarray:
+    """Formato 'Xd HHh MMm' (sin 'Xd' si es menos de un día), el de 'T. Op'."""
+    dias, horas, minutos = _partes_duracion(ns)
+    hm = horas.str.zfill(2) + 'h ' + minutos + 'm'
+    return np.where(np.asarray(ns) >= NS_DIA, dias + 'd ' + hm, hm)
+
+
+def formatear_duracion_dias(ns: np.ndarray) -> np.ndarray:
+    """Formato 'Xd Hh MMm', el de 'Dia LIVE' y 'Tiempo D/R'."""
+    dias, horas, minutos = _partes_duracion(ns)
+    return (dias + 'd ' + horas + 'h ' + minutos + 'm').to_numpy()
 
-import numpy as np
-import pandas as pd
 
 def calcular_tiempo_operacion_vectorizado(df: pd.DataFrame) -> pd.DataFrame:
     """
     Calcula el tiempo operativo entre 'Fecha / Hora' y 'Fecha / Hora de Cierre',
-    excluyendo fines de semana, con precisión por horas.
+    excluyendo fines de semana y festivos, con precisión por horas.
     Añade o actualiza la columna 'T. Op' con el formato 'Xd XXh XXm'.
-    Si existe Depósito o Retiro, deja 'T. Op' vacío.
+    Si existe Depósito o Retiro, deja 'T. Op' vacío; también si la
+    apertura es posterior al cierre.
     """
     df = df.copy()
     df['T. Op'] = ''
@@ -26,28 +74,11 @@ def calcular_tiempo_operacion_vectorizado(df: pd.DataFrame) -> pd.DataFrame:
     if not mask.any():
         return df
 
-    def calcular_duracion(row):
-        ini = row['Fecha / Hora']
-        fin = row['Fecha / Hora de Cierre']
-        if ini > fin:
-            return ''
-        
-        # Rango de días hábiles
-        dias_habiles = pd.date_range(start=ini.date(), end=fin.date(), freq='B')
-        segundos = 0
-
-        for dia in dias_habiles:
-            dia = pd.Timestamp(dia)
-            ini_dia = max(ini, dia)
-            fin_dia = min(fin, dia + pd.Timedelta(days=1))
-            if ini_dia < fin_dia:
-                segundos += (fin_dia - ini_dia).total_seconds()
-
-        delta = pd.to_timedelta(segundos, unit='s')
-        d, h, m = delta.days, delta.seconds // 3600, (delta.seconds % 3600) // 60
-        return f"{d}d {h:02d}h {m:02d}m" if d else f"{h:02d}h {m:02d}m"
-
-    df.loc[mask, 'T. Op'] = df.loc[mask].apply(calcular_duracion, axis=1)
+    ini = df.loc[mask, 'Fecha / Hora']
+    fin = df.loc[mask, 'Fecha / Hora de Cierre']
+    ns = tiempo_habil_ns(ini, fin)
+    valido = (_a_datetime64(ini) <= _a_datetime64(fin))
+    df.loc[mask, 'T. Op'] = np.where(valido, formatear_duracion(np.maximum(ns, 0)), '')
 
     return df
 
@@ -56,7 +87,7 @@ def calcular_dia_live(df: pd.DataFrame) -> pd.DataFrame:
     """
     Añade o actualiza la columna 'Dia LIVE':
       - Para operaciones abiertas (sin 'Fecha / Hora de Cierre'), calcula tiempo hábil
-        excluyendo fines de semana desde 'Fecha / Hora' hasta ahora.
+        excluyendo fines de semana y festivos desde 'Fecha / Hora' hasta ahora.
       - Para operaciones cerradas o sin 'Fecha / Hora', deja 'Dia LIVE' vacío.
     """
     df = df.copy()
@@ -67,117 +98,30 @@ def calcular_dia_live(df: pd.DataFrame) -> pd.DataFrame:
     if not mask.any():
         return df
 
-    now = pd.Timestamp.now()
-    delta = now - df.loc[mask, 'Fecha / Hora']
-    total_sec = delta.dt.total_seconds()
-    days = delta.dt.days.fillna(0).astype(int)
-    wd = df.loc[mask, 'Fecha / Hora'].dt.weekday.fillna(0).astype(int)
-
-    # Matriz de contar sábados y domingos en j días desde wd
-    extras = np.zeros((7,7), dtype=int)
-    for w in range(7):
-        for r in range(7):
-            extras[w, r] = sum(
-                1 for d in [(w + k) % 7 for k in range(r)] if d >= 5
-            )
-
-    weeks = days // 7
-    rem = days % 7
-    extras_list = [extras[w, r] for w, r in zip(wd, rem)]
-    extras_series = pd.Series(extras_list, index=delta.index)
-    weekend_days = weeks * 2 + extras_series
-
-    sec_fds = weekend_days * 24 * 3600
-    hab = (total_sec - sec_fds).clip(lower=0)
-
-    dias = (hab // (24*3600)).astype(int)
-    horas = ((hab % (24*3600)) // 3600).astype(int)
-    minutos = ((hab % 3600) // 60).astype(int)
-
-    df.loc[mask, 'Dia LIVE'] = (
-        dias.astype(str) + 'd ' +
-        horas.astype(str) + 'h ' +
-        minutos.astype(str).str.zfill(2) + 'm'
-    )
-    return df
-
-    now = pd.Timestamp.now()
-    delta = now - df.loc[mask, 'Fecha / Hora']
-    total_sec = delta.dt.total_seconds()
-    days = delta.dt.days
-    wd = df.loc[mask, 'Fecha / Hora'].dt.weekday
-
-    # Matriz de contar sábados y domingos en j días desde wd
-    extras = np.zeros((7,7), dtype=int)
-    for w in range(7):
-        for r in range(7):
-            extras[w, r] = sum(
-                1 for d in [(w + k) % 7 for k in range(r)] if d >= 5
-            )
-
-    weeks = days // 7
-    rem = days % 7
-    extras_list = [extras[int(w), int(r)] for w, r in zip(wd, rem)]
-    extras_series = pd.Series(extras_list, index=delta.index)
-    weekend_days = weeks * 2 + extras_series
-
-    sec_fds = weekend_days * 24 * 3600
-    hab = (total_sec - sec_fds).clip(lower=0)
-
-    dias = (hab // (24*3600)).astype(int)
-    horas = ((hab % (24*3600)) // 3600).astype(int)
-    minutos = ((hab % 3600) // 60).astype(int)
-
-    df.loc[mask, 'Dia LIVE'] = (
-        dias.astype(str) + 'd ' +
-        horas.astype(str) + 'h ' +
-        minutos.astype(str).str.zfill(2) + 'm'
-    )
+    ini = df.loc[mask, 'Fecha / Hora']
+    ahora = pd.Series(pd.Timestamp.now(), index=ini.index)
+    hab = np.maximum(tiempo_habil_ns(ini, ahora), 0)
+    df.loc[mask, 'Dia LIVE'] = formatear_duracion_dias(hab)
     return df
 
 
 def calcular_tiempo_dr(df: pd.DataFrame) -> pd.DataFrame:
     """
     Añade 'Tiempo D/R' donde 'Deposito' o 'Retiro' no es NaN y hay fecha de cierre.
-    Excluye fines de semana de forma vectorizada.
+    Excluye fines de semana y festivos de forma vectorizada.
     """
     df = df.copy()
     mask = (
         (df['Deposito'].notna() | df['Retiro'].notna()) &
+        df['Fecha / Hora'].notna() &
         df['Fecha / Hora de Cierre'].notna()
     )
     df['Tiempo D/R'] = ''
     if not mask.any():
         return df
 
-    delta = df.loc[mask, 'Fecha / Hora de Cierre'] - df.loc[mask, 'Fecha / Hora']
-    total_sec = delta.dt.total_seconds()
-    days = delta.dt.days
-    wd = df.loc[mask, 'Fecha / Hora'].dt.weekday
-
-    extras = np.zeros((7,7), dtype=int)
-    for w in range(7):
-        for r in range(7):
-            extras[w, r] = sum(
-                1 for d in [(w + k) % 7 for k in range(r)] if d >= 5
-            )
-
-    weeks = days // 7
-    rem = days % 7
-    extras_list = [extras[int(w), int(r)] for w, r in zip(wd, rem)]
-    extras_series = pd.Series(extras_list, index=delta.index)
-    weekend_days = weeks * 2 + extras_series
-
-    sec_fds = weekend_days * 24 * 3600
-    hab = (total_sec - sec_fds).clip(lower=0)
-
-    dias = (hab // (24*3600)).astype(int)
-    horas = ((hab % (24*3600)) // 3600).astype(int)
-    minutos = ((hab % 3600) // 60).astype(int)
-
-    df.loc[mask, 'Tiempo D/R'] = (
-        dias.astype(str) + 'd ' +
-        horas.astype(str) + 'h ' +
-        minutos.astype(str).str.zfill(2) + 'm'
+    hab = np.maximum(
+        tiempo_habil_ns(df.loc[mask, 'Fecha / Hora'], df.loc[mask, 'Fecha / Hora de Cierre']), 0
     )
+    df.loc[mask, 'Tiempo D/R'] = formatear_duracion_dias(hab)
     return df
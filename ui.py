@@ -1,9 +1,13 @@
 import streamlit as st
 import time
-from s3_utils import maybe_autosave
+from s3_utils import maybe_autosave, actualizar_estado_guardado, guardar_archivo_ahora, fijar_version_cargada
 
 st.set_page_config(page_title="Hoja de Trading", page_icon="📈", layout="wide")
 
+# Perfilado por etapas (solo con PERFIL_ETAPAS=1)
+from perfil_etapas import etapa, iniciar_rerun, cerrar_rerun, mostrar_panel
+iniciar_rerun()
+
 # 1) Mostrar mensaje si el autosave anterior dejó algo
 if st.session_state.get("auto_save_message"):
     st.success(st.session_state.pop("auto_save_message"))
@@ -14,23 +18,26 @@ if "data_modified" not in st.session_state:
 if "last_auto_save" not in st.session_state:
     st.session_state.last_auto_save = time.time()
 
-# 3) Intentar el auto‐save (con el mismo código que el botón)
+# 3) Recoger el resultado de los guardados encargados a la cola
+actualizar_estado_guardado()
 
 
 # — ahora siguen tus otros imports —
 import pandas as pd
 import os, json
+
+# Copy-on-write: las sesiones comparten los journals de registro_journals y
+# solo se duplican las columnas que cada una modifica
+pd.set_option("mode.copy_on_write", True)
 import config
-from io import BytesIO
 
 from auto_save_s3 import schedule_auto_save
 
 from gestor_archivos_s3 import (
     list_saved_files,
     save_uploaded_file,
-    load_file_df,
-    delete_saved_file,
-    update_file
+    cargar_journal,
+    delete_saved_file
 )
 
 # Inicializa flags en sesión
@@ -41,40 +48,24 @@ if "last_auto_save" not in st.session_state:
        
 from copia_tabla import copiar_datos_a_tabla
 from botones import crear_botones_trading, crear_botones_iv_rank
-from operations import agregar_operacion, procesar_deposito_retiro
+from operations import agregar_operacion
 from inversion import mostrar_sidebar_inversion
 from riesgo_beneficio import render_riesgo_beneficio
 from aciertos_beneficios import render_aciertos_beneficios
 from capital import render_tabla_capital
 from Op_ganadoras_perdedoras import render_operaciones_ganadoras_perdedoras
 from esperanza_matematica import render_esperanza_matematica
-from comparativos_graficos_barras import mostrar_profit_interactivo
-from comparativos_graficos_linea import mostrar_profit_trend_interactivo
-from comparativo_mostrar_dd_max import mostrar_dd_max
-from comparativo_profit_area import mostrar_profit_area
-from comparativo_profit_puntos import mostrar_profit_puntos
-from comparativos_tiempo_puntos import mostrar_tiempo_puntos
-from comparativo_call_put_linea import comparativo_call_put_linea
-from Comparativo_call_barra import comparativo_call_barra
-from comparativo_put_barra import comparativo_put_barra
-from comparativo_dias_linea import comparativo_dias_linea
-from comparativo_trade_diario_apilado import comparativo_trade_diario_apilado
-from comparativo_profit_dia_semana import comparativo_profit_dia_semana
-from comparativo_dona_call_put import comparativo_dona_call_put
-from time_utils import calcular_tiempo_operacion_vectorizado, calcular_dia_live, calcular_tiempo_dr
-from aplicar_color_general import aplicar_color_general
+from estadisticas_operaciones import calcular_estadisticas
+# Los módulos de gráficos se importan al elegirlos (registro_graficos)
+from registro_graficos import GRAFICOS, JOURNAL_COMPLETO, obtener_grafico
+from cache_graficos import version_graficos
+from cubo_tiempo import CuboTiempo, usar_cubo
+from tabla_vista import elegir_ventana
+from ediciones_tabla import aplicar_ediciones
+from aplicar_color_general import aplicar_color_general, column_config_derivadas
 from tabla_ganancia_contratos_calculos import tabla_ganancia_contratos_calculos
-from comparativo_histograma_profit_call_put import histograma_profit_call_put
-from comparativo_racha_operaciones_dd_max import comparativo_racha_dd_max
-from comparativo_mapa_calor_tiempo import mostrar_heatmaps_dia_hora
-from comparativo_calendario import mostrar_calendario
-from convertir_fechas import convertir_fechas
-from calculos_tabla_principal import (
-    calcular_profit_operacion, calcular_porcentaje_profit_op, calcular_profit_total,
-    calcular_dd_max, calcular_dd_up, calcular_profit_t, calcular_profit_alcanzado_vectorizado,
-    calcular_profit_media_vectorizado
-)
-from eliminar_columnas_duplicadas_contador import limpiar_columnas
+from pipeline_incremental import COLUMNAS_CALCULADAS, crear_pipeline_principal
+from registro_journals import procesar_compartido
 from tabla_editable_eliminar_renombrar_limpiar_columnas import tabla_editable_eliminar_renombrar_limpiar_columnas
 
 SELECT_FILE = 'selected_asset.json'
@@ -156,18 +147,31 @@ with st.sidebar.expander("Archivos", expanded=True):
 
         # 3b) Cargar en memoria
         if st.session_state.loaded_file != choice:
-           df = load_file_df(choice)
+           with etapa("cargar_journal"):
+               df, clave_objeto, version, etag = cargar_journal(choice)
            if not df.empty:
                st.session_state.datos = df
+               # El primer pipeline sobre este journal se comparte entre sesiones
+               st.session_state.journal_cargado = (
+                   df, clave_objeto, version, etag
+               )
            st.session_state.loaded_file = choice
 
         # 3c) Guardar cambios manual
         if st.button("💾 Guardar cambios en S3", key="save_sidebar"):
-            buffer = BytesIO()
-            st.session_state.datos.to_csv(buffer, index=False, encoding="utf-8")
-            buffer.seek(0)
-            update_file(choice, buffer.getvalue())
-            st.success(f"Archivo '{choice}' actualizado correctamente en S3")
+            error = guardar_archivo_ahora(choice)
+            if error is None:
+                st.success(f"Archivo '{choice}' actualizado correctamente en S3")
+            else:
+                st.error(f"❌ No se pudo guardar '{choice}' en S3: {error}")
+
+        # 3d) Otra sesión cambió el archivo a la vez
+        if st.session_state.get("aviso_guardado"):
+            st.warning(st.session_state.aviso_guardado)
+            if st.button("🔄 Recargar desde S3", key="recargar_s3"):
+                st.session_state.aviso_guardado = None
+                st.session_state.loaded_file = None
+                st.rerun()
 
 with st.expander("Modo de entrenamiento", expanded=True):
     if 'pintar_colores' not in st.session_state:
@@ -238,41 +242,60 @@ if sel != st.session_state.get("prev_selected_asset"):
         json.dump(sel, f)
     st.session_state.prev_selected_asset = sel
 
-df = st.session_state.datos.copy()
-df = limpiar_columnas(df)
-
-df = convertir_fechas(
-    df,
-    cols=['Fecha / Hora', 'Fecha / Hora de Cierre'],
-    dayfirst=True,      # ajusta según tu convención
-    yearfirst=False
-)
-# Añadir columna Día (Lu, Ma, Mi, etc.)
-df['Día'] = df['Fecha / Hora'].dt.weekday.map({0:'Lu', 1:'Ma', 2:'Mi', 3:'Ju', 4:'Vi', 5:'Sa', 6:'Do'})
-
-df = calcular_tiempo_operacion_vectorizado(df)
-if '% Profit. Op' in df.columns and not pd.api.types.is_string_dtype(df['% Profit. Op']):
-    df['% Profit. Op'] = df['% Profit. Op'].astype(str)
-df = calcular_dia_live(df)
-df = calcular_tiempo_dr(df)
-df = calcular_profit_operacion(df)
-df = calcular_porcentaje_profit_op(df)
-df = procesar_deposito_retiro(df)
-df = calcular_profit_total(df)
-df = calcular_dd_max(df)
-df = calcular_dd_up(df)
-df = calcular_profit_alcanzado_vectorizado(df)
-df = calcular_profit_media_vectorizado(df)
-df = calcular_profit_t(df)
+# Columnas derivadas: el pipeline solo recalcula las filas que cambiaron
+if 'pipeline' not in st.session_state:
+    st.session_state.pipeline = crear_pipeline_principal()
+st.session_state.pipeline.clave = st.session_state.loaded_file
+cargado = st.session_state.pop('journal_cargado', None)
+with etapa("pipeline", st.session_state.datos):
+    if cargado is not None and cargado[0] is st.session_state.datos:
+        st.session_state.datos = procesar_compartido(
+            st.session_state.pipeline, st.session_state.datos, cargado[1], cargado[2]
+        )
+        # Los guardados de esta sesión solo sobrescriben la versión cargada
+        fijar_version_cargada(st.session_state.loaded_file, cargado[1], cargado[3], st.session_state.datos)
+    # Filas que cambió la pestaña Edición en el rerun anterior
+    df = st.session_state.pipeline.ejecutar(
+        st.session_state.datos, filas_modificadas=st.session_state.pop('filas_editadas', None)
+    )
 
 st.session_state.datos = df
 
-render_riesgo_beneficio(df)
-render_aciertos_beneficios(df)
-render_operaciones_ganadoras_perdedoras(df)
-render_tabla_capital(df)
-mostrar_sidebar_inversion(df)
-render_esperanza_matematica(df)
+# Los gráficos cachean sus datos y figuras por versión del journal. La
+# caché es del proceso: otra sesión puede seguir en la versión anterior,
+# así que no se descarta aquí (la acota el LRU de cache_graficos)
+version_datos = st.session_state.pipeline.version(df)
+version_previa = st.session_state.get('version_graficos')
+st.session_state.version_graficos = version_datos
+
+# Agregados por día/hora/activo/tipo de los gráficos de tiempo: solo se
+# reclasifican las filas cuya firma cambió
+if 'cubo_tiempo' not in st.session_state:
+    st.session_state.cubo_tiempo = CuboTiempo()
+if version_datos is None or version_previa != version_datos or len(st.session_state.cubo_tiempo) != len(df):
+    with etapa("cubo_tiempo", df):
+        st.session_state.cubo_tiempo.actualizar(df, st.session_state.pipeline.firmas())
+
+# Estadísticas de los paneles de la barra lateral: una pasada por versión
+# del journal, compartida por todos los paneles
+if version_datos is None or st.session_state.get('version_estadisticas') != version_datos:
+    with etapa("estadisticas", df):
+        st.session_state.estadisticas = calcular_estadisticas(df)
+    st.session_state.version_estadisticas = version_datos
+estadisticas = st.session_state.estadisticas
+
+with etapa("render_riesgo_beneficio", df):
+    render_riesgo_beneficio(df, estadisticas)
+with etapa("render_aciertos_beneficios", df):
+    render_aciertos_beneficios(df, estadisticas)
+with etapa("render_operaciones_ganadoras_perdedoras", df):
+    render_operaciones_ganadoras_perdedoras(df, estadisticas)
+with etapa("render_tabla_capital", df):
+    render_tabla_capital(df, estadisticas)
+with etapa("mostrar_sidebar_inversion", df):
+    mostrar_sidebar_inversion(df)
+with etapa("render_esperanza_matematica", df):
+    render_esperanza_matematica(df, estadisticas)
 
 with st.sidebar.expander("Ganancia por Contratos", expanded=False):
     tabla_ganancia_contratos_calculos()
@@ -284,36 +307,25 @@ if st.session_state.get('pintar_colores_disable_pending', False):
 tab_vista, tab_edicion = st.tabs(["Vista", "Edición"])
 
 with tab_vista:
-    df_vista = df.copy()
+    # Solo se pinta y se envía la ventana de filas elegida
+    inicio, fin = elegir_ventana(len(df))
+    df_vista = df.iloc[inicio:fin]
     if 'Contador' in df_vista.columns:
         df_vista = df_vista.drop(columns=['Contador'])
         
-    styled_df_vista = aplicar_color_general(df_vista)
+    with etapa("aplicar_color_general", df_vista):
+        styled_df_vista = aplicar_color_general(df_vista)
 
-    if styled_df_vista is not None:
-        st.dataframe(styled_df_vista, width=st.session_state.w, height=st.session_state.h)
-    else:
-        st.dataframe(df_vista, width=st.session_state.w, height=st.session_state.h)
-
-    opciones_graficos = {
-        "Barras": mostrar_profit_interactivo,
-        "Líneas": mostrar_profit_trend_interactivo,
-        "DD/Max": mostrar_dd_max,
-        "Área": mostrar_profit_area,
-        "Puntos": mostrar_profit_puntos,
-        "Tiempo": mostrar_tiempo_puntos,
-        "CALL vs PUT Línea": comparativo_call_put_linea,
-        "CALL Barras": comparativo_call_barra,
-        "PUT Barras": comparativo_put_barra,
-        "Días Línea": comparativo_dias_linea,
-        "CALL/PUT por Día (Apilado)": comparativo_trade_diario_apilado,
-        "Profit por Día de Semana": comparativo_profit_dia_semana,
-        "Porcentaje Aciertos CALL PUT (Dona)": comparativo_dona_call_put,
-        "Histograma Profit CALL/PUT": histograma_profit_call_put,
-        "Racha Operaciones DD/Max": comparativo_racha_dd_max,
-        "Mapa de calor Tiempo": mostrar_heatmaps_dia_hora,
-        "Calendario": mostrar_calendario,
-    }
+    with etapa("tabla_vista", df_vista):
+        if styled_df_vista is not None:
+            st.dataframe(styled_df_vista, width=st.session_state.w, height=st.session_state.h)
+        else:
+            st.dataframe(
+                df_vista, width=st.session_state.w, height=st.session_state.h,
+                column_config=column_config_derivadas(df_vista.columns)
+            )
+
+    opciones_graficos = list(GRAFICOS)
     secciones = [
         ("", "rango_col1", "rango_col2"),
         (" Secundarios", "rango_col3", "rango_col4")
@@ -326,8 +338,8 @@ with tab_vista:
             with select_col1:
                 grafico_col1 = st.selectbox(
                     f"Gráfico Columna 1{seccion}",
-                    list(opciones_graficos.keys()),
-                    index=list(opciones_graficos.keys()).index(
+                    opciones_graficos,
+                    index=opciones_graficos.index(
                         "Racha Operaciones DD/Max" if seccion == "" else "Porcentaje Aciertos CALL PUT (Dona)"
                     ),
                     key=f"grafico_1{seccion}"
@@ -336,8 +348,8 @@ with tab_vista:
             with select_col2:
                 grafico_col2 = st.selectbox(
                     f"Gráfico Columna 2{seccion}",
-                    list(opciones_graficos.keys()),
-                    index=list(opciones_graficos.keys()).index(
+                    opciones_graficos,
+                    index=opciones_graficos.index(
                         "CALL vs PUT Línea" if seccion == "" else "DD/Max"
                     ),
                     key=f"grafico_2{seccion}"
@@ -346,14 +358,15 @@ with tab_vista:
             # COLUMNAS DE GRÁFICOS CORREGIDAS
             col1, col2 = st.columns(2, gap="small")
 
-            with col1:
-                if grafico_col1 == "Calendario":
-                    mostrar_calendario(
+            with (col1, etapa(f"grafico_1{seccion}: {grafico_col1}"), version_graficos(version_datos),
+                  usar_cubo(st.session_state.cubo_tiempo)):
+                if grafico_col1 in JOURNAL_COMPLETO:
+                    obtener_grafico(grafico_col1)(
                         df,
                         chart_key=f"chart_1_{grafico_col1}{seccion}"
                     )
                 else:
-                    opciones_graficos[grafico_col1](
+                    obtener_grafico(grafico_col1)(
                         df.iloc[
                             st.session_state[rango1][0]
                             :st.session_state[rango1][1] + 1
@@ -361,14 +374,15 @@ with tab_vista:
                         chart_key=f"chart_1_{grafico_col1}{seccion}"
                     )
 
-            with col2:
-                if grafico_col2 == "Calendario":
-                    mostrar_calendario(
+            with (col2, etapa(f"grafico_2{seccion}: {grafico_col2}"), version_graficos(version_datos),
+                  usar_cubo(st.session_state.cubo_tiempo)):
+                if grafico_col2 in JOURNAL_COMPLETO:
+                    obtener_grafico(grafico_col2)(
                         df,
                         chart_key=f"chart_2_{grafico_col2}{seccion}"
                     )
                 else:
-                    opciones_graficos[grafico_col2](
+                    obtener_grafico(grafico_col2)(
                         df.iloc[
                             st.session_state[rango2][0]
                             :st.session_state[rango2][1] + 1
@@ -387,20 +401,24 @@ with tab_edicion:
         if col in df_ed.columns:
             df_ed[col] = pd.to_numeric(df_ed[col], errors='coerce')
 
-    for txt in ['T. Op', 'Tiempo D/R', '% Profit. Op', 'Profit Tot.', 'Profit Alcanzado', 'Profit Media']:
+    for txt in ['T. Op', 'Tiempo D/R']:
         if txt in df_ed.columns:
             df_ed[txt] = df_ed[txt].fillna('').astype(str)
 
     col_config = {'Contador': st.column_config.NumberColumn("Contador", disabled=True)}
     for col in df_ed.columns[2:]:
+        # Las que recalcula el pipeline son de solo lectura
+        calculada = col in COLUMNAS_CALCULADAS
         if pd.api.types.is_bool_dtype(df_ed[col]):
             continue
         elif pd.api.types.is_numeric_dtype(df_ed[col]):
-            col_config[col] = st.column_config.NumberColumn(col)
+            col_config[col] = st.column_config.NumberColumn(col, disabled=calculada)
         elif pd.api.types.is_datetime64_any_dtype(df_ed[col]):
-            col_config[col] = st.column_config.DatetimeColumn(col)
+            col_config[col] = st.column_config.DatetimeColumn(col, disabled=calculada)
         else:
-            col_config[col] = st.column_config.TextColumn(col)
+            col_config[col] = st.column_config.TextColumn(col, disabled=calculada)
+    # Columnas derivadas numéricas: '%' y decimales solo en la vista
+    col_config.update(column_config_derivadas(df_ed.columns, solo_lectura=COLUMNAS_CALCULADAS))
 
     edited = st.data_editor(
         df_ed,
@@ -408,10 +426,16 @@ with tab_edicion:
         hide_index=True,
         width=st.session_state.w,
         height=st.session_state.h,
-        num_rows="dynamic"
+        num_rows="dynamic",
+        key="editor_tabla"
     )
-    filtered = edited[edited['Eliminar'] == False]
-    filtered = filtered.drop(columns=['Contador', 'Eliminar']).reset_index(drop=True)
-    st.session_state.datos = filtered
-    # ← Marcamos que la data ha cambiado para el auto‐save
-    st.session_state.data_modified = True
+    # Solo los cambios del editor (celdas, filas añadidas y borradas)
+    datos, filas_editadas = aplicar_ediciones(df, edited, st.session_state.get("editor_tabla"))
+    if filas_editadas is not None:
+        st.session_state.datos = datos
+        st.session_state.filas_editadas = filas_editadas
+        # ← Marcamos que la data ha cambiado para el auto‐save
+        st.session_state.data_modified = True
+
+# Etapas de este rerun: al log JSONL y, con el perfilado activo, a la barra lateral
+mostrar_panel(cerrar_rerun())